@@ -2,19 +2,34 @@
 # cava_waybar.py
 # waybar/.config/waybar/scripts/cava_waybar.py
 # CAVA → Waybar single-producer + lightweight followers.
-# - First instance to grab the lock runs CAVA and writes a shared JSON sink.
-# - Other instances just read that file and print it periodically for Waybar.
+# - First instance to grab the lock runs CAVA at the highest bar count any
+#   instance asked for and publishes the raw spectrum to a shared mmap ring,
+#   pushes it to followers over a Unix socket, and refreshes a slower JSON
+#   sink file (its own rendered line) for late joiners / other readers.
+# - Other instances block on the socket, resample the spectrum to their own
+#   bar count and render it in their own style for Waybar.
 
 import os
 import sys
-import struct
 import subprocess
-import tempfile
 import signal
 import json
 import time
 import ctypes
 
+from lib import procs, spectrum
+from lib.cava import Backoff, CavaProcess
+from lib.follow import FrameFeed, LockWatch
+from lib.frames import FrameReader
+from lib.jsonline import LineEncoder
+from lib.mpris import MprisClient
+from lib.output import LatestLineWriter
+from lib.pacing import EmitGrid, IdleGovernor
+from lib.pubsub import Publisher, Waker, wait_readable
+from lib.render import BarRenderer, PeakHold
+from lib.ring import RingWriter
+from lib.stats import Stats
+
 # ── Env knobs ───────────────────────────────────────────────────────────────
 BARS = int(os.environ.get("CAVA_BARS", "40"))
 BIT_FORMAT = os.environ.get("CAVA_BIT", "16bit")  # "8bit" | "16bit"
@@ -31,8 +46,16 @@ STYLE_NAME = os.environ.get(
 GAP = os.environ.get("CAVA_GAP", "\u200a")  # " ", "│", "·", etc.
 BORDER = os.environ.get("CAVA_BORDER", "none")  # none|pipe|bracket
 MARKUP = os.environ.get("CAVA_MARKUP", "0") == "1"  # pango span color
-
-FPS = int(os.environ.get("CAVA_FPS", "12"))  # producer emit cap
+PEAK = os.environ.get("CAVA_PEAK", "0") == "1"  # falling peak caps over the bars
+PEAK_HOLD = float(os.environ.get("CAVA_PEAK_HOLD", "0.5"))  # cap stays up (s)
+PEAK_DECAY = float(os.environ.get("CAVA_PEAK_DECAY", "8"))  # cap falls, levels/s
+PEAK_COLOR = os.environ.get("CAVA_PEAK_COLOR", "peru")  # pango color of a cap
+
+FPS = int(os.environ.get("CAVA_FPS", "12"))  # emit cap; also our cava demand
+IDLE_FPS = float(
+    os.environ.get("CAVA_IDLE_FPS", "1")
+)  # rate while silent/static; 0 = only on change
+IDLE_AFTER = int(os.environ.get("CAVA_IDLE_AFTER", "5"))  # quiet frames before idling
 FOLLOW_INT = float(
     os.environ.get("CAVA_FOLLOWER_INTERVAL", "1")
 )  # follower print period (s)
@@ -41,6 +64,35 @@ FOLLOW_INT = float(
 RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
 SINK_PATH = os.environ.get("CAVA_SINK", f"{RUNTIME_DIR}/cava_waybar.json")
 LOCK_PATH = os.environ.get("CAVA_LOCK", f"{RUNTIME_DIR}/cava_waybar.lock")
+RING_PATH = os.environ.get("CAVA_RING", f"{RUNTIME_DIR}/cava_waybar.ring")
+SOCK_PATH = os.environ.get("CAVA_SOCK", f"{RUNTIME_DIR}/cava_waybar.sock")
+STATS_PATH = os.environ.get(
+    "CAVA_STATS", f"{RUNTIME_DIR}/cava_waybar.stats.json"
+)  # "" disables
+STATS_INTERVAL = float(os.environ.get("CAVA_STATS_INTERVAL", "5"))
+PROFILE = (
+    os.environ.get("CAVA_PROFILE", "0") == "1"
+)  # per-stage frame timers in the stats (SIGUSR1 dumps them right away)
+SINK_INTERVAL = float(
+    os.environ.get("CAVA_SINK_INTERVAL", "1")
+)  # JSON sink refresh period (s); followers use the socket/ring
+RESTART_MIN = float(
+    os.environ.get("CAVA_RESTART_MIN", "0.25")
+)  # first respawn delay after cava dies; doubles per crash
+RESTART_MAX = float(os.environ.get("CAVA_RESTART_MAX", "30"))  # backoff cap (s)
+STALL_S = float(
+    os.environ.get("CAVA_STALL_S", "5")
+)  # respawn cava after this long without a frame; 0 = never
+PLAYERCTL_TIMEOUT = float(
+    os.environ.get("PLAYERCTL_TIMEOUT", "2")
+)  # fallback playerctl call limit (s)
+SUSPEND = os.environ.get(
+    "CAVA_SUSPEND", "sigstop"
+)  # cava while nothing plays: sigstop | stop (exit, respawn on play) | off
+SUSPEND_AFTER = float(
+    os.environ.get("CAVA_SUSPEND_AFTER", "2")
+)  # seconds without a Playing player before cava is suspended
+SUSPEND_POLL = 0.5  # player state re-check while suspended without D-Bus (s)
 
 # ── Styles (low→high intensity) ─────────────────────────────────────────────
 STYLES = {
@@ -60,7 +112,28 @@ if BIT_FORMAT == "16bit":
 else:
     BYTETYPE, BYTESIZE, MAXV = "B", 1, 255
 
+
+def peak_timing(fps):
+    """(hold, decay) for PeakHold stepping `fps` times a second."""
+    fps = max(fps, 1)
+    return round(PEAK_HOLD * fps), round(PEAK_DECAY * 16 / fps)
+
+
+# Value→glyph tables are built once for this style/border. Everything renders
+# from 8-bit magnitudes (the high byte of 16-bit frames), resampled from the
+# master spectrum to our own bar count.
+# Peak caps turn our level bytes into cap/level codes; a bar with its cap
+# above it shows the cap's glyph in PEAK_COLOR. Hold and fall are counted in
+# frames, so they follow the rate we step at: cava's framerate here, FPS in a
+# follower.
+CAPS = [f"<span color='{PEAK_COLOR}'>{g}</span>" for g in GLYPHS] if PEAK else None
+RENDERER = BarRenderer(GLYPHS, "8bit", GAP, BORDER, caps=CAPS)
+PEAKS = PeakHold(*peak_timing(FPS)) if PEAK else None
+RESAMPLE = spectrum.Resampler(BARS)
+BITS = 16 if BIT_FORMAT == "16bit" else 8
+
 STOP = False
+DUMP = False  # SIGUSR1: write the stats now
 
 
 def _stop(*_a):
@@ -68,37 +141,25 @@ def _stop(*_a):
     STOP = True
 
 
+def _dump(*_a):
+    global DUMP
+    DUMP = True
+
+
 # global signal setup
 signal.signal(signal.SIGINT, _stop)
 signal.signal(signal.SIGTERM, _stop)
+signal.signal(signal.SIGUSR1, _dump)
 try:
     signal.signal(signal.SIGPIPE, _stop)  # exit if Waybar closes our pipe
 except Exception:
     pass
 
 
-def wrap_token(tok: str) -> str:
-    if BORDER == "pipe":
-        return f"│{tok}│"
-    if BORDER == "bracket":
-        return f"[{tok}]"
-    return tok
-
-
-def val_to_token(v: int) -> str:
-    idx = round((v / MAXV) * (len(GLYPHS) - 1))
-    if idx < 0:
-        idx = 0
-    if idx >= len(GLYPHS):
-        idx = len(GLYPHS) - 1
-    return GLYPHS[idx]
-
-
-def atomic_write(path: str, text: str) -> None:
+def atomic_write(path: str, line: bytes) -> None:
     tmp = f"{path}.tmp"
-    with open(tmp, "w") as f:
-        f.write(text)
-        f.write("\n")
+    with open(tmp, "wb") as f:
+        f.write(line)
     os.replace(tmp, path)
 
 
@@ -107,9 +168,10 @@ def try_lock(path: str):
     import fcntl
 
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    f = open(path, "w")
+    f = open(path, "a")  # "w" would wipe the holder's pid before flock fails
     try:
         fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        f.truncate(0)
         f.write(str(os.getpid()))
         f.flush()
         return f
@@ -118,35 +180,50 @@ def try_lock(path: str):
         return None
 
 
+# Resident D-Bus client; playerctl is only the fallback without a session bus
+_MPRIS = MprisClient()
+
 # Cache the probe a bit to avoid spamming playerctl
 _last_check = 0.0
 _last_active = False
+_last_playing = False
 
 
-def is_media_active():
+def media_state():
     """
-    True if any MPRIS player reports Playing or Paused.
-    False if no players or only Stopped.
+    (active, playing): any MPRIS player reports Playing or Paused (False if
+    no players or only Stopped), and any reports Playing.
     """
-    global _last_check, _last_active
+    if _MPRIS.pump():
+        return _MPRIS.any_active(), _MPRIS.any_playing()
+
+    global _last_check, _last_active, _last_playing
     now = time.monotonic()
     if now - _last_check < 0.3:
-        return _last_active
+        return _last_active, _last_playing
     _last_check = now
     try:
         # -a = all players; returns one status per player
         lines = (
-            subprocess.check_output(
-                ["playerctl", "-a", "status"], stderr=subprocess.DEVNULL
+            procs.check_output(
+                ["playerctl", "-a", "status"],
+                "playerctl -a status",
+                PLAYERCTL_TIMEOUT,
+                stderr=subprocess.DEVNULL,
             )
             .decode()
             .splitlines()
         )
         states = {ln.strip().lower() for ln in lines if ln.strip()}
         _last_active = any(s in ("playing", "paused") for s in states)
+        _last_playing = "playing" in states
     except Exception:
-        _last_active = False
-    return _last_active
+        _last_active = _last_playing = False
+    return _last_active, _last_playing
+
+
+def is_media_active():
+    return media_state()[0]
 
 
 def install_parent_death_sig(sig=signal.SIGTERM):
@@ -162,147 +239,434 @@ def install_parent_death_sig(sig=signal.SIGTERM):
         pass
 
 
-def safe_write_line(obj) -> bool:
-    """Write one JSON line to stdout; return False if the pipe is gone."""
+def cava_death_sig():
+    """preexec_fn for cava: SIGKILL, which a suspended (stopped) cava obeys."""
+    install_parent_death_sig(signal.SIGKILL)
+
+
+# Payloads → JSON line bytes; the constant fields are encoded once
+LINES = LineEncoder()
+
+
+def safe_write(line: bytes) -> bool:
+    """Write one encoded JSON line to stdout; return False if the pipe is gone."""
     try:
-        sys.stdout.write(json.dumps(obj) + "\n")
+        sys.stdout.buffer.write(line)
         sys.stdout.flush()
         return True
     except BrokenPipeError:
         return False
 
 
-def producer(lock_file):
-    cava_conf = f"""
-[general]
-mode = normal
-framerate = 25
-lower_cutoff_freq = 50
-higher_cutoff_freq = 12000
-bars = {BARS}
-sensitivity = {SENS}
-channels = {CHANNELS}
-
-[input]
-method = {METHOD}
-
-[output]
-method = raw
-raw_target = /dev/stdout
-bit_format = {BIT_FORMAT}
-channels = {CHANNELS}
-mono_option = average
-
-[smoothing]
-noise_reduction = 35
-integral = 90
-gravity = 95
-ignore = 2
-monstercat = 1.5
-""".strip()
-
-    with tempfile.NamedTemporaryFile(mode="w", delete=True) as conf:
-        conf.write(cava_conf)
-        conf.flush()
-        proc = subprocess.Popen(
-            ["cava", "-p", conf.name],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            preexec_fn=install_parent_death_sig,  # make child die when we do
-        )
-
-        out = proc.stdout
-        if out is None:
-            return 1
-
-        last_emit = 0.0
-        chunk = BYTESIZE * BARS
-        fmt = BYTETYPE * BARS
-
-        try:
-            atomic_write(SINK_PATH, json.dumps({"text": "", "class": CLASS_NAME}))
-        except Exception:
-            pass
+def safe_write_line(obj) -> bool:
+    return safe_write(LINES.encode(obj))
 
-        while not STOP:
-            buf = out.read(chunk)
-            if not buf or len(buf) < chunk:
-                break
 
-            now = time.monotonic()
-            if now - last_emit < 1.0 / max(FPS, 1):
-                continue
-            last_emit = now
+def producer(lock_file, seed=None, seed_bars=0):
+    """
+    Run cava and serve everyone. A promoted follower passes its last payload
+    (`seed`) and the master bar count it was fed (`seed_bars`), so the sink
+    and cava pick up where the old producer left off.
+    """
+    global DUMP
+    # cava runs at the highest rate and bar count anyone wants: us, or any
+    # follower's hello
+    cava = CavaProcess(
+        max(BARS, seed_bars),
+        SENS,
+        CHANNELS,
+        METHOD,
+        BIT_FORMAT,
+        framerate=max(FPS, 1),
+        preexec_fn=cava_death_sig,  # make child die when we do
+    )
+
+    last_sink = 0.0
+    published_key = emitted_key = sink_key = None  # last visible state per output
+    pending = None  # (levels, active) waiting for the next grid point
+    deadline = None  # armed only while something is pending
+    t_pending = 0.0
+    frames = None  # reader on cava's pipe while it runs
+    respawn_at = None  # while cava is down: when to start it again
+    last_frame = 0.0
+    backoff = Backoff(RESTART_MIN, RESTART_MAX)
+    suspended = False  # cava held while no player is Playing (CAVA_SUSPEND)
+    quiet_since = None  # when the last player stopped playing
+    poll_at = None  # suspended without D-Bus: next playerctl check
+    # A stalled Waybar must not stall us: newest line wins, the rest drop
+    stdout = LatestLineWriter(sys.stdout.fileno())
+    stats = Stats(STATS_PATH, STATS_INTERVAL, PROFILE)
+    stats.sections["commands"] = procs.summary  # everything this process forked
+    stage = stats.stages  # lap timers; no-ops unless CAVA_PROFILE=1
+    governor = IdleGovernor(IDLE_FPS, IDLE_AFTER)
+    grid = EmitGrid(FPS)
+    waker = Waker()
 
-            vals = struct.unpack(fmt, buf)
-            tokens = [val_to_token(v) for v in vals]
-            text = GAP.join(tokens)
+    try:
+        ring = RingWriter(RING_PATH)
+    except (OSError, ValueError):
+        ring = None
+    try:
+        pub = Publisher(SOCK_PATH)
+    except OSError:
+        pub = None
 
-            payload = {"text": text if is_media_active() else "", "class": CLASS_NAME}
+    try:
+        atomic_write(SINK_PATH, LINES.encode(seed or {"text": "", "class": CLASS_NAME}))
+    except Exception:
+        pass
 
+    def spawn(now):
+        nonlocal frames, respawn_at, last_frame
+        out = cava.start()
+        if out is None:
+            down(now, "cava_start_failures")
+            return
+        frames = FrameReader(out, cava.bars, BIT_FORMAT)
+        os.set_blocking(frames.fileno(), False)  # drain to the newest frame
+        respawn_at = None
+        last_frame = now
+        stats.set("cava_up", True)
+
+    def down(now, why):
+        """
+        cava exited, stalled or would not start (e.g. the sound server is
+        restarting): respawn it in place after a backoff. Followers and our
+        own output keep the last good frame meanwhile.
+        """
+        nonlocal frames, respawn_at
+        uptime = now - cava.started_at if cava.running else 0.0
+        cava.stop()
+        frames = None
+        # while suspended, resume() starts it again instead
+        respawn_at = None if suspended else now + backoff.next(uptime)
+        stats.incr(why)
+        stats.set("cava_up", False)
+
+    def on_frame(t_ready):
+        """
+        Take the newest cava frame, publish it to followers right away and
+        return our (levels, active); None without a frame or while idling.
+        """
+        nonlocal last_frame
+        stage.start()
+        dropped = frames.dropped
+        buf = frames.read_latest()
+        stage.lap("read")
+        if buf is None:
+            return None
+        last_frame = t_ready
+        stats.incr("frames_read", 1 + frames.dropped - dropped)
+        stats.incr("frames_drained", frames.dropped - dropped)
+        return take(buf, t_ready)
+
+    def take(buf, t_ready, force=False):
+        """One raw frame → followers and our (levels, active); `force` skips idling."""
+        nonlocal published_key
+
+        # Master levels drive idling and publishing; our own bar folds them
+        # down to BARS (level mapping is monotonic, so group peaks agree)
+        mags = spectrum.high_bytes(buf, BITS)
+        stage.lap("unpack")
+        master = RENDERER.levels_of(mags)
+        stage.lap("levels")
+        levels = RESAMPLE(master, cava.bars)
+        stage.lap("resample")
+
+        # Silent or static spectrum: step down to the idle rate, once no
+        # cap is left falling (a change in `active` still goes out: it
+        # blanks or shows the bars)
+        active = is_media_active()
+        stage.lap("media")
+        governor.update(master)
+        stats.set("idle", governor.idle)
+        falling = PEAKS is not None and not PEAKS.settled
+        if not force and not falling and not governor.due(t_ready, master, active):
+            stats.incr("frames_idle_skipped")
+            return None
+        governor.sent(t_ready, master, active)
+        stage.lap("govern")
+        if PEAKS is not None:
+            levels = PEAKS(levels)
+            stage.lap("peaks")
+
+        key = (levels, active)
+        if (master, active) != published_key:
+            published_key = (master, active)
+            flags = spectrum.FLAG_ACTIVE if active else 0
+            data = spectrum.encode(buf, cava.bars, BIT_FORMAT, flags)
+            if ring is not None:
+                try:
+                    ring.publish(data)
+                except ValueError:
+                    pass
+            if pub is not None:
+                pub.publish(data, t_ready, 0.5 / cava.framerate, force)
+            stage.lap("publish")
+        stats.maybe_dump(t_ready)
+        return key
+
+    def offer(key, t):
+        """Queue `key` for the next grid point unless every output shows it."""
+        nonlocal pending, t_pending, deadline
+        if key is None:
+            return
+        if key != emitted_key or key != sink_key:
+            pending, t_pending = key, t
+            if deadline is None:
+                deadline = grid.deadline(t)
+        else:
+            pending = None  # back to what is already shown
+            stats.incr("frames_deduped")
+
+    def suspend(now):
+        """
+        No player has been Playing for SUSPEND_AFTER: stop capturing and
+        analysing. Everyone gets one silent frame, so no bars stay up.
+        """
+        nonlocal frames, respawn_at, suspended, poll_at
+        if SUSPEND == "stop" or frames is None or not cava.suspend():
+            cava.stop()
+            frames = None
+            respawn_at = None
+        suspended = True
+        poll_at = now + SUSPEND_POLL
+        if PEAKS is not None:
+            PEAKS.clear()
+        flat(now)
+        stats.incr("cava_suspends")
+        stats.set("cava_suspended", True)
+
+    def flat(now):
+        """A silent frame to stdout and followers now, with the current `active`."""
+        stage.start()
+        offer(take(bytes(cava.bars * BYTESIZE), now, force=True), now)
+
+    def resume(now):
+        nonlocal suspended, quiet_since, last_frame
+        suspended = False
+        quiet_since = None
+        stats.set("cava_suspended", False)
+        if frames is not None:
+            cava.resume()
+            last_frame = now  # the stall watchdog starts over
+        else:
+            spawn(now)
+
+    spawn(time.monotonic())
+    while not STOP:
+        watch = [frames, waker] + (pub.watch() if pub is not None else [])
+        live = frames is not None and not suspended
+        stall_at = last_frame + STALL_S if live and STALL_S > 0 else None
+        suspend_at = poll = None
+        if suspended:
+            if _MPRIS.connected:
+                watch.append(_MPRIS)  # a player starting wakes us
+            else:
+                poll = poll_at
+        elif quiet_since is not None:
+            suspend_at = quiet_since + SUSPEND_AFTER
+        wake = [
+            t
+            for t in (deadline, respawn_at, stall_at, suspend_at, poll)
+            if t is not None
+        ]
+        timeout = max(0.0, min(wake) - time.monotonic()) if wake else None
+        ready = wait_readable(watch, timeout, [stdout] if stdout.pending else ())
+        t_ready = time.monotonic()
+        if stdout.pending and not stdout.flush():
+            break  # Waybar closed pipe
+        if waker in ready:
+            waker.drain()
+        if DUMP:
+            DUMP = False
+            stats.dump_now()
+        if pub is not None and pub.handle(ready):
+            if cava.set_framerate(max(FPS, pub.demand)) and PEAKS is not None:
+                PEAKS.set_timing(*peak_timing(cava.framerate))
+            stats.set("framerate", cava.framerate)
+            if cava.set_bars(max(BARS, pub.bars_demand)):
+                # new frame size: respawn cava and read it with a fresh reader
+                # (a cava that is down picks it up on its next start)
+                stats.set("bars", cava.bars)
+                if frames is not None:
+                    cava.stop()
+                    frames = None
+                    if not suspended:
+                        spawn(t_ready)
+                    stats.incr("cava_restarts")
+        if respawn_at is not None and t_ready >= respawn_at:
+            spawn(t_ready)
+        elif (
+            STALL_S > 0
+            and live
+            and frames not in ready
+            and t_ready - last_frame >= STALL_S
+        ):
+            down(t_ready, "cava_stalls")
+        if frames is not None and frames in ready:
+            try:
+                key = on_frame(t_ready)
+            except EOFError:
+                down(t_ready, "cava_exits")
+                key = None
+            # Same glyphs and media state as what each output already has:
+            # skip rendering, serialization and I/O altogether
+            offer(key, t_ready)
+
+        # Nothing Playing for a while: suspend cava until something is.
+        # Meanwhile a player can still vanish or stop (blank the bars) or
+        # pause again (flat bars), and the flat frame has to follow.
+        if suspended:
+            if _MPRIS in ready or (poll_at is not None and t_ready >= poll_at):
+                poll_at = t_ready + SUSPEND_POLL
+                active, playing = media_state()
+                if playing:
+                    resume(t_ready)
+                elif published_key is not None and active != published_key[1]:
+                    flat(t_ready)
+        elif SUSPEND != "off":
+            if media_state()[1]:
+                quiet_since = None
+            elif quiet_since is None:
+                quiet_since = t_ready
+            elif t_ready - quiet_since >= SUSPEND_AFTER:
+                suspend(t_ready)
+
+        # Grid point reached: emit the newest pending state, once
+        if deadline is None or time.monotonic() < deadline:
+            continue
+        deadline = None
+        if pending is None:
+            continue
+        now = time.monotonic()
+        grid.fire(now)
+        key, pending = pending, None
+        stats.observe("emit_jitter", grid.jitter)
+        if grid.interval is not None:
+            stats.observe("emit_interval", grid.interval)
+
+        levels, active = key
+        emit = key != emitted_key
+        sink = now - last_sink >= SINK_INTERVAL and key != sink_key
+        if not (emit or sink):
+            continue
+
+        stage.start()
+        text = RENDERER.text_of(levels) if active else ""
+        payload = {"text": text, "class": CLASS_NAME}
+        stage.lap("render")
+        line = LINES.encode(payload)  # same bytes for the sink and stdout
+        stage.lap("encode")
+
+        # The file sink is only for late joiners / non-ring readers now
+        if sink:
+            last_sink = now
+            sink_key = key
             try:
-                atomic_write(SINK_PATH, json.dumps(payload))
+                atomic_write(SINK_PATH, line)
             except Exception:
                 pass
+            stage.lap("sink")
 
-            if not safe_write_line(payload):  # Waybar closed pipe
+        if emit:
+            emitted_key = key
+            dropped = stdout.dropped
+            if not stdout.write(line):  # Waybar closed pipe
                 break
-
-        # Terminate AFTER the loop
-        try:
-            proc.terminate()
-            proc.wait(timeout=1.0)
-        except Exception:
-            try:
-                proc.kill()
-            except Exception:
-                pass
+            stage.lap("stdout")
+            stats.incr("frames_emitted")
+            stats.incr("stdout_dropped", stdout.dropped - dropped)
+            stats.observe("pipe_to_stdout", time.monotonic() - t_pending)
+        stats.maybe_dump(now)
+
+    stdout.close()
+    if ring is not None:
+        ring.close()
+    if pub is not None:
+        pub.close()
+    waker.close()
+    stats.dump()
+
+    # Terminate AFTER the loop
+    cava.close()
 
     return 0
 
 
+def follower_payload(data: bytes):
+    """Our payload for one frame from the feed."""
+    if spectrum.is_record(data):
+        flags, bars, mags = spectrum.decode(data)
+        if not flags & spectrum.FLAG_ACTIVE:
+            if PEAKS is not None:
+                PEAKS.clear()
+            return {"text": "", "class": CLASS_NAME}
+        levels = RENDERER.levels_of(RESAMPLE(mags, bars))
+        if PEAKS is not None:
+            levels = PEAKS(levels)
+        return {"text": RENDERER.text_of(levels), "class": CLASS_NAME}
+    # JSON line from the sink of an older producer: already rendered. The
+    # sink is shared with media_waybar, whose lines (title, tooltip, alt)
+    # are not ours to show: only a bare {text, class} line of our class is.
+    payload = json.loads(data)
+    if payload.keys() != {"text", "class"} or payload["class"] != CLASS_NAME:
+        return {"text": "", "class": CLASS_NAME}
+    return payload if is_media_active() else {"text": "", "class": CLASS_NAME}
+
+
+def master_bars(data) -> int:
+    """Bar count of the producer's spectrum in `data`; 0 if unknown."""
+    try:
+        return spectrum.decode(data)[1] if data and spectrum.is_record(data) else 0
+    except ValueError:
+        return 0
+
+
 def follower():
-    last_mtime = 0.0
-    last_payload = None
-    sleep_s = max(0.002, 0.5 / max(FPS, 1))  # poll ~2x producer FPS
+    poll_s = max(0.002, 0.5 / max(FPS, 1))  # fallback poll ~2x producer FPS
+    feed = FrameFeed(SOCK_PATH, RING_PATH, SINK_PATH, poll_s, fps=FPS, bars=BARS)
 
     # Always print one line immediately
+    data = None
     try:
-        with open(SINK_PATH, "r") as f:
-            line = f.readline().strip()
-            last_payload = (
-                json.loads(line) if line else {"text": "", "class": CLASS_NAME}
-            )
+        data = feed.first()
+        last_payload = (
+            follower_payload(data) if data else {"text": "", "class": CLASS_NAME}
+        )
     except Exception:
         last_payload = {"text": "", "class": CLASS_NAME}
     if not safe_write_line(last_payload):
         return 0
 
+    # The producer died or exited: take over the moment its lock is free.
+    # Our last line stays up until our own cava's first frame.
+    watch = LockWatch(LOCK_PATH)
+    last_data = data
     while not STOP:
+        if watch.held:
+            feed.close()
+            watch.close()
+            return producer(watch.file, last_payload, master_bars(last_data))
         try:
-            st = os.stat(SINK_PATH)
-            if st.st_mtime != last_mtime:
-                last_mtime = st.st_mtime
-                with open(SINK_PATH, "r") as f:
-                    line = f.readline().strip()
-                if line:
-                    payload = json.loads(line)
-                    if payload != last_payload:
-                        last_payload = payload
-                        out = (
-                            payload
-                            if is_media_active()
-                            else {"text": "", "class": CLASS_NAME}
-                        )
-                        if not safe_write_line(out):
-                            break
-        except FileNotFoundError:
-            pass
+            # Blocks until the producer pushes a frame (or a signal arrives);
+            # while caps are falling, the last frame repeats at FPS instead
+            tick = None if PEAKS is None or PEAKS.settled else 1.0 / FPS
+            data = feed.next(watch, timeout=tick)
+            if not data:
+                if tick is None or not last_data:
+                    continue
+                data = last_data
+            last_data = data
+            payload = follower_payload(data)
+            if payload != last_payload:
+                last_payload = payload
+                if not safe_write_line(payload):
+                    break
         except Exception:
             pass
 
-        time.sleep(sleep_s)
-
+    feed.close()
     return 0
 
 
@@ -10,12 +10,18 @@ import sys
 import time
 from pathlib import Path
 
+from lib import procs
+
 # ---- knobs (override via env) ----
 TTL_MIN = int(os.environ.get("UPDATES_TTL_MIN", "30"))  # refresh cache every N minutes
 SHOW_ZERO = (
     os.environ.get("UPDATES_SHOW_ZERO", "0") == "1"
 )  # show "0" instead of hiding
 
+CMD_TIMEOUT = int(
+    os.environ.get("UPDATES_TIMEOUT", "300")
+)  # seconds before dnf / rpm-ostree is given up on
+
 RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
 CACHE = Path(RUNTIME_DIR) / "fedora_updates.cache.json"
 
@@ -24,10 +30,20 @@ def cmd_exists(c: str) -> bool:
     return shutil.which(c) is not None
 
 
-def run(cmd):
-    return subprocess.run(
-        cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
-    )
+def run(cmd, name):
+    # None when the command is missing or hangs past CMD_TIMEOUT; `name` is
+    # what lib/procs counts it under
+    try:
+        return procs.run(
+            cmd,
+            name,
+            CMD_TIMEOUT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
 
 
 def count_dnf_updates():
@@ -35,8 +51,8 @@ def count_dnf_updates():
     dnf = "dnf5" if cmd_exists("dnf5") else "dnf"
     # Fast and parseable: list only upgradable packages
     # -q: quiet; list --upgrades prints table-like lines after the header
-    res = run([dnf, "-q", "list", "--upgrades"])
-    if res.returncode not in (
+    res = run([dnf, "-q", "list", "--upgrades"], f"{dnf} list")
+    if res is None or res.returncode not in (
         0,
         100,
     ):  # 100 can be "updates available" for some dnf ops
@@ -60,8 +76,11 @@ def count_dnf_updates():
 
 def count_rpm_ostree_updates():
     # rpm-ostree upgrade --check returns JSON-ish lines on newer versions
-    res = run(["rpm-ostree", "upgrade", "--check"])
-    if res.returncode not in (0, 77):  # 77 may mean no updates in some versions
+    res = run(["rpm-ostree", "upgrade", "--check"], "rpm-ostree upgrade")
+    if res is None or res.returncode not in (
+        0,
+        77,
+    ):  # 77 may mean no updates in some versions
         return None
     out = res.stdout.strip()
     # Simple heuristic: count "AvailableUpdate" lines or fallback to "updates:" counts if present
@@ -0,0 +1,2 @@
+# waybar/.config/waybar/scripts/lib/__init__.py
+# Shared helpers for the Waybar Python scripts (cava_waybar.py, media_waybar.py).
@@ -0,0 +1,29 @@
+# waybar/.config/waybar/scripts/lib/aio.py
+# Small asyncio helpers for the event-loop scripts.
+
+import asyncio
+
+
+async def readable(obj) -> None:
+    """Wait until `obj` (anything with a fileno()) is readable."""
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    fd = obj.fileno()
+
+    def _ready():
+        if not fut.done():
+            fut.set_result(None)
+
+    loop.add_reader(fd, _ready)
+    try:
+        await fut
+    finally:
+        loop.remove_reader(fd)
+
+
+async def sleep_until(deadline: float) -> None:
+    """Sleep until loop.time() reaches `deadline` (no-op if already past)."""
+    loop = asyncio.get_running_loop()
+    delay = deadline - loop.time()
+    if delay > 0:
+        await asyncio.sleep(delay)
@@ -0,0 +1,207 @@
+# waybar/.config/waybar/scripts/lib/cava.py
+# The cava child: generated config, spawn, live framerate changes, bar count
+# changes (hot restart), suspend/resume, restart backoff after crashes,
+# shutdown.
+
+import os
+import signal
+import subprocess
+import tempfile
+import time
+
+from lib import procs
+
+CONFIG_TEMPLATE = """
+[general]
+mode = normal
+framerate = {framerate}
+lower_cutoff_freq = 50
+higher_cutoff_freq = 12000
+bars = {bars}
+sensitivity = {sens}
+channels = {channels}
+
+[input]
+method = {method}
+
+[output]
+method = raw
+raw_target = /dev/stdout
+bit_format = {bit_format}
+channels = {channels}
+mono_option = average
+
+[smoothing]
+noise_reduction = 35
+integral = 90
+gravity = 95
+ignore = 2
+monstercat = 1.5
+""".strip()
+
+
+def config_text(bars, sens, channels, method, bit_format, framerate) -> str:
+    return CONFIG_TEMPLATE.format(
+        bars=bars,
+        sens=sens,
+        channels=channels,
+        method=method,
+        bit_format=bit_format,
+        framerate=max(1, int(framerate)),
+    )
+
+
+class CavaProcess:
+    """
+    cava running in raw mode with a temp config. The framerate can be changed
+    in place: the config is rewritten and cava re-reads it on SIGUSR1. A new
+    bar count changes the raw frame size, so that one needs a restart.
+    While nothing plays it can be suspended (SIGSTOP): no capture, no
+    analysis, no wakeups, and the pipe and audio stream stay open for an
+    instant resume.
+    """
+
+    def __init__(
+        self, bars, sens, channels, method, bit_format, framerate, preexec_fn=None
+    ):
+        self.settings = dict(
+            bars=bars,
+            sens=sens,
+            channels=channels,
+            method=method,
+            bit_format=bit_format,
+        )
+        self.framerate = max(1, int(framerate))
+        self.preexec_fn = preexec_fn
+        self.conf = tempfile.NamedTemporaryFile(
+            mode="w", prefix="cava_waybar.", suffix=".conf", delete=True
+        )
+        self.proc = None
+        self.started_at = 0.0
+        self.suspended = False
+        self._write_conf()
+
+    def _write_conf(self) -> None:
+        self.conf.seek(0)
+        self.conf.truncate()
+        self.conf.write(config_text(framerate=self.framerate, **self.settings))
+        self.conf.flush()
+
+    @property
+    def bars(self) -> int:
+        return self.settings["bars"]
+
+    @property
+    def stdout(self):
+        return self.proc.stdout if self.proc is not None else None
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None
+
+    def start(self):
+        """Spawn cava; returns its unbuffered stdout pipe, or None if it can't run."""
+        try:
+            self.proc = procs.popen(
+                ["cava", "-p", self.conf.name],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=0,
+                preexec_fn=self.preexec_fn,
+            )
+        except OSError:
+            self.proc = None
+            return None
+        self.started_at = time.monotonic()
+        self.suspended = False
+        return self.proc.stdout
+
+    def set_framerate(self, fps) -> bool:
+        """Retarget cava's framerate; True if it changed."""
+        fps = max(1, int(fps))
+        if fps == self.framerate:
+            return False
+        self.framerate = fps
+        self._write_conf()
+        if self.proc is not None and self.proc.poll() is None:
+            try:
+                os.kill(self.proc.pid, signal.SIGUSR1)  # cava: reload config
+            except OSError:
+                pass
+        return True
+
+    def set_bars(self, bars) -> bool:
+        """Retarget the bar count for the next start(); True if it changed."""
+        bars = max(1, int(bars))
+        if bars == self.bars:
+            return False
+        self.settings["bars"] = bars
+        self._write_conf()
+        return True
+
+    def suspend(self) -> bool:
+        """SIGSTOP cava; True if it is suspended now."""
+        if self.proc is not None and not self.suspended:
+            try:
+                os.kill(self.proc.pid, signal.SIGSTOP)
+            except OSError:
+                return False
+            self.suspended = True
+        return self.suspended
+
+    def resume(self) -> None:
+        if self.proc is not None and self.suspended:
+            try:
+                os.kill(self.proc.pid, signal.SIGCONT)
+            except OSError:
+                pass
+        self.suspended = False
+
+    def restart(self):
+        """Stop and respawn with the current config; returns the new stdout."""
+        self.stop()
+        return self.start()
+
+    def stop(self) -> None:
+        if self.proc is not None:
+            if self.proc.stdout is not None:
+                self.proc.stdout.close()
+            code = None
+            self.resume()  # a stopped process only acts on SIGTERM once continued
+            try:
+                self.proc.terminate()
+                code = self.proc.wait(timeout=1.0)
+            except Exception:
+                try:
+                    self.proc.kill()
+                except Exception:
+                    pass
+            procs.finished("cava", time.monotonic() - self.started_at, code)
+            self.proc = None
+
+    def close(self) -> None:
+        self.stop()
+        self.conf.close()
+
+
+class Backoff:
+    """
+    Delay before respawning a crashed cava: `first`, doubling per crash up to
+    `cap`. A child that ran for `stable` seconds before dying starts the
+    sequence over, so a sound server restart costs one short pause while a
+    cava that can't get audio at all settles at one attempt per `cap`.
+    """
+
+    def __init__(self, first: float = 0.25, cap: float = 30.0, stable: float = 10.0):
+        self.first = first
+        self.cap = max(cap, first)
+        self.stable = stable
+        self.delay = first
+
+    def next(self, uptime: float) -> float:
+        """Delay before the next start, after a child that lived `uptime` s."""
+        if uptime >= self.stable:
+            self.delay = self.first
+        delay = self.delay
+        self.delay = min(self.cap, self.delay * 2)
+        return delay
@@ -0,0 +1,520 @@
+# waybar/.config/waybar/scripts/lib/dbus.py
+# Minimal, dependency-free D-Bus client (session bus, unix sockets only).
+# Just enough of the wire protocol for MPRIS: method calls, replies,
+# signals, match rules and name ownership. No unix-fd passing.
+
+import os
+import select
+import socket
+import struct
+import time
+from collections import deque
+
+BUS_NAME = "org.freedesktop.DBus"
+BUS_PATH = "/org/freedesktop/DBus"
+BUS_IFACE = "org.freedesktop.DBus"
+
+METHOD_CALL, METHOD_RETURN, ERROR, SIGNAL = 1, 2, 3, 4
+NO_REPLY_EXPECTED = 0x1
+
+# header field codes → (attribute, signature)
+_FIELDS = {
+    1: ("path", "o"),
+    2: ("interface", "s"),
+    3: ("member", "s"),
+    4: ("error_name", "s"),
+    5: ("reply_serial", "u"),
+    6: ("destination", "s"),
+    7: ("sender", "s"),
+    8: ("signature", "g"),
+}
+
+# fixed-size types: code → (struct format, size/alignment)
+_FIXED = {
+    "y": ("B", 1),
+    "b": ("I", 4),
+    "n": ("h", 2),
+    "q": ("H", 2),
+    "i": ("i", 4),
+    "u": ("I", 4),
+    "x": ("q", 8),
+    "t": ("Q", 8),
+    "d": ("d", 8),
+    "h": ("I", 4),
+}
+_ALIGN = {"s": 4, "o": 4, "g": 1, "v": 1, "a": 4, "(": 8, "{": 8}
+_ALIGN.update({k: v[1] for k, v in _FIXED.items()})
+
+
+class DBusError(Exception):
+    """Error reply from the bus or a peer."""
+
+    def __init__(self, name: str, text: str = ""):
+        super().__init__(f"{name}: {text}" if text else name)
+        self.name = name
+
+
+# ── Signatures ──────────────────────────────────────────────────────────────
+def _type_end(sig: str, i: int) -> int:
+    c = sig[i]
+    if c == "a":
+        return _type_end(sig, i + 1)
+    if c in "({":
+        close = ")" if c == "(" else "}"
+        i += 1
+        while sig[i] != close:
+            i = _type_end(sig, i)
+        return i + 1
+    return i + 1
+
+
+def split_signature(sig: str):
+    """Split a signature into its complete types: 'sa{sv}as' → ['s', 'a{sv}', 'as']."""
+    out, i = [], 0
+    while i < len(sig):
+        j = _type_end(sig, i)
+        out.append(sig[i:j])
+        i = j
+    return out
+
+
+# ── Marshalling ─────────────────────────────────────────────────────────────
+class _Writer:
+    """Marshal values into a buffer whose offset 0 is 8-aligned in the message."""
+
+    def __init__(self, endian="<"):
+        self.e = endian
+        self.buf = bytearray()
+
+    def align(self, n: int) -> None:
+        self.buf += b"\0" * (-len(self.buf) % n)
+
+    def write(self, sig: str, value) -> None:
+        c = sig[0]
+        if c in _FIXED:
+            fmt, size = _FIXED[c]
+            self.align(size)
+            self.buf += struct.pack(self.e + fmt, int(value) if c == "b" else value)
+        elif c in "so":
+            data = value.encode()
+            self.align(4)
+            self.buf += struct.pack(self.e + "I", len(data)) + data + b"\0"
+        elif c == "g":
+            data = value.encode()
+            self.buf += bytes((len(data),)) + data + b"\0"
+        elif c == "v":
+            # variants are passed as (signature, value)
+            vsig, inner = value
+            self.write("g", vsig)
+            self.write(vsig, inner)
+        elif c == "a":
+            self.align(4)
+            at = len(self.buf)
+            self.buf += b"\0\0\0\0"
+            elem = sig[1:]
+            self.align(_ALIGN[elem[0]])
+            start = len(self.buf)
+            if elem[0] == "{":
+                ksig, vsig = split_signature(elem[1:-1])
+                for k, v in value.items():
+                    self.align(8)
+                    self.write(ksig, k)
+                    self.write(vsig, v)
+            else:
+                for item in value:
+                    self.write(elem, item)
+            struct.pack_into(self.e + "I", self.buf, at, len(self.buf) - start)
+        elif c == "(":
+            self.align(8)
+            for s, v in zip(split_signature(sig[1:-1]), value):
+                self.write(s, v)
+        else:
+            raise ValueError(f"unsupported D-Bus type {c!r}")
+
+
+class _Reader:
+    """Unmarshal values from a whole message buffer (offsets are absolute)."""
+
+    def __init__(self, buf, pos=0, endian="<"):
+        self.buf = buf
+        self.pos = pos
+        self.e = endian
+
+    def align(self, n: int) -> None:
+        self.pos += -self.pos % n
+
+    def read(self, sig: str):
+        c = sig[0]
+        if c in _FIXED:
+            fmt, size = _FIXED[c]
+            self.align(size)
+            (v,) = struct.unpack_from(self.e + fmt, self.buf, self.pos)
+            self.pos += size
+            return bool(v) if c == "b" else v
+        if c in "so":
+            self.align(4)
+            (n,) = struct.unpack_from(self.e + "I", self.buf, self.pos)
+            start = self.pos + 4
+            self.pos = start + n + 1
+            return bytes(self.buf[start : start + n]).decode("utf-8", "replace")
+        if c == "g":
+            n = self.buf[self.pos]
+            start = self.pos + 1
+            self.pos = start + n + 1
+            return bytes(self.buf[start : start + n]).decode("ascii")
+        if c == "v":
+            # variants are unwrapped to their plain value
+            return self.read(self.read("g"))
+        if c == "a":
+            self.align(4)
+            (n,) = struct.unpack_from(self.e + "I", self.buf, self.pos)
+            self.pos += 4
+            elem = sig[1:]
+            self.align(_ALIGN[elem[0]])
+            end = self.pos + n
+            if elem[0] == "{":
+                ksig, vsig = split_signature(elem[1:-1])
+                out = {}
+                while self.pos < end:
+                    self.align(8)
+                    k = self.read(ksig)
+                    out[k] = self.read(vsig)
+                return out
+            items = []
+            while self.pos < end:
+                items.append(self.read(elem))
+            return items
+        if c == "(":
+            self.align(8)
+            return tuple(self.read(s) for s in split_signature(sig[1:-1]))
+        raise ValueError(f"unsupported D-Bus type {c!r}")
+
+
+class Message:
+    """One D-Bus message; `body` is a tuple of unmarshalled arguments."""
+
+    __slots__ = (
+        "type",
+        "flags",
+        "serial",
+        "path",
+        "interface",
+        "member",
+        "error_name",
+        "reply_serial",
+        "destination",
+        "sender",
+        "signature",
+        "body",
+    )
+
+    def __init__(self, type_, **fields):
+        self.type = type_
+        self.flags = fields.pop("flags", 0)
+        self.serial = fields.pop("serial", 0)
+        self.body = tuple(fields.pop("body", ()))
+        self.signature = fields.pop("signature", "")
+        for attr, _sig in _FIELDS.values():
+            if attr != "signature":
+                setattr(self, attr, fields.pop(attr, None))
+        if fields:
+            raise TypeError(f"unknown message fields: {', '.join(fields)}")
+
+    def encode(self) -> bytes:
+        body = _Writer()
+        for s, v in zip(split_signature(self.signature), self.body):
+            body.write(s, v)
+        fields = []
+        for code, (attr, sig) in _FIELDS.items():
+            val = getattr(self, attr)
+            if val:
+                fields.append((code, (sig, val)))
+        head = _Writer()
+        for sig, val in (
+            ("y", ord("l")),
+            ("y", self.type),
+            ("y", self.flags),
+            ("y", 1),
+            ("u", len(body.buf)),
+            ("u", self.serial),
+            ("a(yv)", fields),
+        ):
+            head.write(sig, val)
+        head.align(8)
+        return bytes(head.buf + body.buf)
+
+    @classmethod
+    def decode(cls, buf):
+        """Return (message, size) for the first complete message in buf, else (None, 0)."""
+        if len(buf) < 16:
+            return None, 0
+        e = "<" if buf[0] == ord("l") else ">"
+        body_len, serial, fields_len = struct.unpack_from(e + "III", buf, 4)
+        body_at = 16 + fields_len + (-(16 + fields_len) % 8)
+        size = body_at + body_len
+        if len(buf) < size:
+            return None, 0
+        r = _Reader(buf, 12, e)
+        fields = {}
+        for code, val in r.read("a(yv)"):
+            if code in _FIELDS:
+                fields[_FIELDS[code][0]] = val
+        msg = cls(buf[1], flags=buf[2], serial=serial, **fields)
+        r.pos = body_at
+        msg.body = tuple(r.read(s) for s in split_signature(msg.signature))
+        return msg, size
+
+
+# ── Connection ──────────────────────────────────────────────────────────────
+def session_address() -> str:
+    addr = os.environ.get("DBUS_SESSION_BUS_ADDRESS")
+    if addr:
+        return addr
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+    return f"unix:path={runtime}/bus"
+
+
+def _connect_unix(address: str) -> socket.socket:
+    last = None
+    for entry in address.split(";"):
+        transport, _, params = entry.partition(":")
+        if transport != "unix":
+            continue
+        kv = dict(p.split("=", 1) for p in params.split(",") if "=" in p)
+        if "path" in kv:
+            target = kv["path"]
+        elif "abstract" in kv:
+            target = "\0" + kv["abstract"]
+        else:
+            continue
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            s.connect(target)
+            return s
+        except OSError as exc:
+            s.close()
+            last = exc
+    raise last or ConnectionError(f"no usable unix transport in {address!r}")
+
+
+class Connection:
+    """
+    Blocking-call / non-blocking-dispatch connection. Incoming signals and
+    method calls are handed to `handler(msg)` from `process()`; ones that
+    arrive while waiting for a reply are queued until the next `process()`.
+    `call_async()` replies are dispatched to their own callback the same way.
+    """
+
+    def __init__(self, address=None, handler=None, timeout=2.0):
+        self.handler = handler
+        self.timeout = timeout
+        self._serial = 0
+        self._buf = bytearray()
+        self._queue = deque()
+        self._replies = {}  # serial → (deadline, on_reply) of call_async()
+        self.sock = _connect_unix(address or session_address())
+        try:
+            self._auth()
+            self.sock.setblocking(False)
+            (self.unique_name,) = self.call(BUS_NAME, BUS_PATH, BUS_IFACE, "Hello")
+        except Exception:
+            self.sock.close()
+            raise
+
+    def _auth(self) -> None:
+        self.sock.settimeout(self.timeout)
+        uid = str(os.getuid()).encode().hex().encode()
+        self.sock.sendall(b"\0AUTH EXTERNAL " + uid + b"\r\n")
+        line = b""
+        while not line.endswith(b"\r\n"):
+            chunk = self.sock.recv(256)
+            if not chunk:
+                raise ConnectionError("bus closed during auth")
+            line += chunk
+        if not line.startswith(b"OK "):
+            raise ConnectionError(f"auth rejected: {line.strip()!r}")
+        self.sock.sendall(b"BEGIN\r\n")
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    # ── I/O ────────────────────────────────────────────────────────────────
+    def send(self, msg: Message) -> int:
+        self._serial += 1
+        msg.serial = self._serial
+        data = msg.encode()
+        view = memoryview(data)
+        while view:
+            try:
+                n = self.sock.send(view)
+            except BlockingIOError:
+                select.select([], [self.sock], [], self.timeout)
+                continue
+            view = view[n:]
+        return msg.serial
+
+    def _read(self, timeout) -> bool:
+        """Pull whatever is readable into the buffer; False on timeout."""
+        r, _, _ = select.select([self.sock], [], [], timeout)
+        if not r:
+            return False
+        try:
+            chunk = self.sock.recv(65536)
+        except BlockingIOError:
+            return False
+        if not chunk:
+            raise ConnectionError("bus connection closed")
+        self._buf += chunk
+        return True
+
+    def _next(self):
+        msg, size = Message.decode(self._buf)
+        if msg is not None:
+            del self._buf[:size]
+        return msg
+
+    # ── API ────────────────────────────────────────────────────────────────
+    def call(self, dest, path, iface, member, signature="", args=(), timeout=None):
+        """Invoke a method and return its reply body (tuple)."""
+        serial = self.send(
+            Message(
+                METHOD_CALL,
+                destination=dest,
+                path=path,
+                interface=iface,
+                member=member,
+                signature=signature,
+                body=args,
+            )
+        )
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            msg = self._next()
+            if msg is None:
+                left = deadline - time.monotonic()
+                if left <= 0 or not self._read(left):
+                    raise DBusError("org.freedesktop.DBus.Error.Timeout", member)
+                continue
+            if msg.reply_serial == serial and msg.type in (METHOD_RETURN, ERROR):
+                if msg.type == ERROR:
+                    text = (
+                        msg.body[0] if msg.body and isinstance(msg.body[0], str) else ""
+                    )
+                    raise DBusError(msg.error_name or "", text)
+                return msg.body
+            self._queue.append(msg)
+
+    def call_async(
+        self,
+        dest,
+        path,
+        iface,
+        member,
+        signature="",
+        args=(),
+        on_reply=None,
+        timeout=None,
+    ) -> int:
+        """
+        Send a method call without waiting. `on_reply(msg)` runs from a later
+        `process()` with the METHOD_RETURN or ERROR message, or with None once
+        `timeout` (default: the connection's) passes without one.
+        """
+        serial = self.send(
+            Message(
+                METHOD_CALL,
+                destination=dest,
+                path=path,
+                interface=iface,
+                member=member,
+                signature=signature,
+                body=args,
+            )
+        )
+        if on_reply is not None:
+            deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+            self._replies[serial] = (deadline, on_reply)
+        return serial
+
+    def emit(self, path, iface, member, signature="", args=()) -> None:
+        self.send(
+            Message(
+                SIGNAL,
+                path=path,
+                interface=iface,
+                member=member,
+                signature=signature,
+                body=args,
+            )
+        )
+
+    def reply(self, call: Message, signature="", args=()) -> None:
+        if call.flags & NO_REPLY_EXPECTED:
+            return
+        self.send(
+            Message(
+                METHOD_RETURN,
+                reply_serial=call.serial,
+                destination=call.sender,
+                signature=signature,
+                body=args,
+            )
+        )
+
+    def error(self, call: Message, name: str, text: str = "") -> None:
+        if call.flags & NO_REPLY_EXPECTED:
+            return
+        self.send(
+            Message(
+                ERROR,
+                reply_serial=call.serial,
+                destination=call.sender,
+                error_name=name,
+                signature="s",
+                body=(text,),
+            )
+        )
+
+    def add_match(self, rule: str) -> None:
+        self.call(BUS_NAME, BUS_PATH, BUS_IFACE, "AddMatch", "s", (rule,))
+
+    def request_name(self, name: str, flags: int = 0) -> int:
+        (res,) = self.call(
+            BUS_NAME, BUS_PATH, BUS_IFACE, "RequestName", "su", (name, flags)
+        )
+        return res
+
+    def process(self, timeout=0.0) -> int:
+        """Dispatch queued and readable messages to the handler; return how many."""
+        count = 0
+        if self._replies:
+            now = time.monotonic()
+            for serial, (deadline, on_reply) in list(self._replies.items()):
+                if deadline <= now:
+                    del self._replies[serial]
+                    on_reply(None)
+        while True:
+            while self._queue:
+                self._dispatch(self._queue.popleft())
+                count += 1
+            msg = self._next()
+            if msg is not None:
+                self._dispatch(msg)
+                count += 1
+                continue
+            if not self._read(timeout):
+                return count
+            timeout = 0.0
+
+    def _dispatch(self, msg: Message) -> None:
+        if msg.type in (METHOD_RETURN, ERROR) and msg.reply_serial in self._replies:
+            self._replies.pop(msg.reply_serial)[1](msg)
+            return
+        if self.handler is not None:
+            self.handler(msg)
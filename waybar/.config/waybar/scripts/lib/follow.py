@@ -0,0 +1,148 @@
+# waybar/.config/waybar/scripts/lib/follow.py
+# Follower-side frame source: pushed frames over the producer's socket when it
+# offers one, else the mmap ring, else the JSON sink file (older producers).
+# Plus the watch on the producer's lock that promotes a follower when it dies.
+
+import fcntl
+import os
+import threading
+
+from lib.pubsub import Subscriber, Waker, wait_readable
+from lib.ring import RingReader
+
+
+class FrameFeed:
+    """
+    `next()` blocks until the producer pushes a frame (zero wakeups while idle)
+    and returns its bytes, or None when woken by a signal / poll tick without
+    news. Without a publisher it polls the ring and sink every `poll_s`.
+    Socket and ring carry spectrum records (lib.spectrum); the sink file holds
+    the producer's own rendered JSON line.
+
+    Event-loop callers skip `next()`: they wait on `sub` themselves (or sleep
+    `poll_s` while it is not connected) and call the non-blocking `poll()`.
+    """
+
+    def __init__(
+        self,
+        sock_path: str,
+        ring_path: str,
+        sink_path: str,
+        poll_s: float,
+        fps=0,
+        bars=0,
+    ):
+        self.sink_path = sink_path
+        self.poll_s = poll_s
+        self.sub = Subscriber(sock_path, fps, bars)
+        self.ring = RingReader(ring_path)
+        self.waker = None  # only next() needs to wake on signals
+        self.last_seq = 0
+        self.last_mtime = 0.0
+
+    def first(self):
+        """Newest frame available right now (ring, then sink file), or None."""
+        got = self.ring.poll()
+        if got is not None:
+            self.last_seq, data = got
+            return data
+        try:
+            with open(self.sink_path, "rb") as f:
+                return f.readline().strip() or None
+        except OSError:
+            return None
+
+    def next(self, *also, timeout=None):
+        """
+        `also`: more objects whose readiness ends the wait (returns None);
+        `timeout` (s) bounds the wait too.
+        """
+        if self.waker is None:
+            self.waker = Waker()
+        if self.sub.connect():
+            ready = wait_readable([self.sub, self.waker, *also], timeout)
+            if self.waker in ready:
+                self.waker.drain()
+            if self.sub in ready:
+                return self.sub.recv_latest()
+            return None
+
+        # no publisher: poll, but still wake immediately on signals
+        poll_s = self.poll_s if timeout is None else min(self.poll_s, timeout)
+        if wait_readable([self.waker, *also], poll_s):
+            self.waker.drain()
+            return None
+        return self._poll_files()
+
+    def poll(self):
+        """Newest frame since the last call without blocking, or None."""
+        if self.sub.connect():
+            return self.sub.recv_latest()
+        return self._poll_files()
+
+    def _poll_files(self):
+        got = self.ring.poll(self.last_seq)
+        if got is not None:
+            self.last_seq, data = got
+            return data
+        if self.ring.live:
+            return None
+        try:
+            st = os.stat(self.sink_path)
+        except OSError:
+            return None
+        if st.st_mtime == self.last_mtime:
+            return None
+        self.last_mtime = st.st_mtime
+        try:
+            with open(self.sink_path, "rb") as f:
+                return f.readline().strip() or None
+        except OSError:
+            return None
+
+    def close(self) -> None:
+        self.sub.close()
+        self.ring.close()
+        if self.waker is not None:
+            self.waker.close()
+
+
+class LockWatch:
+    """
+    Waits for the producer's lock in a daemon thread, blocked in flock(): no
+    polling, and the kernel hands the lock to exactly one waiting follower
+    the moment the producer exits or dies. `fileno()` turns readable once
+    `file` (the locked lock file, our pid written) is ours.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+        self.r, self.w = os.pipe()
+        os.set_blocking(self.r, False)
+        threading.Thread(target=self._wait, daemon=True).start()
+
+    def _wait(self) -> None:
+        try:
+            f = open(self.path, "a")
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            f.truncate(0)
+            f.write(str(os.getpid()))
+            f.flush()
+        except OSError:
+            return
+        self.file = f
+        os.write(self.w, b"!")
+
+    def fileno(self) -> int:
+        return self.r
+
+    @property
+    def held(self) -> bool:
+        return self.file is not None
+
+    def close(self) -> None:
+        """Drop the wakeup pipe once the lock is ours (the thread is done)."""
+        if self.file is not None:
+            os.close(self.r)
+            os.close(self.w)
@@ -0,0 +1,110 @@
+# waybar/.config/waybar/scripts/lib/frames.py
+# Raw cava frames straight from the pipe into one preallocated buffer.
+
+import io
+import select
+
+
+class FrameReader:
+    """
+    Iterator over raw cava frames. Frames are read with readinto() into a
+    preallocated bytearray, so steady state allocates nothing: each step yields
+    a memoryview (`frame`, bytes) into that buffer whose contents are reused.
+    `values` is the matching cast('H'/'B') view for per-bar numeric access.
+
+    Consume a frame before advancing; copy it (bytes(frame)) to keep it.
+
+    With the pipe in non-blocking mode, `read_latest()` drains everything
+    queued in one readinto() and returns only the newest frame.
+    """
+
+    def __init__(self, stream, bars: int, bit_format: str = "16bit", depth: int = 16):
+        if isinstance(stream, int):
+            stream = io.FileIO(stream, "rb", closefd=False)
+        # unbuffered: a BufferedReader would hoard frames we never look at
+        self.raw = getattr(stream, "raw", stream)
+        code, width = ("H", 2) if bit_format == "16bit" else ("B", 1)
+        self.size = bars * width
+        self.buf = bytearray(self.size * depth)
+        self._capacity = len(self.buf)  # len() past 256 would be a new int per call
+        whole = memoryview(self.buf)
+        self._whole = whole
+        # per-slot views, built once so picking the newest frame is free
+        self._frames = [
+            whole[i * self.size : (i + 1) * self.size] for i in range(depth)
+        ]
+        self._values = [f.cast(code) for f in self._frames]
+        self.frame = self._frames[0]
+        self.values = self._values[0]
+        self.dropped = 0  # stale frames skipped by read_latest()
+
+    def fileno(self) -> int:
+        return self.raw.fileno()
+
+    def _finish(self, view, got: int) -> bool:
+        """Complete a partially read frame (the rest is already on its way)."""
+        while got < self.size:
+            try:
+                n = self.raw.readinto(view[got:])
+            except BlockingIOError:
+                n = None
+            if n is None:
+                select.select([self.raw], [], [], 1.0)
+                continue
+            if not n:
+                return False
+            got += n
+        return True
+
+    def read_frame(self) -> bool:
+        """Fill slot 0 with the next whole frame; False on EOF / short stream."""
+        frame = self.frame = self._frames[0]
+        self.values = self._values[0]
+        n = self.raw.readinto(frame)
+        if n == self.size:
+            return True
+        if not n:
+            return False
+        return self._finish(frame, n)  # rare: the pipe handed us part of a frame
+
+    def read_latest(self):
+        """
+        Non-blocking: drain every queued frame and return a view of the newest,
+        or None if nothing is pending. Raises EOFError when cava is gone.
+        """
+        newest = -1
+        while True:
+            try:
+                n = self.raw.readinto(self._whole)
+            except BlockingIOError:
+                n = None
+            if n is None:
+                break
+            if n == 0:
+                raise EOFError
+            tail = n % self.size
+            if tail:
+                # keep frame alignment: pull in the rest of the split frame
+                if not self._finish(self._frames[n // self.size], tail):
+                    raise EOFError
+                n += self.size - tail
+            if newest >= 0:
+                self.dropped += 1  # the previous pass's newest is stale now
+            newest = n // self.size - 1
+            if newest:
+                self.dropped += newest  # a new int once past 256: skip no-op adds
+            if n < self._capacity:
+                break  # pipe emptied; a full buffer means more may be queued
+        if newest < 0:
+            return None
+        self.frame = self._frames[newest]
+        self.values = self._values[newest]
+        return self.frame
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.read_frame():
+            raise StopIteration
+        return self.frame
@@ -0,0 +1,38 @@
+# waybar/.config/waybar/scripts/lib/jsonline.py
+# Waybar JSON lines without a full json.dumps per frame. Only the first field
+# ("text") changes from frame to frame; everything after it is encoded once
+# and reused as a byte template until one of those values changes.
+
+import json
+from json.encoder import encode_basestring_ascii as _escape
+
+
+class LineEncoder:
+    """
+    `encode(payload)` returns `(json.dumps(payload) + "\\n").encode()`, byte
+    for byte: same default separators, same ASCII escaping. The first value
+    is escaped on every call; the rest is compared (cheap when the caller
+    reuses the same objects) and re-encoded only when it changes.
+    """
+
+    def __init__(self):
+        self._rest = None
+        self._key = None
+        self._head = b""
+        self._tail = b""
+
+    def encode(self, payload: dict) -> bytes:
+        items = tuple(payload.items())
+        if not items or type(items[0][1]) is not str:
+            return (json.dumps(payload) + "\n").encode()
+        key, text = items[0]
+        if key != self._key:
+            self._key = key
+            self._head = ("{" + json.dumps(key) + ": ").encode()
+        rest = items[1:]
+        if rest != self._rest:
+            self._rest = rest
+            self._tail = (
+                "".join(f", {json.dumps(k)}: {json.dumps(v)}" for k, v in rest) + "}\n"
+            ).encode()
+        return self._head + _escape(text).encode() + self._tail
@@ -0,0 +1,361 @@
+# waybar/.config/waybar/scripts/lib/mpris.py
+# Resident MPRIS client: one session-bus connection, a live player table kept
+# current by PropertiesChanged/NameOwnerChanged, so callers never fork playerctl.
+# Positions are extrapolated locally and only re-read on Seeked, status/rate/
+# track changes, or after RESYNC_S.
+
+import time
+
+from lib.dbus import (
+    BUS_IFACE,
+    BUS_NAME,
+    BUS_PATH,
+    METHOD_RETURN,
+    SIGNAL,
+    Connection,
+    DBusError,
+)
+
+MPRIS_PREFIX = "org.mpris.MediaPlayer2."
+MPRIS_PATH = "/org/mpris/MediaPlayer2"
+ROOT_IFACE = "org.mpris.MediaPlayer2"
+PLAYER_IFACE = "org.mpris.MediaPlayer2.Player"
+PROPS_IFACE = "org.freedesktop.DBus.Properties"
+
+# playerctld proxies the "current" player; skip it like `playerctl -l` callers do
+IGNORED = {MPRIS_PREFIX + "playerctld"}
+
+RETRY_S = 5.0  # how long to wait before reconnecting to a lost bus
+RESYNC_S = 30.0  # re-read a playing position at least this often (drift)
+FETCH_S = 10.0  # background GetAll/GetNameOwner limit; nothing waits on them
+# A signal or reply whose body doesn't unpack as expected (or holds values of
+# the wrong type) is skipped, not allowed to take the caller down
+_MALFORMED = (ValueError, TypeError, IndexError, KeyError, AttributeError)
+
+
+class PositionClock:
+    """
+    Playback position extrapolated from its last report: pos + elapsed * rate
+    while playing, frozen otherwise. `stale()` says when to ask the player
+    again: never reported, invalidated, or older than `max_age`.
+    """
+
+    __slots__ = ("pos", "at", "rate", "playing", "max_age")
+
+    def __init__(self, max_age: float = RESYNC_S):
+        self.pos = None  # seconds at `at`
+        self.at = None  # monotonic time of the report; None = resync
+        self.rate = 1.0
+        self.playing = False
+        self.max_age = max_age
+
+    def sync(self, pos_s: float, now: float = None) -> None:
+        self.pos = pos_s
+        self.at = time.monotonic() if now is None else now
+
+    def invalidate(self) -> None:
+        self.at = None
+
+    def stale(self, now: float) -> bool:
+        return self.at is None or now - self.at > self.max_age
+
+    def position(self, now: float):
+        if self.pos is None:
+            return None
+        if not self.playing or self.at is None:
+            return self.pos
+        return max(0.0, self.pos + (now - self.at) * self.rate)
+
+
+class Player:
+    """Cached state of one MPRIS player."""
+
+    __slots__ = ("name", "owner", "identity", "status", "metadata", "clock")
+
+    def __init__(self, name: str, owner: str):
+        self.name = name  # well-known bus name
+        self.owner = owner  # unique name (signal sender)
+        self.identity = ""
+        self.status = ""  # Playing | Paused | Stopped | ""
+        self.metadata = {}
+        self.clock = PositionClock()
+
+    @property
+    def short_name(self) -> str:
+        """playerctl-style name: 'org.mpris.MediaPlayer2.spotify' → 'spotify'."""
+        return self.name[len(MPRIS_PREFIX) :].split(".instance")[0]
+
+    def _meta_str(self, key: str) -> str:
+        v = self.metadata.get(key, "")
+        if isinstance(v, list):
+            return ", ".join(str(x) for x in v)
+        return str(v) if v else ""
+
+    @property
+    def title(self) -> str:
+        return self._meta_str("xesam:title")
+
+    @property
+    def artist(self) -> str:
+        return self._meta_str("xesam:artist")
+
+    @property
+    def album(self) -> str:
+        return self._meta_str("xesam:album")
+
+    @property
+    def length_s(self):
+        us = self.metadata.get("mpris:length")
+        return us / 1_000_000.0 if isinstance(us, int) and us > 0 else None
+
+
+class MprisClient:
+    """
+    Lazily connects on first use and reconnects (at most every RETRY_S) if the
+    bus goes away. `pump()` drains pending signals and replies without
+    blocking: players that appear and properties a player invalidates are
+    fetched with asynchronous calls, so a slow or hung player only delays its
+    own entry. Every other accessor only reads the in-memory table.
+    """
+
+    def __init__(self, address=None):
+        self.address = address
+        self.conn = None
+        self.players = {}  # well-known name → Player, in discovery order
+        self._adding = {}  # well-known name → Player waiting for its GetAll
+        self._last_attempt = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self.conn is not None
+
+    def fileno(self) -> int:
+        return self.conn.fileno() if self.conn is not None else -1
+
+    # ── Connection lifecycle ───────────────────────────────────────────────
+    def _connect(self) -> bool:
+        now = time.monotonic()
+        if self._last_attempt and now - self._last_attempt < RETRY_S:
+            return False
+        self._last_attempt = now
+        try:
+            conn = Connection(self.address, handler=self._on_message)
+            conn.add_match(
+                f"type='signal',sender='{BUS_NAME}',interface='{BUS_IFACE}',"
+                f"member='NameOwnerChanged',arg0namespace='{ROOT_IFACE}'"
+            )
+            conn.add_match(
+                f"type='signal',interface='{PROPS_IFACE}',"
+                f"member='PropertiesChanged',path='{MPRIS_PATH}'"
+            )
+            conn.add_match(
+                f"type='signal',interface='{PLAYER_IFACE}',"
+                f"member='Seeked',path='{MPRIS_PATH}'"
+            )
+        except (OSError, DBusError):
+            return False
+        self.conn = conn
+        self.players = {}
+        self._adding = {}
+        try:
+            (names,) = conn.call(BUS_NAME, BUS_PATH, BUS_IFACE, "ListNames")
+            for name in sorted(names):
+                if name.startswith(MPRIS_PREFIX) and name not in IGNORED:
+                    self._add(name)
+        except (OSError, DBusError, *_MALFORMED):
+            self._drop()
+            return False
+        return True
+
+    def _drop(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = None
+        self.players = {}
+        self._adding = {}
+
+    def close(self) -> None:
+        self._drop()
+
+    def pump(self, timeout=0.0) -> bool:
+        """Apply pending bus signals. Returns False while the bus is unavailable."""
+        if self.conn is None and not self._connect():
+            return False
+        try:
+            self.conn.process(timeout)
+        except (OSError, DBusError):
+            self._drop()
+            return False
+        return True
+
+    # ── Player table ───────────────────────────────────────────────────────
+    def _get_all(self, p: Player, iface: str, on_props) -> None:
+        """Properties.GetAll in the background; `on_props(dict)` if it works."""
+
+        def on_reply(msg):
+            if msg is None or msg.type != METHOD_RETURN or msg.signature != "a{sv}":
+                on_props(None)
+                return
+            try:
+                on_props(msg.body[0])
+            except _MALFORMED:
+                pass
+
+        self.conn.call_async(
+            p.name, MPRIS_PATH, PROPS_IFACE, "GetAll", "s", (iface,), on_reply, FETCH_S
+        )
+
+    def _add(self, name: str, owner=None) -> None:
+        """Start fetching a player; it joins the table once its state arrives."""
+        p = Player(name, owner or "")
+        self._adding[name] = p
+
+        def on_player(props):
+            if self._adding.get(name) is not p:
+                return  # gone or replaced meanwhile
+            del self._adding[name]
+            if props is not None:  # else vanished or not a conforming player
+                self._apply(p, PLAYER_IFACE, props)
+                self.players[name] = p
+
+        def on_root(props):
+            if props is not None:
+                self._apply(p, ROOT_IFACE, props)
+
+        def on_owner(msg):
+            if self._adding.get(name) is not p:
+                return
+            if msg is None or msg.type != METHOD_RETURN or msg.signature != "s":
+                del self._adding[name]
+                return
+            p.owner = msg.body[0]
+            self._get_all(p, PLAYER_IFACE, on_player)
+            self._get_all(p, ROOT_IFACE, on_root)
+
+        if owner is None:
+            self.conn.call_async(
+                BUS_NAME,
+                BUS_PATH,
+                BUS_IFACE,
+                "GetNameOwner",
+                "s",
+                (name,),
+                on_owner,
+                FETCH_S,
+            )
+        else:
+            self._get_all(p, PLAYER_IFACE, on_player)
+            self._get_all(p, ROOT_IFACE, on_root)
+
+    @staticmethod
+    def _apply(p: Player, iface: str, props: dict) -> None:
+        if iface == PLAYER_IFACE:
+            clock = p.clock
+            # status, rate or track changes make the extrapolation unsafe
+            if "PlaybackStatus" in props:
+                if props["PlaybackStatus"] != p.status:
+                    clock.invalidate()
+                p.status = props["PlaybackStatus"]
+                clock.playing = p.status == "Playing"
+            if "Rate" in props:
+                rate = float(props["Rate"])
+                if rate != clock.rate:
+                    clock.invalidate()
+                clock.rate = rate
+            if "Metadata" in props:
+                meta = props["Metadata"]
+                if not isinstance(meta, dict):
+                    meta = {}
+                if meta.get("mpris:trackid") != p.metadata.get("mpris:trackid"):
+                    clock.invalidate()
+                p.metadata = meta
+            if isinstance(props.get("Position"), int):
+                clock.sync(props["Position"] / 1_000_000.0)
+        elif iface == ROOT_IFACE and "Identity" in props:
+            p.identity = props["Identity"]
+
+    def _on_message(self, msg) -> None:
+        if msg.type != SIGNAL:
+            return
+        try:
+            self._on_signal(msg)
+        except _MALFORMED:
+            pass
+
+    def _on_signal(self, msg) -> None:
+        if msg.member == "NameOwnerChanged" and msg.interface == BUS_IFACE:
+            if msg.signature != "sss":
+                return
+            name, _old, new = msg.body
+            if not name.startswith(MPRIS_PREFIX) or name in IGNORED:
+                return
+            self.players.pop(name, None)
+            self._adding.pop(name, None)
+            if new:
+                self._add(name, new)
+        elif msg.member == "Seeked" and msg.interface == PLAYER_IFACE:
+            if msg.signature != "x":
+                return
+            for p in self.players.values():
+                if p.owner == msg.sender:
+                    p.clock.sync(msg.body[0] / 1_000_000.0)
+        elif msg.member == "PropertiesChanged" and msg.path == MPRIS_PATH:
+            if msg.signature != "sa{sv}as":
+                return
+            iface, changed, invalidated = msg.body
+            for p in list(self.players.values()):
+                if p.owner != msg.sender:
+                    continue
+                self._apply(p, iface, changed)
+                if invalidated:
+                    self._refresh(p, iface)
+
+    def _refresh(self, p: Player, iface: str) -> None:
+        """Re-read `iface` of a player after it invalidated properties."""
+
+        def on_props(props):
+            if props is not None and self.players.get(p.name) is p:
+                self._apply(p, iface, props)
+
+        self._get_all(p, iface, on_props)
+
+    # ── Queries (cached, never block) ──────────────────────────────────────
+    def any_active(self) -> bool:
+        """True if any player reports Playing or Paused."""
+        return any(p.status in ("Playing", "Paused") for p in self.players.values())
+
+    def any_playing(self) -> bool:
+        return any(p.status == "Playing" for p in self.players.values())
+
+    def active_player(self):
+        """Prefer a Playing player, else Paused, else the first one; None if none."""
+        players = list(self.players.values())
+        for want in ("Playing", "Paused"):
+            for p in players:
+                if p.status == want:
+                    return p
+        return players[0] if players else None
+
+    def position_s(self, p: Player):
+        """
+        Current position in seconds, extrapolated locally. Only a stale clock
+        costs a Properties.Get round trip (no fork either way).
+        """
+        now = time.monotonic()
+        if p.clock.stale(now) and self.conn is not None:
+            try:
+                (us,) = self.conn.call(
+                    p.name,
+                    MPRIS_PATH,
+                    PROPS_IFACE,
+                    "Get",
+                    "ss",
+                    (PLAYER_IFACE, "Position"),
+                )
+            except (OSError, DBusError):
+                us = None
+            if isinstance(us, int):
+                p.clock.sync(us / 1_000_000.0, now)
+        pos = p.clock.position(now)
+        length = p.length_s
+        return min(pos, length) if pos is not None and length else pos
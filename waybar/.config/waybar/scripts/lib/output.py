@@ -0,0 +1,72 @@
+# waybar/.config/waybar/scripts/lib/output.py
+# Non-blocking line output to Waybar. A stalled reader must never freeze the
+# producer (and with it cava's pipe, the ring and every follower), so stdout
+# keeps one line in flight plus one slot where the newest line wins.
+
+import os
+import stat
+
+
+class LatestLineWriter:
+    """
+    Lines are written whole: a line the pipe only partly took is finished
+    before anything else goes out. While one is in flight at most one more
+    waits; a newer line replaces it and the replaced one counts in `dropped`.
+    Call `flush()` when `fileno()` turns writable while `pending`, and
+    `close()` when done.
+
+    Only a pipe or socket (what Waybar hands us) is switched to non-blocking:
+    the mode lives on the open file description, which a terminal shares
+    with the shell that started us, so a tty or file is left as it is.
+    """
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self._restore = None  # blocking mode to put back on close()
+        mode = os.fstat(fd).st_mode
+        if stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode):
+            self._restore = os.get_blocking(fd)
+            os.set_blocking(fd, False)
+        self._inflight = None  # unwritten rest of the current line
+        self._next = None
+        self.dropped = 0
+        self.written = 0
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def close(self) -> None:
+        """Put the fd's blocking mode back; a line still pending is dropped."""
+        if self._restore is not None:
+            try:
+                os.set_blocking(self.fd, self._restore)
+            except OSError:
+                pass
+            self._restore = None
+
+    @property
+    def pending(self) -> bool:
+        return self._inflight is not None or self._next is not None
+
+    def write(self, line: bytes) -> bool:
+        """Queue `line` (latest wins) and push what fits; False if the reader left."""
+        if self._next is not None:
+            self.dropped += 1
+        self._next = line
+        return self.flush()
+
+    def flush(self) -> bool:
+        while True:
+            if self._inflight is None:
+                if self._next is None:
+                    return True
+                self._inflight, self._next = memoryview(self._next), None
+            try:
+                n = os.write(self.fd, self._inflight)
+            except (BlockingIOError, InterruptedError):
+                return True
+            except OSError:
+                return False  # EPIPE and friends: Waybar closed our pipe
+            self._inflight = self._inflight[n:] if n < len(self._inflight) else None
+            if self._inflight is None:
+                self.written += 1
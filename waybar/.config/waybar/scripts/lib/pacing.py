@@ -0,0 +1,85 @@
+# waybar/.config/waybar/scripts/lib/pacing.py
+# When to emit: full rate while the spectrum moves, an idle rate while quiet,
+# and always on a fixed grid of deadlines.
+
+import math
+import time
+
+
+class IdleGovernor:
+    """
+    Watches quantized frames (one level byte per bar). After `after` frames
+    in a row that are all-zero or identical to the previous one, the output
+    drops to `idle_fps` (0 = only when something visible changes: the levels
+    or `active`, which blanks or shows the bars). The first frame with signal
+    that differs from the previous one restores full rate.
+    """
+
+    def __init__(self, idle_fps: float = 1.0, after: int = 5):
+        self.idle_period = 1.0 / idle_fps if idle_fps > 0 else None
+        self.after = max(1, after)
+        self.quiet = 0
+        self._prev = None
+        self._sent = None
+        self._sent_active = None
+        self._sent_at = 0.0
+
+    @property
+    def idle(self) -> bool:
+        return self.quiet >= self.after
+
+    def update(self, levels: bytes) -> None:
+        if levels == self._prev or not levels.strip(b"\0"):
+            self.quiet += 1
+        else:
+            self.quiet = 0
+        self._prev = levels
+
+    def due(self, now: float, levels: bytes, active: bool = True) -> bool:
+        """Should this frame go downstream? Always, unless we are idle."""
+        if not self.idle:
+            return True
+        if levels != self._sent or active != self._sent_active:
+            return True  # the last thing shown must match what we settled on
+        return self.idle_period is not None and now - self._sent_at >= self.idle_period
+
+    def sent(self, now: float, levels: bytes, active: bool = True) -> None:
+        self._sent = levels
+        self._sent_active = active
+        self._sent_at = now
+
+
+class EmitGrid:
+    """
+    Emit deadlines on a fixed monotonic grid t0 + k / fps. Output only goes
+    out on grid points, so spacing stays even whatever rate frames arrive at
+    (cava at 25 fps into FPS=12 no longer aliases into 40/80 ms steps). The
+    caller arms it with `deadline(now)` only while it has something new to
+    send, so a quiet producer takes no timer wakeups.
+
+    `fire(now)` records the achieved `interval` (between emits on adjacent
+    grid points, else None) and `jitter` (how late the emit was).
+    """
+
+    def __init__(self, fps: float, t0: float = None):
+        self.period = 1.0 / max(fps, 1)
+        self.t0 = time.monotonic() if t0 is None else t0
+        self.k = -1  # grid index of the last emit
+        self._next = None
+        self.last = None
+        self.interval = None
+        self.jitter = 0.0
+
+    def deadline(self, now: float) -> float:
+        """The first grid point at or after `now` that has not fired yet."""
+        k = max(self.k + 1, math.ceil((now - self.t0) / self.period))
+        self._next = k
+        return self.t0 + k * self.period
+
+    def fire(self, now: float) -> None:
+        k = self._next if self._next is not None else self.k + 1
+        self.jitter = max(0.0, now - (self.t0 + k * self.period))
+        self.interval = (
+            now - self.last if self.last is not None and k == self.k + 1 else None
+        )
+        self.k, self.last, self._next = k, now, None
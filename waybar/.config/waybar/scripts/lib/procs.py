@@ -0,0 +1,203 @@
+# waybar/.config/waybar/scripts/lib/procs.py
+# Accounting for every external command the scripts run (playerctl, cava,
+# dnf, rpm-ostree): per command name, processes started, spawn failures,
+# timeouts, exit codes and wall time as a log-bucket histogram. Totals from
+# every process (producers, followers, one-shot scripts) are folded into one
+# JSON file under XDG_RUNTIME_DIR, at most every FLUSH_S and at exit, with
+# runs per minute since the file was created, so fork budgets can be checked.
+
+import atexit
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from lib.stats import Histogram
+
+RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+PATH = os.environ.get("WAYBAR_CMD_STATS", f"{RUNTIME_DIR}/waybar_commands.json")
+FLUSH_S = float(os.environ.get("WAYBAR_CMD_STATS_INTERVAL", "5"))
+SCRIPT = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else "python"
+
+
+class Command:
+    """Counts for one command name."""
+
+    __slots__ = ("runs", "errors", "timeouts", "codes", "wall")
+
+    def __init__(self):
+        self.runs = 0  # processes started
+        self.errors = 0  # could not be started (missing binary, fork failure)
+        self.timeouts = 0  # killed after their timeout
+        self.codes = {}  # exit code → count; negative = killed by that signal
+        self.wall = Histogram()  # start → exit (lifetime for long-lived children)
+
+    def summary(self) -> dict:
+        return {
+            "runs": self.runs,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "exit_codes": {str(k): v for k, v in sorted(self.codes.items())},
+            "wall": self.wall.summary(),
+        }
+
+
+_LOCK = threading.Lock()  # media_waybar forks from executor threads
+_TOTALS = {}  # name → Command, this process since start
+_PENDING = {}  # name → Command, not yet folded into PATH
+_next_flush = 0.0
+
+
+def _note(name: str, apply) -> None:
+    global _next_flush
+    with _LOCK:
+        for table in (_TOTALS, _PENDING):
+            c = table.get(name)
+            if c is None:
+                c = table[name] = Command()
+            apply(c)
+    now = time.monotonic()
+    if now >= _next_flush:
+        _next_flush = now + FLUSH_S
+        flush()
+
+
+def started(name: str) -> None:
+    def apply(c):
+        c.runs += 1
+
+    _note(name, apply)
+
+
+def failed_to_start(name: str) -> None:
+    def apply(c):
+        c.errors += 1
+
+    _note(name, apply)
+
+
+def finished(name: str, seconds: float, code=None, timed_out=False) -> None:
+    """A child of `name` ended after `seconds`; `code` None if unknown."""
+
+    def apply(c):
+        c.wall.add(seconds)
+        if timed_out:
+            c.timeouts += 1
+        elif code is not None:
+            c.codes[code] = c.codes.get(code, 0) + 1
+
+    _note(name, apply)
+
+
+def run(argv, name: str = None, timeout: float = None, check=False, **kw):
+    """subprocess.run(), accounted under `name` (default: the binary's name)."""
+    name = name or os.path.basename(argv[0])
+    t0 = time.monotonic()
+    try:
+        res = subprocess.run(argv, timeout=timeout, **kw)
+    except subprocess.TimeoutExpired:
+        started(name)
+        finished(name, time.monotonic() - t0, timed_out=True)
+        raise
+    except OSError:
+        failed_to_start(name)
+        raise
+    started(name)
+    finished(name, time.monotonic() - t0, res.returncode)
+    if check:
+        res.check_returncode()
+    return res
+
+
+def check_output(argv, name: str = None, timeout: float = None, **kw) -> bytes:
+    """subprocess.check_output(), accounted under `name`."""
+    return run(argv, name, timeout, check=True, stdout=subprocess.PIPE, **kw).stdout
+
+
+def popen(argv, name: str = None, **kw):
+    """subprocess.Popen() for a long-lived child; report its end to finished()."""
+    name = name or os.path.basename(argv[0])
+    try:
+        proc = subprocess.Popen(argv, **kw)
+    except OSError:
+        failed_to_start(name)
+        raise
+    started(name)
+    return proc
+
+
+def summary() -> dict:
+    """This process's totals, for its stats file."""
+    with _LOCK:
+        return {name: c.summary() for name, c in sorted(_TOTALS.items())}
+
+
+def _fold(doc: dict, name: str, c: Command, now: float) -> None:
+    e = doc["commands"].setdefault(
+        name,
+        {
+            "runs": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "exit_codes": {},
+            "scripts": {},
+            "buckets": {},
+            "total_s": 0.0,
+        },
+    )
+    e["runs"] += c.runs
+    e["errors"] += c.errors
+    e["timeouts"] += c.timeouts
+    for code, n in c.codes.items():
+        e["exit_codes"][str(code)] = e["exit_codes"].get(str(code), 0) + n
+    e["scripts"][SCRIPT] = e["scripts"].get(SCRIPT, 0) + c.runs + c.errors
+    for i, n in enumerate(c.wall.counts):
+        if n:
+            e["buckets"][str(i)] = e["buckets"].get(str(i), 0) + n
+    e["total_s"] = round(e["total_s"] + c.wall.total, 6)
+
+    h = Histogram()
+    for i, n in e["buckets"].items():
+        h.counts[int(i)] = n
+        h.n += n
+    if h.n:
+        e["p50_ms"] = round(h.quantile(0.50) * 1e3, 3)
+        e["p99_ms"] = round(h.quantile(0.99) * 1e3, 3)
+    minutes = max((now - doc["since"]) / 60.0, 1.0 / 60.0)
+    e["per_min"] = round((e["runs"] + e["errors"]) / minutes, 3)
+
+
+def flush() -> None:
+    """Fold what this process ran since the last flush into PATH."""
+    global _PENDING
+    if not PATH:
+        return
+    with _LOCK:
+        pending, _PENDING = _PENDING, {}
+    if not pending:
+        return
+    try:
+        with open(f"{PATH}.lock", "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            now = time.time()
+            try:
+                with open(PATH) as f:
+                    doc = json.load(f)
+            except (OSError, ValueError):
+                doc = {"since": now, "commands": {}}
+            for name, c in pending.items():
+                _fold(doc, name, c, now)
+            doc["updated"] = now
+            tmp = f"{PATH}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(doc, f, indent=1, sort_keys=True)
+                f.write("\n")
+            os.replace(tmp, PATH)
+    except OSError:
+        pass
+
+
+atexit.register(flush)
@@ -0,0 +1,249 @@
+# waybar/.config/waybar/scripts/lib/pubsub.py
+# Push transport from the cava producer to its followers over a Unix
+# SOCK_SEQPACKET socket: message boundaries are kept and every send is atomic,
+# so a frame either lands whole or (subscriber backed up) is skipped.
+
+import json
+import os
+import select
+import signal
+import socket
+import time
+
+RECONNECT_S = 1.0  # subscribers retry a missing publisher at most this often
+
+
+class _Sub:
+    """One connected follower and the frame rate / bar count it asked for."""
+
+    __slots__ = ("sock", "fps", "bars", "last_sent")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.fps = 0  # 0 until its hello arrives: send every frame
+        self.bars = 0
+        self.last_sent = 0.0
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+
+class Publisher:
+    """
+    Producer side: accepts subscribers and fans frames out to them, each at
+    most at the rate it announced in its hello ({"fps": N, "bars": B}).
+    `demand` is the highest rate and `bars_demand` the highest bar count any
+    subscriber asked for.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.subs = []
+        self.latest = None
+        self.skipped = 0  # frames not delivered because a subscriber was full
+        try:
+            os.unlink(path)  # stale socket from a dead producer; we hold the lock
+        except FileNotFoundError:
+            pass
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.sock.bind(path)
+        self.sock.listen(16)
+        self.sock.setblocking(False)
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    @property
+    def demand(self) -> int:
+        return max((s.fps for s in self.subs), default=0)
+
+    @property
+    def bars_demand(self) -> int:
+        return max((s.bars for s in self.subs), default=0)
+
+    def watch(self) -> list:
+        """Objects to add to the producer's select() set."""
+        return [self] + self.subs
+
+    def handle(self, ready) -> bool:
+        """Accept newcomers, read hellos, reap leavers; True if demand changed."""
+        before = (self.demand, self.bars_demand)
+        if self in ready:
+            self.accept()
+        for sub in [s for s in self.subs if s in ready]:
+            try:
+                msg = sub.sock.recv(512)
+            except (BlockingIOError, InterruptedError):
+                continue
+            except OSError:
+                msg = b""
+            if not msg:
+                self._drop(sub)
+                continue
+            try:
+                hello = json.loads(msg)
+                sub.fps = max(0, int(hello.get("fps", 0)))
+                sub.bars = max(0, int(hello.get("bars", 0)))
+            except (ValueError, AttributeError, TypeError):
+                pass
+        return (self.demand, self.bars_demand) != before
+
+    def accept(self) -> None:
+        """Take any pending connections; late joiners get the latest frame now."""
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            conn.setblocking(False)
+            if self.latest is not None:
+                try:
+                    conn.send(self.latest)
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    conn.close()
+                    continue
+            self.subs.append(_Sub(conn))
+
+    def _drop(self, sub: _Sub) -> None:
+        self.subs.remove(sub)
+        sub.sock.close()
+
+    def publish(
+        self, data: bytes, now: float = 0.0, slack: float = 0.0, force=False
+    ) -> None:
+        """
+        Send `data` to every subscriber that is due. `slack` (about half the
+        producer's frame period) keeps rate-limited subscribers from aliasing
+        down to half their rate on jittery frame arrival. `force` sends to all
+        of them: a last frame before the producer goes quiet must not be
+        skipped, nothing comes after it.
+        """
+        self.latest = data
+        for sub in list(self.subs):
+            if sub.fps and not force and now - sub.last_sent + slack < 1.0 / sub.fps:
+                continue
+            try:
+                sub.sock.send(data)
+                sub.last_sent = now
+            except BlockingIOError:
+                self.skipped += 1
+            except OSError:
+                self._drop(sub)
+
+    def close(self) -> None:
+        for sub in self.subs:
+            sub.sock.close()
+        self.subs = []
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class Subscriber:
+    """Follower side: connect lazily, then block in select() until frames arrive."""
+
+    def __init__(self, path: str, fps: int = 0, bars: int = 0):
+        self.path = path
+        self.fps = fps
+        self.bars = bars
+        self.sock = None
+        self._retry_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self.sock is not None
+
+    def fileno(self) -> int:
+        return self.sock.fileno() if self.sock is not None else -1
+
+    def connect(self) -> bool:
+        if self.sock is not None:
+            return True
+        now = time.monotonic()
+        if now < self._retry_at:
+            return False
+        self._retry_at = now + RECONNECT_S
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            s.connect(self.path)
+        except OSError:
+            s.close()
+            return False
+        try:
+            hello = {"fps": self.fps, "bars": self.bars}  # our demand
+            s.send(json.dumps(hello).encode())
+        except OSError:
+            s.close()
+            return False
+        s.setblocking(False)
+        self.sock = s
+        return True
+
+    def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+        self.sock = None
+
+    def recv_latest(self, bufsize: int = 65536):
+        """
+        Drain queued frames and return the newest one (bytes), or None if none
+        were queued. Closes the subscription when the publisher goes away.
+        """
+        latest = None
+        while self.sock is not None:
+            try:
+                data = self.sock.recv(bufsize)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self.close()
+                break
+            if not data:
+                self.close()
+                break
+            latest = data
+        return latest
+
+
+class Waker:
+    """
+    Self-pipe registered with signal.set_wakeup_fd so a blocking select()
+    returns as soon as SIGTERM/SIGINT arrive (PEP 475 would otherwise retry it).
+    """
+
+    def __init__(self):
+        self.r, self.w = os.pipe()
+        os.set_blocking(self.r, False)
+        os.set_blocking(self.w, False)
+        self._prev = signal.set_wakeup_fd(self.w, warn_on_full_buffer=False)
+
+    def fileno(self) -> int:
+        return self.r
+
+    def drain(self) -> None:
+        try:
+            while os.read(self.r, 64):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        signal.set_wakeup_fd(self._prev)
+        os.close(self.r)
+        os.close(self.w)
+
+
+def wait_readable(objs, timeout=None, writers=()):
+    """
+    select() on objects with a fileno(), skipping ones that are not open.
+    Returns the readable ones; `writers` turning writable only end the wait.
+    """
+    live = [o for o in objs if o is not None and o.fileno() >= 0]
+    r, _, _ = select.select(live, list(writers), [], timeout)
+    return r
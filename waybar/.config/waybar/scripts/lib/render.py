@@ -0,0 +1,172 @@
+# waybar/.config/waybar/scripts/lib/render.py
+# Raw cava frame → glyph string, via tables built once per style/bit depth/border.
+#
+#   8bit:  value byte ──bytes.translate──▶ level byte
+#   16bit: high byte of each little-endian sample ──bytes.translate──▶ level byte
+#          (quantized to 256 buckets, each mapped by its midpoint; the finest
+#          style has 8 levels, so the error is invisible)
+#   level bytes ──latin-1 decode + str.translate──▶ GAP-joined tokens
+#
+# With NumPy available and use_numpy=True, a whole 16bit frame is mapped
+# exactly with one vectorized take() instead.
+#
+# Peak caps (PeakHold) ride on the level bytes: each bar's code byte becomes
+# cap level << 4 | level, and the token table maps the codes with a cap above
+# the bar to a cap token, so text_of stays one str.translate.
+
+try:
+    import numpy as np
+except ImportError:  # optional
+    np = None
+
+
+def wrap_token(tok: str, border: str) -> str:
+    if border == "pipe":
+        return f"│{tok}│"
+    if border == "bracket":
+        return f"[{tok}]"
+    return tok
+
+
+def level_of(v: int, maxv: int, levels: int) -> int:
+    """Reference quantizer (the old val_to_token math)."""
+    idx = round((v / maxv) * (levels - 1))
+    return max(0, min(idx, levels - 1))
+
+
+class BarRenderer:
+    def __init__(
+        self,
+        glyphs,
+        bit_format="16bit",
+        gap="",
+        border="none",
+        use_numpy=False,
+        caps=None,
+    ):
+        self.glyphs = list(glyphs)
+        self.levels = len(self.glyphs)
+        self.bit16 = bit_format == "16bit"
+        self.maxv = 65535 if self.bit16 else 255
+        self.gap = gap
+        self.bytes_per_bar = 2 if self.bit16 else 1
+
+        levels, maxv = self.levels, self.maxv
+        if self.bit16:
+            self._byte_lut = bytes(
+                level_of(hi * 256 + 128, maxv, levels) for hi in range(256)
+            )
+        else:
+            self._byte_lut = bytes(level_of(v, maxv, levels) for v in range(256))
+
+        # level → GAP + token; the leading gap is sliced off after translate
+        self._tok_map = {
+            i: gap + wrap_token(g, border) for i, g in enumerate(self.glyphs)
+        }
+        self._gap_len = len(gap)
+
+        # PeakHold codes: a cap token where the cap is above the bar
+        if caps is not None:
+            if self.levels > PeakHold.MAX_LEVELS:
+                raise ValueError(f"peak caps need <= {PeakHold.MAX_LEVELS} levels")
+            for p, cap in enumerate(caps[: self.levels]):
+                self._tok_map[p << 4 | p] = self._tok_map[p]
+                for lv in range(p):
+                    self._tok_map[p << 4 | lv] = gap + wrap_token(cap, border)
+
+        self._np_lut = None
+        if use_numpy and np is not None:
+            self._np_lut = np.array(
+                [level_of(v, maxv, levels) for v in range(maxv + 1)], dtype=np.uint8
+            )
+            self._np_dtype = np.dtype("<u2" if self.bit16 else "u1")
+
+    def levels_of(self, frame) -> bytes:
+        """One level byte (0..levels-1) per bar for a raw little-endian frame."""
+        if self._np_lut is not None:
+            vals = np.frombuffer(frame, dtype=self._np_dtype)
+            return self._np_lut.take(vals).tobytes()
+        if self.bit16:
+            return bytes(frame[1::2]).translate(self._byte_lut)
+        return bytes(frame).translate(self._byte_lut)
+
+    def text_of(self, levels: bytes) -> str:
+        return levels.decode("latin-1").translate(self._tok_map)[self._gap_len :]
+
+    def render(self, frame) -> str:
+        """Raw frame (bytes/bytearray/memoryview) → GAP-joined glyph string."""
+        return self.text_of(self.levels_of(frame))
+
+
+class PeakHold:
+    """
+    Falling peak caps over level bytes, for all bars at once. A bar's cap
+    jumps to its level, holds for `hold` frames, then falls `decay`/16 of a
+    level per frame. The state is two Python ints with one byte lane per bar
+    (cap in 1/16 levels, frames left to hold): bit 7 of each lane is a guard,
+    so a subtraction that goes below zero only clears its own lane's guard,
+    which then masks saturation and max() for every bar in a handful of
+    big-int ops. No per-bar Python objects, no per-bar loop.
+
+    __call__(levels) -> code bytes for BarRenderer(caps=...); `settled` is
+    True once no cap shows above its bar.
+    """
+
+    MAX_LEVELS = 8  # level and cap level share a code byte, 3 bits each
+
+    def __init__(self, hold: int, decay: int):
+        self.settled = True
+        self._bars = -1
+        self.set_timing(hold, decay)
+
+    def set_timing(self, hold: int, decay: int) -> None:
+        """New hold (frames) and decay (1/16 level per frame); caps stay put."""
+        self.hold = max(0, min(int(hold), 127))
+        self.decay = max(1, min(int(decay), 127))
+        if self._bars >= 0:
+            self._hold = self._ones * self.hold
+            self._decay = self._ones * self.decay
+
+    def reset(self, bars: int) -> None:
+        self._bars = bars
+        ones = int.from_bytes(b"\x01" * bars, "little")
+        self._ones = ones
+        self._guard = ones << 7
+        self._low = ones * 0x7F
+        self._high = ones * 0x70
+        self._hold = ones * self.hold
+        self._decay = ones * self.decay
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop every cap (nothing is held or falling any more)."""
+        self._cap = 0
+        self._left = 0
+        self.settled = True
+
+    def __call__(self, levels: bytes) -> bytes:
+        if len(levels) != self._bars:
+            self.reset(len(levels))
+        guard = self._guard
+        lv = int.from_bytes(levels, "little")
+        cur = lv << 4
+
+        # Hold countdown, saturating at 0; lanes whose guard survives held
+        left = (self._left | guard) - self._ones
+        held = left & guard
+        left &= held - (held >> 7)
+        # The rest fall, saturating at 0
+        free = guard ^ held
+        cap = (self._cap | guard) - (self._decay & (free - (free >> 7)))
+        ok = cap & guard
+        cap &= ok - (ok >> 7)
+        # Bars at or above their cap push it up and restart the hold
+        up = ((cur | guard) - cap) & guard
+        up -= up >> 7
+        keep = self._low ^ up
+        self._cap = cap = (cur & up) | (cap & keep)
+        self._left = (self._hold & up) | (left & keep)
+
+        shown = cap & self._high
+        self.settled = shown == cur
+        return (shown | lv).to_bytes(self._bars, "little")
@@ -0,0 +1,226 @@
+# waybar/.config/waybar/scripts/lib/ring.py
+# mmap-backed frame ring in XDG_RUNTIME_DIR (tmpfs) shared by the cava producer
+# and its followers. One writer, many readers, per-slot seqlock.
+#
+# Layout (little endian):
+#   header  [0:64)   magic "CWRB", version, slots, slot_size, state, latest seq, pid
+#   slot i  [64 + i*slot_size)   seq u64 | length u32 | pad | data
+# A slot holding frame n has seq == 2n; the writer parks it at 2n-1 while copying.
+
+import mmap
+import os
+import struct
+import time
+
+MAGIC = b"CWRB"
+VERSION = 1
+HEADER_SIZE = 64
+SLOT_HEADER = 16
+
+STATE_LIVE = 1
+STATE_CLOSED = 2
+
+# magic, version, slots, slot_size, state, latest seq, writer pid
+_HDR = struct.Struct("<4sIIII4xQI")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_OFF_STATE = 16
+_OFF_LATEST = 24
+
+REOPEN_S = 1.0  # readers retry a missing/closed segment at most this often
+
+
+def _size(slots: int, slot_size: int) -> int:
+    return HEADER_SIZE + slots * slot_size
+
+
+class RingWriter:
+    """
+    Producer side. Reuses an existing segment with the same geometry so
+    followers keep their mapping and the sequence continues where the last
+    producer stopped; otherwise swaps in a fresh file and marks the old one
+    closed so readers remap.
+    """
+
+    def __init__(self, path: str, slots: int = 8, slot_size: int = 4096):
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.capacity = slot_size - SLOT_HEADER
+        self.mm = self._open()
+        self.seq = _U64.unpack_from(self.mm, _OFF_LATEST)[0]
+        _U32.pack_into(self.mm, _OFF_STATE, STATE_LIVE)
+
+    def _open(self) -> mmap.mmap:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        size = _size(self.slots, self.slot_size)
+        try:
+            fd = os.open(self.path, os.O_RDWR)
+            try:
+                if os.fstat(fd).st_size == size:
+                    mm = mmap.mmap(fd, size)
+                    magic, ver, slots, slot_size, *_ = _HDR.unpack_from(mm)
+                    if (magic, ver, slots, slot_size) == (
+                        MAGIC,
+                        VERSION,
+                        self.slots,
+                        self.slot_size,
+                    ):
+                        _HDR.pack_into(
+                            mm,
+                            0,
+                            MAGIC,
+                            VERSION,
+                            self.slots,
+                            self.slot_size,
+                            STATE_LIVE,
+                            _U64.unpack_from(mm, _OFF_LATEST)[0],
+                            os.getpid(),
+                        )
+                        return mm
+                    _U32.pack_into(mm, _OFF_STATE, STATE_CLOSED)
+                    mm.close()
+            finally:
+                os.close(fd)
+        except FileNotFoundError:
+            pass
+
+        tmp = f"{self.path}.tmp"
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, size)
+            mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        _HDR.pack_into(
+            mm,
+            0,
+            MAGIC,
+            VERSION,
+            self.slots,
+            self.slot_size,
+            STATE_LIVE,
+            0,
+            os.getpid(),
+        )
+        os.replace(tmp, self.path)
+        return mm
+
+    def publish(self, data: bytes) -> int:
+        """Store one frame; returns its sequence number."""
+        n = len(data)
+        if n > self.capacity:
+            raise ValueError(
+                f"frame of {n} bytes exceeds slot capacity {self.capacity}"
+            )
+        seq = self.seq + 1
+        off = HEADER_SIZE + ((seq - 1) % self.slots) * self.slot_size
+        mm = self.mm
+        _U64.pack_into(mm, off, 2 * seq - 1)
+        _U32.pack_into(mm, off + 8, n)
+        mm[off + SLOT_HEADER : off + SLOT_HEADER + n] = data
+        _U64.pack_into(mm, off, 2 * seq)
+        _U64.pack_into(mm, _OFF_LATEST, seq)
+        self.seq = seq
+        return seq
+
+    def close(self) -> None:
+        try:
+            _U32.pack_into(self.mm, _OFF_STATE, STATE_CLOSED)
+            self.mm.close()
+        except (ValueError, OSError):
+            pass
+
+
+class RingReader:
+    """
+    Follower side. `poll(last)` reads straight out of the mapping — no
+    syscalls — and returns (seq, data) for the newest frame after `last`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mm = None
+        self.slots = 0
+        self.slot_size = 0
+        self.ino = 0
+        self._retry_at = 0.0
+
+    def _open(self) -> bool:
+        now = time.monotonic()
+        if now < self._retry_at:
+            return False
+        self._retry_at = now + REOPEN_S
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            st = os.fstat(fd)
+            size = st.st_size
+            if size < HEADER_SIZE:
+                return False
+            mm = mmap.mmap(fd, size, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        magic, ver, slots, slot_size, *_ = _HDR.unpack_from(mm)
+        if magic != MAGIC or ver != VERSION or size < _size(slots, slot_size):
+            mm.close()
+            return False
+        self.mm, self.slots, self.slot_size = mm, slots, slot_size
+        self.ino = st.st_ino
+        return True
+
+    def _replaced(self) -> bool:
+        """Has a new segment taken our path? Checked at most every REOPEN_S."""
+        now = time.monotonic()
+        if now < self._retry_at:
+            return False
+        self._retry_at = now + REOPEN_S
+        try:
+            return os.stat(self.path).st_ino != self.ino
+        except OSError:
+            return True
+
+    def close(self) -> None:
+        if self.mm is not None:
+            self.mm.close()
+        self.mm = None
+
+    @property
+    def live(self) -> bool:
+        return (
+            self.mm is not None
+            and _U32.unpack_from(self.mm, _OFF_STATE)[0] == STATE_LIVE
+        )
+
+    def latest_seq(self) -> int:
+        if self.mm is None and not self._open():
+            return 0
+        return _U64.unpack_from(self.mm, _OFF_LATEST)[0]
+
+    def poll(self, last: int = 0):
+        """Return (seq, bytes) for the newest committed frame newer than `last`, else None."""
+        if self.mm is None and not self._open():
+            return None
+        mm = self.mm
+        if _U32.unpack_from(mm, _OFF_STATE)[0] == STATE_CLOSED:
+            # Producer exited: its successor reuses this segment and flips
+            # it live again, so keep the mapping unless the file was swapped
+            if self._replaced():
+                self.close()
+                self._retry_at = 0.0
+            return None
+        for _ in range(4):  # seqlock retries
+            seq = _U64.unpack_from(mm, _OFF_LATEST)[0]
+            if seq == last or seq == 0:
+                return None
+            off = HEADER_SIZE + ((seq - 1) % self.slots) * self.slot_size
+            s1 = _U64.unpack_from(mm, off)[0]
+            if s1 != 2 * seq:
+                continue
+            n = _U32.unpack_from(mm, off + 8)[0]
+            data = mm[off + SLOT_HEADER : off + SLOT_HEADER + n]
+            if _U64.unpack_from(mm, off)[0] == s1:
+                return seq, data
+        return None
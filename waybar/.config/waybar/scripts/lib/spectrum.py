@@ -0,0 +1,69 @@
+# waybar/.config/waybar/scripts/lib/spectrum.py
+# Versioned master-spectrum records shared through the ring and the socket.
+# One producer runs cava at the highest bar count anyone asked for and
+# publishes raw magnitudes; every subscriber resamples and styles locally.
+#
+# Record (little endian):
+#   magic "CWSP" | schema u8 | flags u8 | bits u8 (8|16) | pad u8 | bars u16
+#   then `bars` raw samples exactly as cava emitted them (u8 or u16 LE)
+
+import struct
+
+MAGIC = b"CWSP"
+SCHEMA = 1
+
+FLAG_ACTIVE = 0x1  # some MPRIS player is Playing or Paused
+
+_HEAD = struct.Struct("<4sBBBxH")
+HEAD_SIZE = _HEAD.size
+
+
+def encode(frame, bars: int, bit_format: str, flags: int = 0) -> bytes:
+    """Wrap one raw cava frame (bytes-like) into a record."""
+    bits = 16 if bit_format == "16bit" else 8
+    return _HEAD.pack(MAGIC, SCHEMA, flags, bits, bars) + bytes(frame)
+
+
+def is_record(data) -> bool:
+    return data[:4] == MAGIC
+
+
+def decode(data):
+    """Return (flags, bars, magnitudes) where magnitudes is one byte per bar."""
+    magic, schema, flags, bits, bars = _HEAD.unpack_from(data)
+    if magic != MAGIC or schema != SCHEMA:
+        raise ValueError(f"unsupported spectrum record (schema {schema})")
+    body = memoryview(data)[HEAD_SIZE:]
+    if len(body) != bars * bits // 8:
+        raise ValueError("truncated spectrum record")
+    return flags, bars, high_bytes(body, bits)
+
+
+def high_bytes(frame, bits: int) -> bytes:
+    """8-bit magnitudes: the high byte of each 16-bit LE sample, or as-is."""
+    return bytes(frame[1::2]) if bits == 16 else bytes(frame)
+
+
+class Resampler:
+    """
+    Master magnitudes (any bar count) → this subscriber's bar count. Bars are
+    grouped and each output bar takes its group's peak, so narrow spikes in a
+    wide master spectrum still show when folded down.
+    """
+
+    def __init__(self, bars: int):
+        self.bars = bars
+        self._src = None
+        self._groups = ()
+
+    def __call__(self, mags: bytes, src_bars: int) -> bytes:
+        if src_bars == self.bars:
+            return mags
+        if src_bars != self._src:
+            self._src = src_bars
+            self._groups = tuple(
+                (s, max(s + 1, (j + 1) * src_bars // self.bars))
+                for j in range(self.bars)
+                for s in (j * src_bars // self.bars,)
+            )
+        return bytes(max(mags[s:e]) for s, e in self._groups)
@@ -0,0 +1,95 @@
+# waybar/.config/waybar/scripts/lib/textwidth.py
+# Grapheme clusters and terminal-style cell widths for titles in the bar.
+# A pragmatic subset of UAX #29 / wcwidth using only unicodedata: combining
+# marks, ZWJ emoji sequences, variation selectors, skin tones, flags and tag
+# sequences stay together; East Asian wide/fullwidth and emoji presentation
+# take two cells, marks and format characters none.
+
+import bisect
+import unicodedata
+
+ZWJ = "\u200d"
+VS16 = "\ufe0f"
+
+
+def _extends(ch: str) -> bool:
+    """Does `ch` attach to the cluster before it?"""
+    o = ord(ch)
+    return (
+        unicodedata.category(ch) in ("Mn", "Me", "Mc")
+        or 0xFE00 <= o <= 0xFE0F  # variation selectors
+        or 0x1F3FB <= o <= 0x1F3FF  # emoji skin tone modifiers
+        or 0xE0020 <= o <= 0xE007F  # emoji tag sequences
+        or ch == ZWJ
+    )
+
+
+def _regional(ch: str) -> bool:
+    return 0x1F1E6 <= ord(ch) <= 0x1F1FF
+
+
+def clusters(text: str) -> list:
+    """Split `text` into user-perceived characters."""
+    out = []
+    for ch in text:
+        if out:
+            prev = out[-1]
+            if (
+                _extends(ch)
+                or prev[-1] == ZWJ
+                or (_regional(ch) and len(prev) == 1 and _regional(prev))
+            ):
+                out[-1] = prev + ch
+                continue
+        out.append(ch)
+    return out
+
+
+def cluster_width(cluster: str) -> int:
+    """Cells taken by one cluster: 0, 1 or 2."""
+    base = cluster[0]
+    if unicodedata.category(base) in ("Mn", "Me", "Cf", "Cc", "Zl", "Zp"):
+        return 0
+    if (
+        unicodedata.east_asian_width(base) in ("W", "F")
+        or VS16 in cluster
+        or len(cluster) > 1
+        and (ZWJ in cluster or _regional(base))
+    ):
+        return 2
+    return 1
+
+
+def width(text: str) -> int:
+    return sum(cluster_width(c) for c in clusters(text))
+
+
+class WidthIndex:
+    """
+    One title split into clusters with a prefix sum of their cell widths,
+    built once per title: `cells(i, j)` is O(1) and `fit(i, cells)` (how many
+    clusters from `i` fit in `cells`) a bisect.
+    """
+
+    def __init__(self, text: str):
+        self.clusters = clusters(text)
+        self.prefix = [0]
+        for c in self.clusters:
+            self.prefix.append(self.prefix[-1] + cluster_width(c))
+
+    def __len__(self) -> int:
+        return len(self.clusters)
+
+    @property
+    def total(self) -> int:
+        return self.prefix[-1]
+
+    def cells(self, i: int, j: int) -> int:
+        return self.prefix[j] - self.prefix[i]
+
+    def fit(self, i: int, cells: int) -> int:
+        """End index j >= i of the longest run clusters[i:j] within `cells`."""
+        return bisect.bisect_right(self.prefix, self.prefix[i] + cells, i) - 1
+
+    def text(self, i: int, j: int) -> str:
+        return "".join(self.clusters[i:j])
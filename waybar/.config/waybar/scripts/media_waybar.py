@@ -2,12 +2,31 @@
 # media_waybar.py
 # waybar/.config/waybar/scripts/media_waybar.py
 # CAVA producer/follower + MPRIS metadata for Waybar.
-
-import os, sys, struct, subprocess, tempfile, signal, json, time, ctypes
+# Shares one cava (and its lock/ring/socket) with cava_waybar.py: whichever
+# script holds the lock publishes the raw master spectrum, and each instance
+# renders its own bars from it.
+
+import os, sys, subprocess, signal, json, time, ctypes
+import asyncio
+
+from lib import procs, spectrum
+from lib.aio import readable, sleep_until
+from lib.cava import Backoff, CavaProcess
+from lib.follow import FrameFeed, LockWatch
+from lib.frames import FrameReader
+from lib.jsonline import LineEncoder
+from lib.mpris import MprisClient, PositionClock
+from lib.output import LatestLineWriter
+from lib.pacing import EmitGrid, IdleGovernor
+from lib.pubsub import Publisher
+from lib.render import BarRenderer, PeakHold
+from lib.ring import RingWriter
+from lib.stats import NoStages, Stats
+from lib.textwidth import WidthIndex
 
 # ── Env knobs ───────────────────────────────────────────────────────────────
 TITLE_MAX = int(os.environ.get("TITLE_MAX", "23"))
-MARQUEE = os.environ.get("MARQUEE", "1") == "0"
+MARQUEE = os.environ.get("MARQUEE", "1") == "1"  # 1 = scroll, 0 = truncate with …
 MARQUEE_SPEED = float(os.environ.get("MARQUEE_SPEED", "2"))  # chars per second
 MARQUEE_GAP = os.environ.get("MARQUEE_GAP", "   ")
 BARS = int(os.environ.get("CAVA_BARS", "40"))
@@ -21,8 +40,15 @@ STYLE_NAME = os.environ.get("CAVA_STYLE", "blocks")
 GAP = os.environ.get("CAVA_GAP", "\u200a")
 BORDER = os.environ.get("CAVA_BORDER", "none")  # none|pipe|bracket
 MARKUP = os.environ.get("CAVA_MARKUP", "0") == "1"
+PEAK = os.environ.get("CAVA_PEAK", "0") == "1"  # falling peak caps over the bars
+PEAK_HOLD = float(os.environ.get("CAVA_PEAK_HOLD", "0.5"))  # cap stays up (s)
+PEAK_DECAY = float(os.environ.get("CAVA_PEAK_DECAY", "8"))  # cap falls, levels/s
+PEAK_COLOR = os.environ.get("CAVA_PEAK_COLOR", "peru")  # pango color of a cap
 FPS = int(os.environ.get("CAVA_FPS", "12"))
+IDLE_FPS = float(os.environ.get("CAVA_IDLE_FPS", "1"))  # 0 = only on change
+IDLE_AFTER = int(os.environ.get("CAVA_IDLE_AFTER", "5"))
 FOLLOW_INT = float(os.environ.get("CAVA_FOLLOWER_INTERVAL", "1"))
+META_INTERVAL = float(os.environ.get("MEDIA_META_INTERVAL", "0.5"))  # refresh (s)
 ELLIPSIS = "…"
 
 # Show bars? show title/artist? tweak here
@@ -32,6 +58,18 @@ SHOW_ARTIST = os.environ.get("SHOW_ARTIST", "1") == "1"
 RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
 SINK_PATH = os.environ.get("CAVA_SINK", f"{RUNTIME_DIR}/cava_waybar.json")
 LOCK_PATH = os.environ.get("CAVA_LOCK", f"{RUNTIME_DIR}/cava_waybar.lock")
+RING_PATH = os.environ.get("CAVA_RING", f"{RUNTIME_DIR}/cava_waybar.ring")
+SOCK_PATH = os.environ.get("CAVA_SOCK", f"{RUNTIME_DIR}/cava_waybar.sock")
+STATS_PATH = os.environ.get("CAVA_STATS", f"{RUNTIME_DIR}/cava_waybar.stats.json")
+STATS_INTERVAL = float(os.environ.get("CAVA_STATS_INTERVAL", "5"))
+PROFILE = os.environ.get("CAVA_PROFILE", "0") == "1"  # per-stage frame timers
+SINK_INTERVAL = float(os.environ.get("CAVA_SINK_INTERVAL", "1"))  # JSON sink period
+RESTART_MIN = float(os.environ.get("CAVA_RESTART_MIN", "0.25"))  # respawn backoff
+RESTART_MAX = float(os.environ.get("CAVA_RESTART_MAX", "30"))
+STALL_S = float(os.environ.get("CAVA_STALL_S", "5"))  # no frames → respawn; 0 = off
+PLAYERCTL_TIMEOUT = float(os.environ.get("PLAYERCTL_TIMEOUT", "2"))  # per call (s)
+SUSPEND = os.environ.get("CAVA_SUSPEND", "sigstop")  # sigstop | stop | off
+SUSPEND_AFTER = float(os.environ.get("CAVA_SUSPEND_AFTER", "2"))  # not playing (s)
 
 STYLES = {
     "blocks": list("▁▂▃▄▅▆▇█"),
@@ -49,6 +87,24 @@ if BIT_FORMAT == "16bit":
 else:
     BYTETYPE, BYTESIZE, MAXV = "B", 1, 255
 
+
+def peak_timing(fps):
+    """(hold, decay) for PeakHold stepping `fps` times a second."""
+    fps = max(fps, 1)
+    return round(PEAK_HOLD * fps), round(PEAK_DECAY * 16 / fps)
+
+
+# Value→glyph tables are built once for this style/border; bars render from
+# 8-bit magnitudes resampled from the master spectrum to our own bar count.
+# Peak caps turn the level bytes into cap/level codes; a bar under its cap
+# shows the cap's glyph in PEAK_COLOR (the bars text is markup then). Hold and
+# fall are counted in frames: cava's framerate in the producer, FPS in a follower.
+CAPS = [f"<span color='{PEAK_COLOR}'>{g}</span>" for g in GLYPHS] if PEAK else None
+RENDERER = BarRenderer(GLYPHS, "8bit", GAP, BORDER, caps=CAPS)
+PEAKS = PeakHold(*peak_timing(FPS)) if PEAK else None
+RESAMPLE = spectrum.Resampler(BARS)
+BITS = 16 if BIT_FORMAT == "16bit" else 8
+
 STOP = False
 
 
@@ -59,6 +115,7 @@ def _stop(*_a):
 
 signal.signal(signal.SIGINT, _stop)
 signal.signal(signal.SIGTERM, _stop)
+signal.signal(signal.SIGUSR1, signal.SIG_IGN)  # the producer dumps its stats
 try:
     signal.signal(signal.SIGPIPE, _stop)
 except Exception:
@@ -71,55 +128,90 @@ def _pango_escape(s: str) -> str:
     return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
 
 
-_marquee_state = {
-    "last_src": "",
-    "t0": 0.0,  # time origin for this src
-}
-
-
-def _marquee(text: str) -> str:
+class Marquee:
     """
-    Time-based marquee: offset = floor((now - t0) * MARQUEE_SPEED).
-    Looks steady regardless of how often we print.
+    Time-based marquee: window = floor((now - t0) * speed), so it looks steady
+    regardless of how often we print. When the title changes, every window of
+    `text + gap` is cut and pango-escaped once; reading the current one is an
+    index lookup. Titles that fit (or with scrolling off) get one static
+    frame, truncated with an ellipsis when needed.
+
+    Widths are display cells and steps are grapheme clusters (CJK takes two
+    cells, emoji sequences and combining marks stay whole). Every scrolling
+    window is padded to exactly `width` cells, so the module never changes
+    size while a title scrolls and Waybar need not relayout.
     """
-    if not text:
-        _marquee_state["last_src"] = ""
-        _marquee_state["t0"] = 0.0
-        return ""
 
-    if not MARQUEE or TITLE_MAX <= 0 or len(text) <= TITLE_MAX:
-        # reset origin so when it grows long again we start from 0
-        _marquee_state["last_src"] = text
-        _marquee_state["t0"] = time.monotonic()
-
-        if len(text) <= TITLE_MAX or TITLE_MAX <= 1:
-            # fits already, or not enough room to show ellipsis meaningfully
-            return text[:TITLE_MAX]
-
-        # leave room for the tiny ellipsis
-        return text[: TITLE_MAX - 1] + ELLIPSIS
-
-    base = text + MARQUEE_GAP
-    now = time.monotonic()
-
-    if text != _marquee_state["last_src"]:
-        _marquee_state["last_src"] = text
-        _marquee_state["t0"] = now
-
-    # chars scrolled since t0
-    offset = int((now - _marquee_state["t0"]) * max(MARQUEE_SPEED, 0.1)) % len(base)
+    def __init__(self, width: int, speed: float, gap: str, enabled: bool = True):
+        self.width = width
+        self.speed = max(speed, 0.1)
+        self.gap = gap
+        self.enabled = enabled
+        self.text = None
+        self.frames = [""]
+        self.t0 = 0.0
+
+    @property
+    def scrolling(self) -> bool:
+        return len(self.frames) > 1
+
+    def set_text(self, text: str) -> None:
+        """New title → precompute its windows (no-op if unchanged)."""
+        if text == self.text:
+            return
+        self.text = text
+        self.t0 = time.monotonic()
+        width = self.width
+        idx = WidthIndex(text)
+
+        if not text:
+            self.frames = [""]
+        elif not self.enabled or width <= 0 or idx.total <= width:
+            if idx.total <= width or width <= 1:
+                # fits already, or not enough room to show ellipsis meaningfully
+                self.frames = [_pango_escape(idx.text(0, idx.fit(0, max(width, 0))))]
+            else:
+                # leave room for the tiny ellipsis (pad if a wide char didn't fit)
+                end = idx.fit(0, width - 1)
+                pad = " " * (width - 1 - idx.cells(0, end))
+                self.frames = [_pango_escape(idx.text(0, end) + ELLIPSIS + pad)]
+        else:
+            steps = len(WidthIndex(text + self.gap))
+            loop = WidthIndex((text + self.gap) * 2)  # windows that wrap past the end
+            frames = []
+            for start in range(steps):
+                end = loop.fit(start, width)
+                pad = " " * (width - loop.cells(start, end))
+                frames.append(_pango_escape(loop.text(start, end) + pad))
+            self.frames = frames
+
+    def current(self, now: float = None) -> str:
+        """The escaped window to show at `now` (monotonic)."""
+        if len(self.frames) == 1:
+            return self.frames[0]
+        if now is None:
+            now = time.monotonic()
+        return self.frames[int((now - self.t0) * self.speed) % len(self.frames)]
 
-    end = offset + TITLE_MAX
-    if end <= len(base):
-        return base[offset:end]
-    # wrap
-    return base[offset:] + base[: (end - len(base))]
+    def next_deadline(self, now: float = None):
+        """Monotonic time of the next window change, or None if static."""
+        if len(self.frames) == 1:
+            return None
+        if now is None:
+            now = time.monotonic()
+        steps = int((now - self.t0) * self.speed) + 1
+        return self.t0 + steps / self.speed
 
 
 def _list_players():
     try:
         out = (
-            subprocess.check_output(["playerctl", "-l"], stderr=subprocess.DEVNULL)
+            procs.check_output(
+                ["playerctl", "-l"],
+                "playerctl -l",
+                PLAYERCTL_TIMEOUT,
+                stderr=subprocess.DEVNULL,
+            )
             .decode()
             .splitlines()
         )
@@ -131,8 +223,11 @@ def _list_players():
 def _player_status(name: str) -> str:
     try:
         return (
-            subprocess.check_output(
-                ["playerctl", "-p", name, "status"], stderr=subprocess.DEVNULL
+            procs.check_output(
+                ["playerctl", "-p", name, "status"],
+                "playerctl status",
+                PLAYERCTL_TIMEOUT,
+                stderr=subprocess.DEVNULL,
             )
             .decode()
             .strip()
@@ -171,25 +266,10 @@ def _fmt_time_secs(us_or_s):
     return f"{h:d}:{m:02d}:{s:02d}" if h else f"{m:d}:{s:02d}"
 
 
-def wrap_token(tok: str) -> str:
-    if BORDER == "pipe":
-        return f"│{tok}│"
-    if BORDER == "bracket":
-        return f"[{tok}]"
-    return tok
-
-
-def val_to_token(v: int) -> str:
-    idx = round((v / MAXV) * (len(GLYPHS) - 1))
-    idx = max(0, min(idx, len(GLYPHS) - 1))
-    return GLYPHS[idx]
-
-
-def atomic_write(path: str, text: str) -> None:
+def atomic_write(path: str, line: bytes) -> None:
     tmp = f"{path}.tmp"
-    with open(tmp, "w") as f:
-        f.write(text)
-        f.write("\n")
+    with open(tmp, "wb") as f:
+        f.write(line)
     os.replace(tmp, path)
 
 
@@ -197,9 +277,10 @@ def try_lock(path: str):
     import fcntl
 
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    f = open(path, "w")
+    f = open(path, "a")  # "w" would wipe the holder's pid before flock fails
     try:
         fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        f.truncate(0)
         f.write(str(os.getpid()))
         f.flush()
         return f
@@ -209,13 +290,30 @@ def try_lock(path: str):
 
 
 # ── MPRIS / playerctl helpers ──────────────────────────────────────────────
+# Resident D-Bus client; the playerctl paths below only run when there is no
+# usable session bus.
+_MPRIS = MprisClient()
+
 _last_check = 0.0
 _last_active = False
-_meta_cache_t = 0.0
-_meta_cache = None
+_PC_CLOCK = PositionClock()  # playerctl fallback's position extrapolation
+_pc_key = None
+
+_EMPTY_INFO = {
+    "title": "",
+    "artist": "",
+    "album": "",
+    "status": "",
+    "player": "",
+    "position_s": None,
+    "length_s": None,
+}
 
 
 def is_media_active():
+    if _MPRIS.pump():
+        return _MPRIS.any_active()
+
     global _last_check, _last_active
     now = time.monotonic()
     if now - _last_check < 0.25:
@@ -223,8 +321,11 @@ def is_media_active():
     _last_check = now
     try:
         lines = (
-            subprocess.check_output(
-                ["playerctl", "-a", "status"], stderr=subprocess.DEVNULL
+            procs.check_output(
+                ["playerctl", "-a", "status"],
+                "playerctl -a status",
+                PLAYERCTL_TIMEOUT,
+                stderr=subprocess.DEVNULL,
             )
             .decode()
             .splitlines()
@@ -240,33 +341,49 @@ def get_media_info():
     """
     Returns fields for the SINGLE chosen player (not playerctld):
       title, artist, album, status, player, position_s, length_s
+    May block (D-Bus round trips, playerctl forks): call it off the event loop.
     """
-    global _meta_cache_t, _meta_cache
-    now = time.monotonic()
-    if now - _meta_cache_t < 0.5 and _meta_cache is not None:
-        return _meta_cache
+    if _MPRIS.pump():
+        return _media_info_mpris()
+    return _media_info_playerctl()
+
+
+def media_snapshot():
+    """(active, meta) for the metadata task; runs in the executor thread."""
+    active = is_media_active()
+    return active, (get_media_info() if active else _EMPTY_INFO)
+
 
+def _media_info_mpris():
+    p = _MPRIS.active_player()
+    if p is None:
+        return dict(_EMPTY_INFO)
+    return {
+        "title": p.title,
+        "artist": p.artist,
+        "album": p.album,
+        "player": p.identity or p.short_name,
+        "status": p.status,
+        "position_s": _MPRIS.position_s(p),
+        "length_s": p.length_s,
+    }
+
+
+def _media_info_playerctl():
     name = _pick_active_player()
     if not name:
-        _meta_cache = {
-            "title": "",
-            "artist": "",
-            "album": "",
-            "status": "",
-            "player": "",
-            "position_s": None,
-            "length_s": None,
-        }
-        _meta_cache_t = now
-        return _meta_cache
+        return dict(_EMPTY_INFO)
 
     base = ["playerctl", "-p", name]
 
     def _fmt(fmt):
         try:
             return (
-                subprocess.check_output(
-                    base + ["metadata", f"--format={fmt}"], stderr=subprocess.DEVNULL
+                procs.check_output(
+                    base + ["metadata", f"--format={fmt}"],
+                    "playerctl metadata",
+                    PLAYERCTL_TIMEOUT,
+                    stderr=subprocess.DEVNULL,
                 )
                 .decode()
                 .strip()
@@ -274,17 +391,32 @@ def get_media_info():
         except Exception:
             return ""
 
-    # status, timing
+    # status, timing: the position is extrapolated locally and only re-read
+    # when the player, track or status changes (no Seeked signal here, so
+    # seeks show up at the next RESYNC_S)
+    global _pc_key
     status = _player_status(name)
-    try:
-        pos_out = (
-            subprocess.check_output(base + ["position"], stderr=subprocess.DEVNULL)
-            .decode()
-            .strip()
-        )
-        position_s = float(pos_out) if pos_out else None
-    except Exception:
-        position_s = None
+    title = _fmt("{{title}}")
+    now = time.monotonic()
+    key = (name, title, status)
+    if key != _pc_key or _PC_CLOCK.stale(now):
+        _pc_key = key
+        try:
+            pos_out = (
+                procs.check_output(
+                    base + ["position"],
+                    "playerctl position",
+                    PLAYERCTL_TIMEOUT,
+                    stderr=subprocess.DEVNULL,
+                )
+                .decode()
+                .strip()
+            )
+            _PC_CLOCK.sync(float(pos_out) if pos_out else None, now)
+        except Exception:
+            _PC_CLOCK.sync(None, now)
+    _PC_CLOCK.playing = status.lower() == "playing"
+    position_s = _PC_CLOCK.position(now)
 
     # mpris:length is microseconds; {{mpris:length}} via --format is reliable
     length_raw = _fmt("{{mpris:length}}")
@@ -296,8 +428,8 @@ def get_media_info():
     # Prefer Identity (true app name); fall back to playerName
     identity = _fmt("{{mpris:identity}}") or _fmt("{{playerName}}")
 
-    info = {
-        "title": _fmt("{{title}}"),
+    return {
+        "title": title,
         "artist": _fmt("{{artist}}"),
         "album": _fmt("{{album}}"),
         "player": identity or name,  # e.g. "firefox", "Spotify"
@@ -305,9 +437,6 @@ def get_media_info():
         "position_s": position_s,
         "length_s": length_s,
     }
-    _meta_cache = info
-    _meta_cache_t = now
-    return info
 
 
 def install_parent_death_sig(sig=signal.SIGTERM):
@@ -319,234 +448,667 @@ def install_parent_death_sig(sig=signal.SIGTERM):
         pass
 
 
-def safe_write_line(obj) -> bool:
-    try:
-        sys.stdout.write(json.dumps(obj) + "\n")
-        sys.stdout.flush()
-        return True
-    except BrokenPipeError:
-        return False
+def cava_death_sig():
+    """preexec_fn for cava: SIGKILL, which a suspended (stopped) cava obeys."""
+    install_parent_death_sig(signal.SIGKILL)
+
+
+# Payloads → JSON line bytes; class/tooltip/alt are encoded once per change
+LINES = LineEncoder()
+
+
+def stdout_writer(sh, out=None):
+    """
+    Non-blocking stdout on the running loop: returns (writer, write) where
+    write(line) -> False once Waybar is gone. A line the pipe can't take yet
+    is flushed when it turns writable; meanwhile the newest line wins.
+    `out` carries on with an existing writer, whose line may be half written.
+    """
+    loop = asyncio.get_running_loop()
+    if out is None:
+        out = LatestLineWriter(sys.stdout.fileno())
+
+    def on_writable():
+        if not out.flush():
+            sh.stop.set()
+        if not out.pending:
+            loop.remove_writer(out.fileno())
+
+    def write(line: bytes) -> bool:
+        ok = out.write(line)
+        if out.pending:
+            loop.add_writer(out.fileno(), on_writable)
+        return ok
+
+    if out.pending:
+        loop.add_writer(out.fileno(), on_writable)
+    return out, write
 
 
 # ── Rendering ───────────────────────────────────────────────────────────────
-def render_payload(bars_text: str):
-    active = is_media_active()
-    meta = (
-        get_media_info()
-        if active
-        else {"title": "", "artist": "", "album": "", "status": "", "player": ""}
-    )
+# Transport icons
+PAUSE_ICON = "<span size='12000' color='#1CA0FD'></span>"
+PLAY_ICON = "<span size='12000' color='peru'></span>"
 
-    # Transport icons
-    pause_icon = "<span size='12000' color='#1CA0FD'></span>"
-    play_icon = "<span size='12000' color='peru'></span>"
-    playpause_icon = (
-        pause_icon if meta.get("status", "").lower() == "playing" else play_icon
-    )
 
-    # Title line
+def title_line(meta: dict) -> str:
     title = meta.get("title", "").strip()
     artist = meta.get("artist", "").strip()
     if title:
         if SHOW_ARTIST and artist:
-            title_text = f"{title} — {artist}"
+            return f"{title} — {artist}"
+        return title
+    return ""
+
+
+class PayloadComposer:
+    """
+    Builds the Waybar payload incrementally. Everything derived from the
+    metadata (icon, title, tooltip, class, alt) is built once per snapshot;
+    snapshots are swapped whole, so identity is the cache key. The visible
+    title comes pre-escaped from the marquee, and the bars span is rebuilt
+    only when the bars change. A frame costs a marquee lookup, one join and
+    a small dict.
+    """
+
+    def __init__(self):
+        self.marquee = Marquee(TITLE_MAX, MARQUEE_SPEED, MARQUEE_GAP, MARQUEE)
+        self._meta = None
+        self._visible = None
+        self._bars = None
+        self._bars_span = ""
+        self._head = ""
+
+    def _load(self, meta: dict) -> None:
+        self._meta = meta
+        status = meta.get("status", "").lower()
+        self._icon = PAUSE_ICON if status == "playing" else PLAY_ICON
+        self._visible = None
+
+        # Title line
+        self._title_text = title_line(meta)
+        self.marquee.set_text(self._title_text)
+
+        # Build tooltip (escaped)
+        tooltip_lines = []
+
+        t_title = _pango_escape(meta.get("title", ""))
+        t_artist = _pango_escape(meta.get("artist", ""))
+        t_album = _pango_escape(meta.get("album", ""))
+
+        pos_str = _fmt_time_secs(meta.get("position_s"))
+        len_str = _fmt_time_secs(meta.get("length_s"))
+
+        app = meta.get("player", "")
+        app_status = _pango_escape(f"{app} ({status})") if (app or status) else ""
+
+        if app_status:
+            tooltip_lines.append(app_status)
+        if t_title:
+            tooltip_lines.append(t_title)
+        if t_artist:
+            tooltip_lines.append(t_artist)
+        if t_album:
+            tooltip_lines.append(t_album)
+        if pos_str != "--:--" or len_str != "--:--":
+            tooltip_lines.append(f"{pos_str} / {len_str}")
+
+        tooltip = "\n".join(tooltip_lines) if tooltip_lines else ""
+        if not tooltip and self._title_text:
+            tooltip = _pango_escape(self._title_text)
+        if not tooltip:
+            tooltip = " "
+
+        self._tooltip = tooltip
+        self._class = CLASS_NAME + (" playing" if status == "playing" else "")
+        self._alt = status or ""
+
+    def compose(self, bars_text: str, meta: dict = _EMPTY_INFO) -> dict:
+        if meta is not self._meta:
+            self._load(meta)
+
+        visible_title = self.marquee.current()  # already escaped
+        if visible_title is not self._visible:
+            self._visible = visible_title
+            parts = [self._icon]
+            if visible_title:
+                parts.append(visible_title)
+            self._head = "  ".join(parts)
+
+        if SHOW_BARS:
+            if bars_text != self._bars:
+                self._bars = bars_text
+                bars = bars_text if PEAK else _pango_escape(bars_text)
+                self._bars_span = f"<span size='7000' color='#1CA0FD'>{bars}</span>"
+            text = f"{self._head}  {self._bars_span}".strip()
         else:
-            title_text = title
-    else:
-        title_text = ""
-
-    visible_title = _marquee(title_text)
-    visible_title = _pango_escape(visible_title)
-    title_text = _pango_escape(title_text)
-    bars_text = _pango_escape(bars_text)
-    bars_text = f"<span size='7000' color='#1CA0FD'>{bars_text}</span>"
-
-    left = f"{playpause_icon}"
-    parts = []
-    if left:
-        parts.append(left)
-    if visible_title:
-        parts.append(visible_title)
-    if SHOW_BARS and bars_text:
-        parts.append(bars_text)
-
-    text = "  ".join(parts).strip()
-
-    # Build tooltip (escaped)
-    tooltip_lines = []
-
-    t_title = _pango_escape(meta.get("title", ""))
-    t_artist = _pango_escape(meta.get("artist", ""))
-    t_album = _pango_escape(meta.get("album", ""))
-
-    pos_str = _fmt_time_secs(meta.get("position_s"))
-    len_str = _fmt_time_secs(meta.get("length_s"))
-
-    app = meta.get("player", "")
-    status = meta.get("status", "").lower()
-    app_status = _pango_escape(f"{app} ({status})") if (app or status) else ""
-
-    if app_status:
-        tooltip_lines.append(app_status)
-    if t_title:
-        tooltip_lines.append(t_title)
-    if t_artist:
-        tooltip_lines.append(t_artist)
-    if t_album:
-        tooltip_lines.append(t_album)
-    if pos_str != "--:--" or len_str != "--:--":
-        tooltip_lines.append(f"{pos_str} / {len_str}")
-
-    tooltip = "\n".join(tooltip_lines) if tooltip_lines else ""
-    if not tooltip and title_text:
-        tooltip = title_text
-    if not tooltip:
-        tooltip = " "
-
-    # Hide completely if no media and you prefer that:
-    # if not active:
-    #     text = ""
+            text = self._head.strip()
 
-    return {
-        "text": text,
-        "class": CLASS_NAME
-        + (" playing" if meta.get("status", "").lower() == "playing" else ""),
-        "tooltip": tooltip,
-        "alt": meta.get("status", "").lower() or "",
-    }
+        # Hide completely if no media and you prefer that:
+        # if not active:
+        #     text = ""
 
+        return {
+            "text": text,
+            "class": self._class,
+            "tooltip": self._tooltip,
+            "alt": self._alt,
+        }
 
-# ── Producer / follower ─────────────────────────────────────────────────────
-def producer(lock_file):
-    cava_conf = f"""
-[general]
-mode = normal
-framerate = 25
-lower_cutoff_freq = 50
-higher_cutoff_freq = 12000
-bars = {BARS}
-sensitivity = {SENS}
-channels = {CHANNELS}
-
-[input]
-method = {METHOD}
-
-[output]
-method = raw
-raw_target = /dev/stdout
-bit_format = {BIT_FORMAT}
-channels = {CHANNELS}
-mono_option = average
-
-[smoothing]
-noise_reduction = 35
-integral = 90
-gravity = 95
-ignore = 2
-monstercat = 1.5
-""".strip()
-
-    with tempfile.NamedTemporaryFile(mode="w", delete=True) as conf:
-        conf.write(cava_conf)
-        conf.flush()
-        proc = subprocess.Popen(
-            ["cava", "-p", conf.name],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            preexec_fn=install_parent_death_sig,
-        )
 
-        out = proc.stdout
-        if out is None:
-            return 1
+_COMPOSER = PayloadComposer()
+
+
+def render_payload(bars_text: str, meta: dict = _EMPTY_INFO):
+    """Compose the Waybar payload from bars and a metadata snapshot."""
+    return _COMPOSER.compose(bars_text, meta)
+
 
-        last_emit = 0.0
-        chunk = BYTESIZE * BARS
-        fmt = BYTETYPE * BARS
+# ── Event loop ──────────────────────────────────────────────────────────────
+# Independent tasks around one shared snapshot. Fields are swapped whole,
+# never mutated, so the writer always composes a consistent payload:
+#   frames   → bars          (producer: the cava pipe; follower: the feed)
+#   metadata → active, meta  (D-Bus / playerctl, in an executor thread)
+#   marquee  → wakes the writer on each scroll step of a long title
+#   writer   → stdout (and the producer's sink) on a fixed FPS grid
+# Nothing on the frame path waits on anything but its own pipe.
+class _Shared:
+    def __init__(self):
+        self.bars = ""
+        self.active = False
+        self.meta = _EMPTY_INFO
+        self.t_frame = 0.0  # monotonic arrival of the newest bars
+        self.dirty = asyncio.Event()
+        self.retitle = asyncio.Event()  # meta swapped: the marquee re-plans
+        self.state = asyncio.Event()  # meta swapped: cava may suspend/resume
+        self.stop = asyncio.Event()
 
+
+async def metadata_task(sh: _Shared):
+    loop = asyncio.get_running_loop()
+    while True:
         try:
-            atomic_write(SINK_PATH, json.dumps(render_payload(bars_text="")))
+            active, meta = await loop.run_in_executor(None, media_snapshot)
         except Exception:
+            active, meta = False, _EMPTY_INFO
+        if (active, meta) != (sh.active, sh.meta):
+            sh.active, sh.meta = active, meta
+            sh.dirty.set()
+            sh.retitle.set()
+            sh.state.set()
+        await asyncio.sleep(META_INTERVAL)
+
+
+async def marquee_task(sh: _Shared):
+    """Wake the writer exactly when the marquee window moves; sleep otherwise."""
+    marquee = _COMPOSER.marquee
+    while True:
+        sh.retitle.clear()
+        marquee.set_text(title_line(sh.meta))
+        deadline = marquee.next_deadline()
+        if deadline is None:
+            await sh.retitle.wait()  # static title: nothing until it changes
+            continue
+        try:
+            timeout = max(0.0, deadline - time.monotonic())
+            await asyncio.wait_for(sh.retitle.wait(), timeout)
+        except asyncio.TimeoutError:
+            sh.dirty.set()
+
+
+async def writer_task(sh: _Shared, emit, stats=None):
+    """
+    Compose and hand the payload to `emit` on the first FPS grid point after
+    something changed (evenly spaced output, no wakeups while nothing does).
+    """
+    loop = asyncio.get_running_loop()
+    grid = EmitGrid(FPS, loop.time())
+    stage = stats.stages if stats is not None else NoStages()
+    while True:
+        await sh.dirty.wait()
+        await sleep_until(grid.deadline(loop.time()))  # changes meanwhile coalesce
+        sh.dirty.clear()
+        grid.fire(loop.time())
+        if stats is not None:
+            stats.observe("emit_jitter", grid.jitter)
+            if grid.interval is not None:
+                stats.observe("emit_interval", grid.interval)
+        try:
+            stage.start()
+            payload = render_payload(sh.bars, sh.meta)
+            stage.lap("compose")
+            ok = emit(payload)
+        except Exception:
+            continue
+        if not ok:  # Waybar closed the pipe
+            sh.stop.set()
+            return
+
+
+async def _run(sh: _Shared, *coros) -> None:
+    """Run the tasks until a signal, EOF or any task ending sets `sh.stop`."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGPIPE):
+        try:
+            loop.add_signal_handler(sig, sh.stop.set)
+        except (ValueError, RuntimeError, OSError):
             pass
+    tasks = [asyncio.create_task(c) for c in coros]
+    for t in tasks:
+        t.add_done_callback(lambda _t: sh.stop.set())
+    await sh.stop.wait()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
-        while not STOP:
-            buf = out.read(chunk)
-            if not buf or len(buf) < chunk:
-                break
 
-            now = time.monotonic()
-            if now - last_emit < 1.0 / max(FPS, 1):
-                continue
-            last_emit = now
+# ── Producer / follower ─────────────────────────────────────────────────────
+async def producer(lock_file, seed=None, seed_bars=0, out=None):
+    """
+    Run cava and serve everyone. A promoted follower hands over its state
+    (`seed`: bars, media state, title), the master bar count it was fed and
+    its stdout writer (`out`), so neither its own output nor the sink blanks
+    during the takeover, and a line it left half written is finished first.
+    """
+    loop = asyncio.get_running_loop()
+    # cava runs at the highest rate and bar count anyone wants: us, or any
+    # follower's hello
+    cava = CavaProcess(
+        max(BARS, seed_bars),
+        SENS,
+        CHANNELS,
+        METHOD,
+        BIT_FORMAT,
+        framerate=max(FPS, 1),
+        preexec_fn=cava_death_sig,
+    )
 
-            vals = struct.unpack(fmt, buf)
-            tokens = [val_to_token(v) for v in vals]
-            bars = GAP.join(tokens)
-            payload = render_payload(bars_text=bars)
+    sh = _Shared()
+    if seed is not None:
+        sh.bars, sh.active, sh.meta = seed.bars, seed.active, seed.meta
+    frames = None  # reader on cava's pipe while it runs
+    last_frame = 0.0
+    timer = None  # stall check while cava runs, respawn while it is down
+    backoff = Backoff(RESTART_MIN, RESTART_MAX)
+    suspended = False  # cava held while no player is Playing (CAVA_SUSPEND)
+    stats = Stats(STATS_PATH, STATS_INTERVAL, PROFILE)
+    stats.sections["commands"] = procs.summary  # everything this process forked
+    stage = stats.stages  # lap timers; no-ops unless CAVA_PROFILE=1
+    governor = IdleGovernor(IDLE_FPS, IDLE_AFTER)
+    published = None  # last (master levels, active) on the ring/socket
+    last_levels = None
 
-            try:
-                atomic_write(SINK_PATH, json.dumps(payload))
-            except Exception:
-                pass
+    try:
+        ring = RingWriter(RING_PATH)
+    except (OSError, ValueError):
+        ring = None
+    try:
+        pub = Publisher(SOCK_PATH)
+    except OSError:
+        pub = None
+
+    try:
+        atomic_write(SINK_PATH, LINES.encode(render_payload(sh.bars, sh.meta)))
+    except Exception:
+        pass
 
-            if not safe_write_line(payload):
-                break
+    def spawn():
+        nonlocal frames, last_frame, timer
+        if suspended:
+            return  # resume() starts it
+        out = cava.start()
+        if out is None:
+            down("cava_start_failures")
+            return
+        frames = FrameReader(out, cava.bars, BIT_FORMAT)
+        os.set_blocking(frames.fileno(), False)  # drain to the newest frame
+        loop.add_reader(frames.fileno(), on_frames)
+        last_frame = time.monotonic()
+        timer = loop.call_later(STALL_S, check_stall) if STALL_S > 0 else None
+        stats.set("cava_up", True)
+
+    def halt():
+        """Stop cava along with its reader and timer."""
+        nonlocal frames, timer
+        if frames is not None:
+            loop.remove_reader(frames.fileno())
+            frames = None
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        cava.stop()
+
+    def down(why):
+        """
+        cava exited, stalled or would not start (e.g. the sound server is
+        restarting): respawn it in place after a backoff. Followers and our
+        own output keep the last good frame meanwhile.
+        """
+        nonlocal timer
+        uptime = time.monotonic() - cava.started_at if cava.running else 0.0
+        halt()
+        timer = loop.call_later(backoff.next(uptime), spawn)
+        stats.incr(why)
+        stats.set("cava_up", False)
+
+    def check_stall():
+        nonlocal timer
+        quiet = time.monotonic() - last_frame
+        if quiet >= STALL_S:
+            down("cava_stalls")
+        else:
+            timer = loop.call_later(STALL_S - quiet, check_stall)
 
+    def on_frames():
+        nonlocal last_frame
+        t_ready = time.monotonic()
+        stage.start()
+        dropped = frames.dropped
         try:
-            proc.terminate()
-            proc.wait(timeout=1.0)
-        except Exception:
+            buf = frames.read_latest()
+        except EOFError:
+            down("cava_exits")
+            return
+        stage.lap("read")
+        if buf is None:
+            return
+        last_frame = t_ready
+        stats.incr("frames_read", 1 + frames.dropped - dropped)
+        stats.incr("frames_drained", frames.dropped - dropped)
+        take(buf, t_ready)
+
+    def take(buf, t_ready, force=False):
+        """One raw frame → followers and our bars; `force` skips idling."""
+        nonlocal published, last_levels
+
+        mags = spectrum.high_bytes(buf, BITS)
+        stage.lap("unpack")
+        master = RENDERER.levels_of(mags)
+        stage.lap("levels")
+        levels = RESAMPLE(master, cava.bars)
+        stage.lap("resample")
+
+        # Silent or static spectrum: step down to the idle rate, once no
+        # cap is left falling (a change in `active` still goes out: it blanks
+        # or shows the followers' bars)
+        governor.update(master)
+        stats.set("idle", governor.idle)
+        falling = PEAKS is not None and not PEAKS.settled
+        if not force and not falling and not governor.due(t_ready, master, sh.active):
+            stats.incr("frames_idle_skipped")
+            return
+        governor.sent(t_ready, master, sh.active)
+        stage.lap("govern")
+        if PEAKS is not None:
+            levels = PEAKS(levels)
+            stage.lap("peaks")
+
+        # The raw spectrum goes out to followers right here
+        if (master, sh.active) != published:
+            published = (master, sh.active)
+            flags = spectrum.FLAG_ACTIVE if sh.active else 0
+            data = spectrum.encode(buf, cava.bars, BIT_FORMAT, flags)
+            if ring is not None:
+                try:
+                    ring.publish(data)
+                except ValueError:
+                    pass
+            if pub is not None:
+                pub.publish(data, t_ready, 0.5 / cava.framerate, force)
+            stage.lap("publish")
+
+        # Same glyphs → nothing for the writer to do
+        if levels != last_levels:
+            last_levels = levels
+            sh.bars = RENDERER.text_of(levels)
+            sh.t_frame = t_ready
+            sh.dirty.set()
+            stage.lap("render")
+        else:
+            stats.incr("frames_deduped")
+        stats.maybe_dump(t_ready)
+
+    def suspend():
+        """
+        No player has been Playing for SUSPEND_AFTER: stop capturing and
+        analysing. Everyone gets one silent frame, so no bars stay up.
+        """
+        nonlocal suspended, timer
+        if SUSPEND == "stop" or frames is None or not cava.suspend():
+            halt()  # also drops a pending respawn
+        elif timer is not None:
+            timer.cancel()  # no stall checks on a stopped cava
+            timer = None
+        suspended = True
+        if PEAKS is not None:
+            PEAKS.clear()
+        flat(time.monotonic())
+        stats.incr("cava_suspends")
+        stats.set("cava_suspended", True)
+
+    def flat(now):
+        """A silent frame to our bars and followers now, with the current `active`."""
+        stage.start()
+        take(bytes(cava.bars * BYTESIZE), now, force=True)
+
+    def resume():
+        nonlocal suspended, last_frame, timer
+        suspended = False
+        stats.set("cava_suspended", False)
+        if frames is None:
+            spawn()
+            return
+        cava.resume()
+        last_frame = time.monotonic()  # the stall watchdog starts over
+        if STALL_S > 0:
+            timer = loop.call_later(STALL_S, check_stall)
+
+    async def lifecycle_task():
+        """
+        Suspend cava while nothing plays; resume on the next Playing. While
+        suspended, a player can still vanish or stop (blank the bars) or pause
+        again (flat bars), and the flat frame has to follow.
+        """
+        quiet_since = None
+        while True:
+            sh.state.clear()
+            now = time.monotonic()
+            timeout = None
+            if sh.meta.get("status", "").lower() == "playing":
+                quiet_since = None
+                if suspended:
+                    resume()
+            elif not suspended:
+                quiet_since = quiet_since or now
+                if now - quiet_since >= SUSPEND_AFTER:
+                    suspend()
+                else:
+                    timeout = quiet_since + SUSPEND_AFTER - now
+            elif published is not None and sh.active != published[1]:
+                flat(now)
+            try:
+                await asyncio.wait_for(sh.state.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    watched = {}  # subscriber → fd registered with the loop
+
+    def sync_watch():
+        for sub in [s for s in watched if s not in pub.subs]:
+            loop.remove_reader(watched.pop(sub))
+        for sub in pub.subs:
+            if sub not in watched:
+                watched[sub] = sub.fileno()
+                loop.add_reader(watched[sub], on_pub, sub)
+
+    def on_pub(obj):
+        if pub.handle([obj]):
+            if cava.set_framerate(max(FPS, pub.demand)) and PEAKS is not None:
+                PEAKS.set_timing(*peak_timing(cava.framerate))
+            stats.set("framerate", cava.framerate)
+            if cava.set_bars(max(BARS, pub.bars_demand)):
+                # new frame size: respawn cava and read it with a fresh reader
+                # (a cava that is down picks it up on its next start)
+                stats.set("bars", cava.bars)
+                if frames is not None:
+                    halt()
+                    spawn()
+                    stats.incr("cava_restarts")
+        sync_watch()
+
+    last_sink = 0.0
+    emitted = sunk = None  # last payload per output
+    observed = 0.0
+    # A stalled Waybar must not stall us: newest line wins, the rest drop
+    stdout, write = stdout_writer(sh, out)
+
+    def emit(payload) -> bool:
+        nonlocal last_sink, emitted, sunk, observed
+        now = time.monotonic()
+        sink = payload != sunk and now - last_sink >= SINK_INTERVAL
+        if not sink and payload == emitted:
+            return True
+        line = LINES.encode(payload)  # same bytes for the sink and stdout
+        stage.lap("encode")
+        if sink:
+            last_sink = now
+            sunk = payload
             try:
-                proc.kill()
+                atomic_write(SINK_PATH, line)
             except Exception:
                 pass
+            stage.lap("sink")
+        if payload == emitted:
+            return True
+        emitted = payload
+        dropped = stdout.dropped
+        if not write(line):
+            return False
+        stage.lap("stdout")
+        stats.incr("frames_emitted")
+        stats.incr("stdout_dropped", stdout.dropped - dropped)
+        if sh.t_frame != observed:  # latency of new bars, not marquee ticks
+            observed = sh.t_frame
+            stats.observe("pipe_to_stdout", time.monotonic() - sh.t_frame)
+        return True
+
+    spawn()
+    if pub is not None:
+        loop.add_reader(pub.fileno(), on_pub, pub)
+    loop.add_signal_handler(signal.SIGUSR1, stats.dump_now)
+    tasks = [metadata_task(sh), marquee_task(sh), writer_task(sh, emit, stats)]
+    if SUSPEND != "off":
+        tasks.append(lifecycle_task())
+    await _run(sh, *tasks)
+
+    halt()
+    loop.remove_writer(stdout.fileno())
+    stdout.close()
+    if pub is not None:
+        for fd in [pub.fileno()] + list(watched.values()):
+            loop.remove_reader(fd)
+        pub.close()
+    if ring is not None:
+        ring.close()
+    stats.dump()
+    cava.close()
 
     return 0
 
 
-def follower():
-    last_mtime = 0.0
-    last_payload = None
-    sleep_s = max(0.002, 0.5 / max(FPS, 1))
+def follower_bars(data: bytes) -> str:
+    """Our bars for one frame from the feed."""
+    if spectrum.is_record(data):
+        _flags, bars, mags = spectrum.decode(data)
+        levels = RENDERER.levels_of(RESAMPLE(mags, bars))
+        return RENDERER.text_of(PEAKS(levels) if PEAKS is not None else levels)
+    # JSON line from the sink of an older producer: its text is already
+    # rendered, bars last (after the title, when it carried one)
+    return json.loads(data).get("text", "").split("  ")[-1]
+
 
-    # seed from file
+def master_bars(data) -> int:
+    """Bar count of the producer's spectrum in `data`; 0 if unknown."""
     try:
-        with open(SINK_PATH, "r") as f:
-            line = f.readline().strip()
-            baseline = json.loads(line) if line else render_payload("")
-    except Exception:
-        baseline = render_payload("")
-    last_payload = baseline
-    if not safe_write_line(last_payload):
+        return spectrum.decode(data)[1] if data and spectrum.is_record(data) else 0
+    except ValueError:
         return 0
 
-    while not STOP:
-        try:
-            st = os.stat(SINK_PATH)
-            if st.st_mtime != last_mtime:
-                last_mtime = st.st_mtime
-                with open(SINK_PATH, "r") as f:
-                    line = f.readline().strip()
-                src = json.loads(line) if line else {}
-                # recompose with fresh metadata
-                bars = src.get("text", "")
-                # If producer stored full text, try to recover bars by taking the rightmost token group after title;
-                # but simpler: rely on SINK bars by re-running render with empty (no double-bake)
-                payload = render_payload(bars_text="")
-                # prefer producer's bars if present
-                if SHOW_BARS and bars:
-                    payload = render_payload(bars_text=bars.split("  ")[-1])
-                if payload != last_payload:
-                    last_payload = payload
-                    if not safe_write_line(payload):
-                        break
-        except FileNotFoundError:
-            pass
-        except Exception:
-            pass
 
-        time.sleep(sleep_s)
+async def follower():
+    poll_s = max(0.002, 0.5 / max(FPS, 1))
+    feed = FrameFeed(SOCK_PATH, RING_PATH, SINK_PATH, poll_s, fps=FPS, bars=BARS)
+    sh = _Shared()
+
+    # seed from ring, else file; the writer prints it right away
+    data = None
+    try:
+        data = feed.first()
+        sh.bars = follower_bars(data) if data else ""
+    except Exception:
+        pass
+    sh.dirty.set()
+    last_data = data
+
+    async def frames_task():
+        nonlocal last_data
+        while True:
+            # Blocks until the producer pushes a frame; polls without one.
+            # While caps are falling, the last frame repeats at FPS instead.
+            tick = None if PEAKS is None or PEAKS.settled else 1.0 / FPS
+            if feed.sub.connect():
+                try:
+                    await asyncio.wait_for(readable(feed.sub), tick)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(poll_s if tick is None else min(poll_s, tick))
+            data = feed.poll()
+            if not data:
+                if tick is None or not last_data:
+                    continue
+                data = last_data
+            last_data = data
+            try:
+                bars = follower_bars(data)
+            except Exception:
+                continue
+            if bars != sh.bars:
+                sh.bars = bars
+                sh.dirty.set()
 
+    last_payload = None
+    stdout, write = stdout_writer(sh)
+
+    def emit(payload) -> bool:
+        nonlocal last_payload
+        if payload == last_payload:
+            return True
+        last_payload = payload
+        return write(LINES.encode(payload))
+
+    async def promote_task():
+        """The producer died or exited: take over the moment its lock is free."""
+        while not watch.held:
+            await readable(watch)
+
+    watch = LockWatch(LOCK_PATH)
+    await _run(
+        sh,
+        frames_task(),
+        metadata_task(sh),
+        marquee_task(sh),
+        writer_task(sh, emit),
+        promote_task(),
+    )
+    asyncio.get_running_loop().remove_writer(stdout.fileno())
+    feed.close()
+    if watch.held:
+        watch.close()
+        # same loop, same composer: bars, title and marquee carry straight on,
+        # and so does stdout (Waybar may still owe us the rest of a line)
+        return await producer(watch.file, sh, master_bars(last_data), stdout)
+    stdout.close()
     return 0
 
 
@@ -554,9 +1116,9 @@ def main():
     install_parent_death_sig()
     lock_file = try_lock(LOCK_PATH)
     if lock_file is not None:
-        return producer(lock_file)
+        return asyncio.run(producer(lock_file))
     else:
-        return follower()
+        return asyncio.run(follower())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/alloc_frames.py
+# tracemalloc check: lib/frames.FrameReader allocates nothing per frame.
+# Every read_frame() / read_latest() call is measured on its own: the traced
+# peak during the call minus the traced total before it, so objects freed
+# again before the call returns count too. The one allowance is the ints the
+# reader can't avoid: a byte count (or the dropped counter) past 256 is a
+# fresh int object, there's no small-int cache for it.
+# Exits 1 if any call after warm-up allocates more than that.
+#
+#   ./alloc_frames.py [--frames 20000] [--bars 6 40 200] [--burst 3]
+
+import argparse
+import fcntl
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lib.frames import FrameReader  # noqa: E402
+
+# one int beyond the small-int cache, as arithmetic allocates it (sizeof the
+# whole struct, 4 bytes more than getsizeof() reports)
+INT = sys.getsizeof(1 << 30)
+
+
+def ints(*values) -> int:
+    """Bytes of the int objects among `values` that CPython has to allocate."""
+    return INT * sum(v > 256 for v in values)
+
+
+def measure(call, allowance, n: int, warm: int):
+    """Run `call()` n times; (calls over allowance(), worst overshoot bytes)."""
+    tracemalloc.start()
+    try:
+        for _ in range(warm):
+            call()
+        over = worst = 0
+        for _ in range(n):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+            extra = peak - before - allowance()
+            if extra > 0:
+                over += 1
+                worst = max(worst, extra)
+    finally:
+        tracemalloc.stop()
+    return over, worst
+
+
+def report(what: str, bit_format: str, bars: int, n: int, over: int, worst: int):
+    status = "ok" if not over else f"ALLOC {over} calls, up to {worst} bytes over"
+    print(f"{what:<11} {bit_format:>5} {bars:>4} bars  {n:>7} calls  {status}")
+    return over
+
+
+def check_read_frame(bars: int, bit_format: str, n: int) -> int:
+    width = 2 if bit_format == "16bit" else 1
+    warm = n // 10
+    with tempfile.TemporaryFile() as f:
+        for _ in range(warm + n):
+            f.write(os.urandom(bars * width))
+        f.seek(0)
+        reader = FrameReader(f.fileno(), bars, bit_format)
+        over, worst = measure(reader.read_frame, lambda: ints(reader.size), n, warm)
+    return report("read_frame", bit_format, bars, n, over, worst)
+
+
+def check_read_latest(bars: int, bit_format: str, n: int, burst: int) -> int:
+    """`burst` frames queued per call: the newest is kept, the rest dropped."""
+    width = 2 if bit_format == "16bit" else 1
+    warm = n // 10
+    r, w = os.pipe()
+    fcntl.fcntl(r, fcntl.F_SETFL, fcntl.fcntl(r, fcntl.F_GETFL) | os.O_NONBLOCK)
+    reader = FrameReader(r, bars, bit_format)
+    chunk = os.urandom(bars * width * burst)
+
+    def call():
+        os.write(w, chunk)  # allocates nothing: `chunk` is already built
+        reader.read_latest()
+
+    try:
+        over, worst = measure(call, lambda: ints(len(chunk), reader.dropped), n, warm)
+    finally:
+        os.close(r)
+        os.close(w)
+    return report("read_latest", bit_format, bars, n, over, worst)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=20000)
+    ap.add_argument("--bars", type=int, nargs="+", default=[6, 40, 200])
+    ap.add_argument("--burst", type=int, default=3)
+    args = ap.parse_args()
+
+    bad = 0
+    for bit_format in ("8bit", "16bit"):
+        for bars in args.bars:
+            bad += check_read_frame(bars, bit_format, args.frames)
+            bad += check_read_latest(bars, bit_format, args.frames, args.burst)
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
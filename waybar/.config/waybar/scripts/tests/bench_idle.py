@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/bench_idle.py
+# What an idle bar costs: a producer and followers run on the fake cava in
+# tests/bin while the only (fake MPRIS) player is paused, once per
+# CAVA_SUSPEND mode. Over --seconds it reports CPU (ms per second) and
+# context switches per second (≈ wakeups) of the producer, the followers
+# and cava itself, and output lines per second; then the player resumes and
+# it reports how long until the producer printed moving bars again.
+#
+#   ./bench_idle.py [--script cava media] [--modes off sigstop stop]
+#                   [--followers 2] [--seconds 10] [--json out.json]
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from bench_pipeline import GAP, bars_text, proc_counters
+from failover import HERE, Instance, lock_holder, start_player, wait_for
+
+SUSPEND_AFTER = 1.0
+
+
+def children(pid: int) -> list:
+    out = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                    out.append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    return out
+
+
+def moving(line: bytes) -> bool:
+    text = bars_text(line)
+    return bool(text) and any(ch not in ("▁", GAP) for ch in text)
+
+
+def rates(before: dict, after: dict, seconds: float) -> dict:
+    return {
+        "cpu_ms_per_s": round((after["cpu"] - before["cpu"]) / seconds * 1e3, 2),
+        "ctxsw_per_s": round((after["ctxsw"] - before["ctxsw"]) / seconds, 1),
+    }
+
+
+def run(script: str, mode: str, args) -> dict:
+    runtime = tempfile.mkdtemp(prefix="bench_idle.")
+    env = dict(
+        os.environ,
+        XDG_RUNTIME_DIR=runtime,
+        PATH=os.path.join(HERE, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        CAVA_SUSPEND=mode,
+        CAVA_SUSPEND_AFTER=str(SUSPEND_AFTER),
+        CAVA_STYLE="blocks",
+        CAVA_GAP=GAP,
+        CAVA_STATS="",
+        WAYBAR_CMD_STATS="",
+    )
+    env.pop("DBUS_SESSION_BUS_ADDRESS", None)
+    bus, player = start_player(env)
+    insts = []
+    try:
+        player.stdin.write("pause\n")
+        player.stdin.flush()
+        producer = Instance(f"{script}_waybar.py", env)
+        insts.append(producer)
+        lock = os.path.join(runtime, "cava_waybar.lock")
+        if not wait_for(lambda: lock_holder(lock) == producer.pid, 5.0):
+            raise RuntimeError("producer never took the lock")
+        insts += [Instance(f"{script}_waybar.py", env) for _ in range(args.followers)]
+        time.sleep(SUSPEND_AFTER + args.warmup)
+
+        cava = children(producer.pid)
+        pids = [i.pid for i in insts] + cava
+        lines0 = [len(i.lines) for i in insts]
+        before = {pid: proc_counters(pid) for pid in pids}
+        time.sleep(args.seconds)
+        after = {pid: proc_counters(pid) for pid in pids}
+        lines1 = [len(i.lines) for i in insts]
+        cava_now = children(producer.pid)
+
+        t_play = time.monotonic()
+        player.stdin.write("play\n")
+        player.stdin.flush()
+        wait_for(
+            lambda: any(
+                t > t_play and moving(ln)
+                for t, ln in zip(producer.times[-20:], producer.lines[-20:])
+            ),
+            5.0,
+        )
+        after_play = [
+            t
+            for t, ln in zip(producer.times, producer.lines)
+            if t > t_play and moving(ln)
+        ]
+    finally:
+        for i in reversed(insts):
+            i.stop()
+        for p in (player, bus):
+            if p is not None:
+                p.terminate()
+                p.wait()
+        shutil.rmtree(runtime, ignore_errors=True)
+
+    def total(group):
+        b = {"cpu": sum(before[p]["cpu"] for p in group), "ctxsw": 0}
+        a = {"cpu": sum(after[p]["cpu"] for p in group), "ctxsw": 0}
+        b["ctxsw"] = sum(before[p]["ctxsw"] for p in group)
+        a["ctxsw"] = sum(after[p]["ctxsw"] for p in group)
+        return rates(b, a, args.seconds)
+
+    followers = [i.pid for i in insts[1:]]
+    # a cava replaced during the window (stop mode) only counts if it lived
+    cava = [p for p in cava if p in cava_now]
+    result = {
+        "script": script,
+        "mode": mode,
+        "producer": total([producer.pid]),
+        "followers": total(followers) if followers else None,
+        "cava": total(cava) if cava else {"cpu_ms_per_s": 0.0, "ctxsw_per_s": 0.0},
+        "lines_per_s": round(
+            (sum(lines1) - sum(lines0)) / args.seconds / len(insts), 2
+        ),
+        "resume_ms": (round((after_play[0] - t_play) * 1e3, 1) if after_play else None),
+    }
+    everyone = [result["producer"], result["cava"]] + (
+        [result["followers"]] if followers else []
+    )
+    result["all"] = {
+        k: round(sum(r[k] for r in everyone), 2)
+        for k in ("cpu_ms_per_s", "ctxsw_per_s")
+    }
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--script", nargs="+", choices=["cava", "media"], default=["cava", "media"]
+    )
+    ap.add_argument(
+        "--modes",
+        nargs="+",
+        choices=["off", "sigstop", "stop"],
+        default=["off", "sigstop", "stop"],
+    )
+    ap.add_argument("--followers", type=int, default=2)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--warmup", type=float, default=1.5)
+    ap.add_argument("--json", help="write results here")
+    args = ap.parse_args()
+
+    if shutil.which("dbus-daemon") is None:
+        print("bench_idle needs dbus-daemon for the fake player")
+        return 1
+    print(f"player paused, {args.followers} followers, {args.seconds:g} s window")
+    print(
+        f"{'script':>6} {'mode':>8}  {'cpu ms/s':>26}  {'ctxsw/s':>26}"
+        f" {'lines/s':>8} {'resume ms':>10}"
+    )
+    print(
+        f"{'':>6} {'':>8}  {'prod  foll  cava   all':>26}  {'prod  foll  cava   all':>26}"
+    )
+    results = []
+    for script in args.script:
+        for mode in args.modes:
+            r = run(script, mode, args)
+            results.append(r)
+            cells = []
+            for k in ("cpu_ms_per_s", "ctxsw_per_s"):
+                row = [r["producer"], r["followers"] or {k: 0}, r["cava"], r["all"]]
+                cells.append(" ".join(f"{x[k]:>5.1f}" for x in row))
+            resume = "-" if r["resume_ms"] is None else f"{r['resume_ms']:.0f}"
+            print(
+                f"{script:>6} {mode:>8}  {cells[0]:>26}  {cells[1]:>26}"
+                f" {r['lines_per_s']:>8} {resume:>10}"
+            )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results": results}, f, indent=1)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/bench_payload.py
+# Per-frame cost of media_waybar's PayloadComposer vs the old render_payload
+# that rebuilt icon, title, tooltip and class on every frame. Checks both
+# produce the same payloads first; exits 1 if they ever differ.
+#
+#   ./bench_payload.py [--seconds 0.5] [--bars 40]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import media_waybar as mw  # noqa: E402
+
+GLYPHS = list("▁▂▃▄▅▆▇█")
+
+META = {
+    "title": "Songs & <Stories>",
+    "artist": "The Benchmarks",
+    "album": "Flat Lines",
+    "status": "Playing",
+    "player": "Fake Player",
+    "position_s": 61.0,
+    "length_s": 180_000_000,
+}
+
+
+_marquee_state = {"last_src": "", "t0": 0.0}
+SCROLL = mw.MARQUEE
+
+
+def legacy_marquee(text: str) -> str:
+    """_marquee() before the Marquee engine, verbatim but for the flag."""
+    if not text:
+        _marquee_state["last_src"] = ""
+        _marquee_state["t0"] = 0.0
+        return ""
+
+    if not SCROLL or mw.TITLE_MAX <= 0 or len(text) <= mw.TITLE_MAX:
+        _marquee_state["last_src"] = text
+        _marquee_state["t0"] = time.monotonic()
+
+        if len(text) <= mw.TITLE_MAX or mw.TITLE_MAX <= 1:
+            return text[: mw.TITLE_MAX]
+
+        return text[: mw.TITLE_MAX - 1] + mw.ELLIPSIS
+
+    base = text + mw.MARQUEE_GAP
+    now = time.monotonic()
+
+    if text != _marquee_state["last_src"]:
+        _marquee_state["last_src"] = text
+        _marquee_state["t0"] = now
+
+    offset = int((now - _marquee_state["t0"]) * max(mw.MARQUEE_SPEED, 0.1)) % len(base)
+
+    end = offset + mw.TITLE_MAX
+    if end <= len(base):
+        return base[offset:end]
+    return base[offset:] + base[: (end - len(base))]
+
+
+def legacy(bars_text: str, meta: dict = mw._EMPTY_INFO):
+    """render_payload() before the composer, verbatim."""
+    pause_icon = "<span size='12000' color='#1CA0FD'></span>"
+    play_icon = "<span size='12000' color='peru'></span>"
+    playpause_icon = (
+        pause_icon if meta.get("status", "").lower() == "playing" else play_icon
+    )
+
+    title = meta.get("title", "").strip()
+    artist = meta.get("artist", "").strip()
+    if title:
+        if mw.SHOW_ARTIST and artist:
+            title_text = f"{title} — {artist}"
+        else:
+            title_text = title
+    else:
+        title_text = ""
+
+    visible_title = legacy_marquee(title_text)
+    visible_title = mw._pango_escape(visible_title)
+    title_text = mw._pango_escape(title_text)
+    bars_text = mw._pango_escape(bars_text)
+    bars_text = f"<span size='7000' color='#1CA0FD'>{bars_text}</span>"
+
+    left = f"{playpause_icon}"
+    parts = []
+    if left:
+        parts.append(left)
+    if visible_title:
+        parts.append(visible_title)
+    if mw.SHOW_BARS and bars_text:
+        parts.append(bars_text)
+
+    text = "  ".join(parts).strip()
+
+    tooltip_lines = []
+
+    t_title = mw._pango_escape(meta.get("title", ""))
+    t_artist = mw._pango_escape(meta.get("artist", ""))
+    t_album = mw._pango_escape(meta.get("album", ""))
+
+    pos_str = mw._fmt_time_secs(meta.get("position_s"))
+    len_str = mw._fmt_time_secs(meta.get("length_s"))
+
+    app = meta.get("player", "")
+    status = meta.get("status", "").lower()
+    app_status = mw._pango_escape(f"{app} ({status})") if (app or status) else ""
+
+    if app_status:
+        tooltip_lines.append(app_status)
+    if t_title:
+        tooltip_lines.append(t_title)
+    if t_artist:
+        tooltip_lines.append(t_artist)
+    if t_album:
+        tooltip_lines.append(t_album)
+    if pos_str != "--:--" or len_str != "--:--":
+        tooltip_lines.append(f"{pos_str} / {len_str}")
+
+    tooltip = "\n".join(tooltip_lines) if tooltip_lines else ""
+    if not tooltip and title_text:
+        tooltip = title_text
+    if not tooltip:
+        tooltip = " "
+
+    return {
+        "text": text,
+        "class": mw.CLASS_NAME
+        + (" playing" if meta.get("status", "").lower() == "playing" else ""),
+        "tooltip": tooltip,
+        "alt": meta.get("status", "").lower() or "",
+    }
+
+
+def per_frame_us(fn, bars, meta, seconds: float) -> float:
+    n, i = 0, 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while True:
+        for _ in range(256):
+            fn(bars[i], meta)
+            i = (i + 1) % len(bars)
+        n += 256
+        now = time.perf_counter()
+        if now >= deadline:
+            return (now - t0) / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=0.5)
+    ap.add_argument("--bars", type=int, default=40)
+    args = ap.parse_args()
+
+    rng = random.Random(1)
+    bars = [
+        mw.GAP.join(rng.choice(GLYPHS) for _ in range(args.bars)) for _ in range(64)
+    ]
+    metas = {
+        "none": mw._EMPTY_INFO,
+        "paused": dict(META, status="Paused", title=""),
+        "playing": META,
+    }
+
+    # Compare with scrolling off: both marquees are time-based, but their
+    # origins differ by the time between the two calls
+    global SCROLL
+    SCROLL = False
+    composer = mw.PayloadComposer()
+    composer.marquee.enabled = False
+    for name, meta in metas.items():
+        for b in bars:
+            if composer.compose(b, meta) != legacy(b, meta):
+                print(f"MISMATCH ({name}): {composer.compose(b, meta)!r}")
+                return 1
+
+    SCROLL = mw.MARQUEE
+    print(f"{'meta':>8} {'impl':>9} {'us/frame':>9} {'speedup':>8}")
+    for name, meta in metas.items():
+        base = per_frame_us(legacy, bars, meta, args.seconds)
+        cost = per_frame_us(mw.PayloadComposer().compose, bars, meta, args.seconds)
+        print(f"{name:>8} {'legacy':>9} {base:>9.2f} {1:>7.1f}x")
+        print(f"{name:>8} {'composer':>9} {cost:>9.2f} {base / cost:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
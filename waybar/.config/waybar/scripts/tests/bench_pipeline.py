@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/bench_pipeline.py
+# End-to-end load test: the fake raw cava in tests/bin feeds a producer and
+# N followers of cava_waybar.py / media_waybar.py, for every combination of
+# the options given. Per instance it reports, over a measured window:
+#   cpu_us_per_frame   user+sys CPU per frame cava wrote (/proc/<pid>/stat)
+#   fps                lines printed per second
+#   latency p50/90/99  cava's write of a frame → that frame's bars printed
+#   syscalls_per_frame read+write syscalls per frame (/proc/<pid>/io)
+#   ctxsw_per_frame    context switches per frame (/proc/<pid>/status)
+# as a table and, with --json, machine-readable. With --baseline (an earlier
+# --json file) any metric more than --tolerance worse fails the run.
+#
+#   ./bench_pipeline.py [--script cava media] [--bits 16 8] [--channels mono]
+#                       [--bars 40] [--followers 2] [--fps 30] [--seconds 5]
+#                       [--pattern random|sweep] [--replay capture.raw]
+#                       [--record capture.raw] [--json out.json]
+#                       [--baseline old.json] [--tolerance 0.25]
+
+import argparse
+import bisect
+import itertools
+import json
+import os
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+
+from failover import HERE, Instance, lock_holder, start_player, wait_for
+
+sys.path.insert(0, os.path.dirname(HERE))
+
+from lib import spectrum  # noqa: E402
+from lib.render import BarRenderer  # noqa: E402
+
+GLYPHS = list("▁▂▃▄▅▆▇█")  # CAVA_STYLE=blocks
+GAP = " "
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+# lower is better for all of these; fps is reported, not compared
+COMPARED = ("cpu_us_per_frame", "latency_p99_ms", "syscalls_per_frame")
+
+
+def proc_counters(pid: int) -> dict:
+    """CPU seconds, read/write syscalls and context switches so far."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / CLK_TCK  # utime, stime
+        io = {}
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                k, v = line.split(":")
+                io[k] = int(v)
+        ctx = 0
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.endswith("ctxt_switches:\t" + line.split("\t")[-1]):
+                    ctx += int(line.split()[-1])
+    except (OSError, ValueError, IndexError):
+        return {"cpu": 0.0, "syscalls": 0, "ctxsw": 0}
+    return {"cpu": cpu, "syscalls": io["syscr"] + io["syscw"], "ctxsw": ctx}
+
+
+def bars_text(line: bytes):
+    """The bars in one output line (media_waybar wraps them in a span)."""
+    try:
+        text = json.loads(line).get("text", "")
+    except ValueError:
+        return None
+    if text.endswith("</span>"):
+        text = text[text.rfind("'>") + 2 : -len("</span>")]
+    return text or None
+
+
+class Frames:
+    """What the fake cava wrote, when: rendered bars → sorted write times."""
+
+    def __init__(self, record: str, log: str, bars: int, bits: int):
+        size = bars * bits // 8
+        with open(log, "rb") as f:
+            times = [t for (t,) in struct.iter_unpack("<d", f.read())]
+        with open(record, "rb") as f:
+            data = f.read()
+        renderer = BarRenderer(GLYPHS, "8bit", GAP, "none")
+        self.times = times
+        self.by_text = {}
+        for i, t in enumerate(times):
+            frame = data[i * size : (i + 1) * size]
+            if len(frame) < size:
+                break
+            mags = spectrum.high_bytes(frame, bits)
+            text = renderer.text_of(renderer.levels_of(mags))
+            self.by_text.setdefault(text, []).append(t)
+
+    def written(self, t0: float, t1: float) -> int:
+        return bisect.bisect_right(self.times, t1) - bisect.bisect_right(self.times, t0)
+
+    def latency(self, text: str, t_line: float):
+        """Seconds since the newest write of this frame before `t_line`."""
+        times = self.by_text.get(text)
+        if not times:
+            return None
+        i = bisect.bisect_right(times, t_line)
+        return t_line - times[i - 1] if i else None
+
+
+def pct(values, q):
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))] if s else None
+
+
+def measure(inst, before, after, frames, t0, t1) -> dict:
+    n = max(1, frames.written(t0, t1))
+    seen = [(t, ln) for t, ln in zip(inst.times, inst.lines) if t0 < t <= t1]
+    lat = []
+    for t, ln in seen:
+        text = bars_text(ln)
+        d = frames.latency(text, t) if text else None
+        if d is not None:
+            lat.append(d)
+    out = {
+        "cpu_us_per_frame": round((after["cpu"] - before["cpu"]) / n * 1e6, 1),
+        "fps": round(len(seen) / (t1 - t0), 2),
+        "syscalls_per_frame": round((after["syscalls"] - before["syscalls"]) / n, 2),
+        "ctxsw_per_frame": round((after["ctxsw"] - before["ctxsw"]) / n, 2),
+        "matched": len(lat),
+    }
+    for q in (50, 90, 99):
+        v = pct(lat, q / 100)
+        out[f"latency_p{q}_ms"] = round(v * 1e3, 2) if v is not None else None
+    return out
+
+
+def mean_of(results):
+    """Followers averaged into one row (None-safe)."""
+    if not results:
+        return {}
+    out = {}
+    for k in results[0]:
+        vals = [r[k] for r in results if r[k] is not None]
+        out[k] = round(statistics.mean(vals), 2) if vals else None
+    return out
+
+
+def run(cfg: dict, args) -> dict:
+    runtime = tempfile.mkdtemp(prefix="bench_pipeline.")
+    record = os.path.join(runtime, "frames.raw")
+    log = os.path.join(runtime, "frames.log")
+    env = dict(
+        os.environ,
+        XDG_RUNTIME_DIR=runtime,
+        PATH=os.path.join(HERE, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        CAVA_BARS=str(cfg["bars"]),
+        CAVA_BIT=f"{cfg['bits']}bit",
+        CAVA_CHANNELS=cfg["channels"],
+        CAVA_FPS=str(cfg["fps"]),
+        CAVA_STYLE="blocks",
+        CAVA_GAP=GAP,
+        CAVA_BORDER="none",
+        CAVA_IDLE_FPS="0",
+        CAVA_STATS="",
+        FAKE_CAVA_PATTERN=args.pattern,
+        FAKE_CAVA_RECORD=record,
+        FAKE_CAVA_LOG=log,
+    )
+    if args.replay:
+        env["FAKE_CAVA_REPLAY"] = os.path.abspath(args.replay)
+    env.pop("DBUS_SESSION_BUS_ADDRESS", None)
+    bus, player = start_player(env)
+    script = f"{cfg['script']}_waybar.py"
+    insts = []
+    try:
+        producer = Instance(script, env)
+        insts.append(producer)
+        lock = os.path.join(runtime, "cava_waybar.lock")
+        if not wait_for(lambda: lock_holder(lock) == producer.pid, 5.0):
+            raise RuntimeError("producer never took the lock")
+        insts += [Instance(script, env) for _ in range(cfg["followers"])]
+        time.sleep(args.warmup)
+
+        t0 = time.monotonic()
+        before = [proc_counters(i.pid) for i in insts]
+        time.sleep(args.seconds)
+        after = [proc_counters(i.pid) for i in insts]
+        t1 = time.monotonic()
+        time.sleep(0.2)  # lines of the window's last frames
+    finally:
+        for i in insts:
+            i.stop()
+        for p in (player, bus):
+            if p is not None:
+                p.terminate()
+                p.wait()
+
+    try:
+        frames = Frames(record, log, cfg["bars"], cfg["bits"])
+        if args.record:
+            shutil.copyfile(record, args.record)
+    finally:
+        shutil.rmtree(runtime, ignore_errors=True)
+    rows = [measure(i, b, a, frames, t0, t1) for i, b, a in zip(insts, before, after)]
+    return dict(
+        cfg,
+        cava_fps=round(frames.written(t0, t1) / (t1 - t0), 2),
+        producer=rows[0],
+        followers=mean_of(rows[1:]),
+    )
+
+
+def regressions(results, baseline, tolerance):
+    old = {json.dumps(r["config"], sort_keys=True): r for r in baseline}
+    out = []
+    for r in results:
+        b = old.get(json.dumps(r["config"], sort_keys=True))
+        if b is None:
+            continue
+        for role in ("producer", "followers"):
+            for k in COMPARED:
+                new, was = r[role].get(k), b[role].get(k)
+                if new is not None and was and new > was * (1 + tolerance):
+                    out.append(f"{r['config']} {role} {k}: {was} → {new}")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--script", nargs="+", choices=["cava", "media"], default=["cava", "media"]
+    )
+    ap.add_argument("--bits", nargs="+", type=int, choices=[8, 16], default=[16])
+    ap.add_argument(
+        "--channels", nargs="+", choices=["mono", "stereo"], default=["mono"]
+    )
+    ap.add_argument("--bars", nargs="+", type=int, default=[40])
+    ap.add_argument("--followers", nargs="+", type=int, default=[2])
+    ap.add_argument("--fps", nargs="+", type=int, default=[30])
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--warmup", type=float, default=1.0)
+    ap.add_argument("--pattern", choices=["random", "sweep"], default="random")
+    ap.add_argument("--replay", help="raw capture for the fake cava to loop")
+    ap.add_argument("--record", help="keep the last run's raw frames here")
+    ap.add_argument("--json", help="write results here")
+    ap.add_argument("--baseline", help="earlier --json output to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args()
+
+    keys = ("script", "bits", "channels", "bars", "followers", "fps")
+    grid = itertools.product(
+        args.script, args.bits, args.channels, args.bars, args.followers, args.fps
+    )
+    print(
+        f"{'script':>6} {'bits':>4} {'ch':>6} {'bars':>4} {'fol':>3} {'fps':>3}"
+        f"  {'role':>9} {'cpu us/f':>9} {'out fps':>7} {'p50 ms':>7} {'p90 ms':>7}"
+        f" {'p99 ms':>7} {'sys/f':>6} {'csw/f':>6}"
+    )
+    results = []
+    for combo in grid:
+        cfg = dict(zip(keys, combo))
+        r = run(cfg, args)
+        results.append(
+            {
+                "config": cfg,
+                "cava_fps": r["cava_fps"],
+                "producer": r["producer"],
+                "followers": r["followers"],
+            }
+        )
+        head = (
+            f"{cfg['script']:>6} {cfg['bits']:>4} {cfg['channels']:>6}"
+            f" {cfg['bars']:>4} {cfg['followers']:>3} {cfg['fps']:>3}"
+        )
+        for role in ("producer", "followers"):
+            m = r[role]
+            if not m:
+                continue
+
+            def f(k, w):
+                v = m.get(k)
+                return f"{'-':>{w}}" if v is None else f"{v:>{w}}"
+
+            print(
+                f"{head}  {role:>9} {f('cpu_us_per_frame', 9)} {f('fps', 7)}"
+                f" {f('latency_p50_ms', 7)} {f('latency_p90_ms', 7)}"
+                f" {f('latency_p99_ms', 7)} {f('syscalls_per_frame', 6)}"
+                f" {f('ctxsw_per_frame', 6)}"
+            )
+            head = " " * len(head)
+
+    doc = {"machine": os.uname().machine, "python": sys.version.split()[0]}
+    doc["results"] = results
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(doc, f, indent=1)
+            f.write("\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            worse = regressions(results, json.load(f)["results"], args.tolerance)
+        for line in worse:
+            print(f"REGRESSION {line}")
+        return 1 if worse else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
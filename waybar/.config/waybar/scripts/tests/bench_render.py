@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/bench_render.py
+# Frames/sec of lib/render.py vs the old struct.unpack + val_to_token loop,
+# and what peak caps add on top: lib/render.PeakHold (vectorized) vs the same
+# hold/fall as one Python object per bar. Caps render with the bar glyphs
+# here, so the text is the same size and only the cap state is measured.
+#
+#   ./bench_render.py [--seconds 0.5] [--bars 6 40 200]
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lib.render import BarRenderer, PeakHold, np  # noqa: E402
+
+GLYPHS = list("▁▂▃▄▅▆▇█")
+GAP = " "
+HOLD, DECAY = 6, 11  # 0.5 s hold, 8 levels/s at 12 fps
+
+
+def legacy(bars: int, bit16: bool):
+    fmt = ("H" if bit16 else "B") * bars
+    maxv = 65535 if bit16 else 255
+
+    def val_to_token(v):
+        idx = round((v / maxv) * (len(GLYPHS) - 1))
+        if idx < 0:
+            idx = 0
+        if idx >= len(GLYPHS):
+            idx = len(GLYPHS) - 1
+        return GLYPHS[idx]
+
+    def render(buf):
+        vals = struct.unpack(fmt, buf)
+        return GAP.join([val_to_token(v) for v in vals])
+
+    return render
+
+
+class Cap:
+    """One bar's cap, the per-object way."""
+
+    __slots__ = ("fine", "left")
+
+    def __init__(self):
+        self.fine = 0
+        self.left = 0
+
+    def step(self, level: int) -> int:
+        if self.left:
+            self.left -= 1
+        else:
+            self.fine = max(0, self.fine - DECAY)
+        if level << 4 >= self.fine:
+            self.fine = level << 4
+            self.left = HOLD
+        return (self.fine & 0x70) | level
+
+
+def peaks(bit_format: str, vectorized: bool):
+    r = BarRenderer(GLYPHS, bit_format, GAP, caps=GLYPHS)
+    if vectorized:
+        hold = PeakHold(HOLD, DECAY)
+        return lambda buf: r.text_of(hold(r.levels_of(buf)))
+    caps = []
+
+    def render(buf):
+        levels = r.levels_of(buf)
+        if len(caps) != len(levels):
+            caps[:] = [Cap() for _ in levels]
+        return r.text_of(bytes([c.step(lv) for c, lv in zip(caps, levels)]))
+
+    return render
+
+
+def rate(fn, frames, seconds: float) -> float:
+    n, i = 0, 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while True:
+        for _ in range(256):
+            fn(frames[i])
+            i = (i + 1) % len(frames)
+        n += 256
+        now = time.perf_counter()
+        if now >= deadline:
+            return n / (now - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=0.5)
+    ap.add_argument("--bars", type=int, nargs="+", default=[6, 40, 200])
+    args = ap.parse_args()
+
+    print(
+        f"{'bits':>5} {'bars':>5} {'impl':>9} {'frames/s':>12} {'us/frame':>9}"
+        f" {'speedup':>8}"
+    )
+    for bit_format in ("8bit", "16bit"):
+        bit16 = bit_format == "16bit"
+        for bars in args.bars:
+            frames = [os.urandom(bars * (2 if bit16 else 1)) for _ in range(64)]
+            impls = [
+                ("legacy", legacy(bars, bit16)),
+                ("lut", BarRenderer(GLYPHS, bit_format, GAP).render),
+                ("lut+caps", peaks(bit_format, True)),
+                ("obj+caps", peaks(bit_format, False)),
+            ]
+            if np is not None:
+                impls.append(
+                    (
+                        "numpy",
+                        BarRenderer(GLYPHS, bit_format, GAP, use_numpy=True).render,
+                    )
+                )
+            base = None
+            for name, fn in impls:
+                fps = rate(fn, frames, args.seconds)
+                base = base or fps
+                print(
+                    f"{bit_format:>5} {bars:>5} {name:>9} {fps:>12,.0f}"
+                    f" {1e6 / fps:>9.2f} {fps / base:>7.1f}x"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/check_jsonline.py
+# lib/jsonline.py must be byte-identical to json.dumps(payload) + "\n".
+# Feeds it random payloads shaped like both scripts' output (bars glyphs,
+# pango markup, quotes, backslashes, control characters, astral and lone
+# surrogate code points) plus edge cases; prints "ok" or the first mismatch
+# and exits 1. Then times both encoders.
+#
+#   ./check_jsonline.py [--frames 20000] [--seconds 0.5]
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lib.jsonline import LineEncoder  # noqa: E402
+
+ALPHABET = (
+    list("▁▂▃▄▅▆▇█⡀⡄⣆⣇⣧⣷⣿·•●◉△▲░▒▓|_-^  ")
+    + list("abcXYZ019 &<>'\"\\/—…")
+    + ["\n", "\t", "\x00", "\x1f", "\x7f", " ", "\ud800", "🎵", "é"]
+)
+
+
+def rand_text(rng, n):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, n)))
+
+
+def reference(payload) -> bytes:
+    return (json.dumps(payload) + "\n").encode()
+
+
+def payloads(rng, frames):
+    tooltip = rand_text(rng, 60)
+    for i in range(frames):
+        if i % 97 == 0:  # metadata change
+            tooltip = rand_text(rng, 60)
+        if i % 2:
+            yield {"text": rand_text(rng, 80), "class": "cava"}
+        else:
+            yield {
+                "text": rand_text(rng, 120),
+                "class": rng.choice(["cava", "cava playing"]),
+                "tooltip": tooltip,
+                "alt": rng.choice(["", "playing", "paused"]),
+            }
+    # shapes that must fall back or re-key cleanly
+    yield {}
+    yield {"text": None, "class": "cava"}
+    yield {"class": "cava", "text": "x"}
+    yield {"text": "", "class": "cava", "n": 1, "f": 0.5, "b": True}
+
+
+def rate(fn, items, seconds: float) -> float:
+    n, i = 0, 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while True:
+        for _ in range(256):
+            fn(items[i])
+            i = (i + 1) % len(items)
+        n += 256
+        now = time.perf_counter()
+        if now >= deadline:
+            return n / (now - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=20000)
+    ap.add_argument("--seconds", type=float, default=0.5)
+    args = ap.parse_args()
+
+    rng = random.Random(12)
+    enc = LineEncoder()
+    n = 0
+    for p in payloads(rng, args.frames):
+        got, want = enc.encode(p), reference(p)
+        if got != want:
+            print(f"MISMATCH for {p!r}:\n  got  {got!r}\n  want {want!r}")
+            return 1
+        n += 1
+    print(f"ok: {n} payloads byte-identical to json.dumps")
+
+    # one metadata snapshot, new bars every frame: the producer's steady state
+    meta = {"class": "cava playing", "tooltip": rand_text(rng, 60), "alt": "playing"}
+    frames = [dict(text=rand_text(rng, 120), **meta) for _ in range(64)]
+    enc = LineEncoder()
+    base = rate(reference, frames, args.seconds)
+    fast = rate(enc.encode, frames, args.seconds)
+    print(f"json.dumps  {base:>12,.0f} lines/s")
+    print(f"LineEncoder {fast:>12,.0f} lines/s {fast / base:>6.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/check_mpris.py
+# lib/mpris.py against a private session bus and fake players (fake_mpris.py):
+# pump() must stay non-blocking while a player that appears or invalidates
+# its properties leaves our calls unanswered, and signals with unexpected
+# bodies must be skipped without raising or corrupting the player table.
+# Exits 1 on a pump slower than --max-pump or a wrong table.
+#
+#   ./check_mpris.py [--hang 3] [--max-pump 0.05]
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lib.mpris import MPRIS_PREFIX, MprisClient  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def player(env: dict, name: str, *extra):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fake_mpris.py"), "--name", name, *extra],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        text=True,
+    )
+    proc.stdout.readline()  # "ready": the bus name is taken
+    return proc
+
+
+def send(proc, line: str) -> None:
+    proc.stdin.write(line + "\n")
+    proc.stdin.flush()
+
+
+def pump_for(client: MprisClient, seconds: float, until=None) -> float:
+    """Pump every 10 ms for `seconds` (or until `until()`); the slowest pump."""
+    worst = 0.0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        t0 = time.monotonic()
+        client.pump()
+        worst = max(worst, time.monotonic() - t0)
+        if until is not None and until():
+            break
+        time.sleep(0.01)
+    return worst
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--hang", type=float, default=3.0)
+    ap.add_argument("--max-pump", type=float, default=0.05)
+    args = ap.parse_args()
+
+    if shutil.which("dbus-daemon") is None:
+        print("check_mpris needs dbus-daemon")
+        return 1
+    bus = subprocess.Popen(
+        ["dbus-daemon", "--session", "--print-address", "--nofork"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    address = bus.stdout.readline().strip()
+    env = dict(os.environ, DBUS_SESSION_BUS_ADDRESS=address)
+    procs = []
+    failed = False
+
+    def check(what: str, ok: bool, worst: float) -> None:
+        nonlocal failed
+        slow = worst > args.max_pump
+        failed |= slow or not ok
+        verdict = "ok" if ok and not slow else "FAIL"
+        print(f"{what:<40} slowest pump {worst * 1e3:>7.1f} ms  {verdict}")
+
+    try:
+        procs.append(player(env, "one"))
+        send(procs[0], "play")
+        client = MprisClient(address)
+        one = MPRIS_PREFIX + "one"
+        worst = pump_for(client, 2.0, lambda: one in client.players)
+        check("startup: existing player listed", one in client.players, worst)
+
+        # A player that takes its name, then answers nothing for a while
+        procs.append(player(env, "stuck", "--stall", str(args.hang)))
+        stuck = MPRIS_PREFIX + "stuck"
+        worst = pump_for(client, args.hang / 2)
+        check("stuck player appearing", stuck not in client.players, worst)
+        worst = pump_for(client, args.hang + 2.0, lambda: stuck in client.players)
+        check("stuck player listed once it answers", stuck in client.players, worst)
+
+        # Invalidated properties, then the player hangs before answering
+        send(procs[0], "title Refreshed")
+        send(procs[0], "invalidate")
+        send(procs[0], f"hang {args.hang}")
+        worst = pump_for(client, args.hang / 2)
+        check("invalidate from a hung player", True, worst)
+        p = client.players.get(one)
+        worst = pump_for(
+            client, args.hang + 2.0, lambda: p is not None and p.title == "Refreshed"
+        )
+        check(
+            "invalidated metadata re-read",
+            p is not None and p.title == "Refreshed",
+            worst,
+        )
+
+        # Signals whose bodies don't unpack as expected
+        send(procs[0], "garbage")
+        try:
+            worst = pump_for(client, 1.0)
+            p = client.players.get(one)
+            ok = (
+                p is not None
+                and p.status == "Playing"
+                and p.title == "Refreshed"
+                and p.clock.rate == 1.0
+            )
+        except Exception as e:
+            print(f"pump raised {type(e).__name__}: {e}")
+            worst, ok = 0.0, False
+        check("malformed signals skipped", ok, worst)
+    finally:
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+        bus.terminate()
+        bus.wait()
+
+    print("FAIL" if failed else "ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
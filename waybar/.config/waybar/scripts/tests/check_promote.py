@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/check_promote.py
+# A follower promoted while Waybar isn't reading: media_waybar.py's follower
+# writes into a one-page pipe, next to a fake MPRIS player whose title makes
+# every line longer than the pipe. Once the title shows up the pipe is left
+# alone, so the next line only half fits. Then the producer is killed, the
+# follower takes over and the pipe is drained: every line that comes out must still be whole JSON
+# (bar the very last one, which the follower's own exit may cut short).
+# Exits 1 on a spliced or broken line.
+#
+#   ./check_promote.py [--title-len 6000] [--seconds 2]
+
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import termios
+import time
+
+from failover import HERE, SCRIPTS, lock_holder, start_player, wait_for
+
+PAGE = 4096  # the pipe's size: a longer line only partly fits
+
+
+def unread(fd: int) -> int:
+    """Bytes waiting in the pipe."""
+    buf = bytearray(4)
+    fcntl.ioctl(fd, termios.FIONREAD, buf)
+    return int.from_bytes(buf, sys.byteorder)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--title-len", type=int, default=6000)
+    ap.add_argument("--seconds", type=float, default=2.0)
+    args = ap.parse_args()
+
+    if shutil.which("dbus-daemon") is None:
+        print("check_promote needs dbus-daemon for the fake player")
+        return 1
+    runtime = tempfile.mkdtemp(prefix="check_promote.")
+    env = dict(
+        os.environ,
+        XDG_RUNTIME_DIR=runtime,
+        PATH=os.path.join(HERE, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        CAVA_STATS="",
+        WAYBAR_CMD_STATS="",
+    )
+    env.pop("DBUS_SESSION_BUS_ADDRESS", None)
+    bus, player = start_player(env)
+    player.stdin.write("title " + "x" * args.title_len + "\n")
+    player.stdin.flush()
+    script = os.path.join(SCRIPTS, "media_waybar.py")
+    lock = os.path.join(runtime, "cava_waybar.lock")
+    procs = []
+    r, w = os.pipe()
+    fcntl.fcntl(w, fcntl.F_SETPIPE_SZ, PAGE)
+    try:
+        producer = subprocess.Popen(
+            [sys.executable, script], stdout=subprocess.DEVNULL, env=env
+        )
+        procs.append(producer)
+        if not wait_for(lambda: lock_holder(lock) == producer.pid, 5.0):
+            print("producer never took the lock")
+            return 1
+        follower = subprocess.Popen(
+            [sys.executable, script], stdout=w, stderr=subprocess.DEVNULL, env=env
+        )
+        procs.append(follower)
+        os.close(w)
+        w = None
+        # drain until the title is in: lines from then on are longer than the
+        # pipe, and one written into the emptied pipe stops at a page
+        data = bytearray()
+        os.set_blocking(r, False)
+        deadline = time.monotonic() + 10.0
+        while max(map(len, data.split(b"\n")[:-1]), default=0) <= PAGE:
+            if time.monotonic() > deadline:
+                print("the title never reached the follower")
+                return 1
+            try:
+                data += os.read(r, 65536)
+            except BlockingIOError:
+                time.sleep(0.01)
+        if not wait_for(lambda: unread(r) >= PAGE, 5.0):
+            print(f"the follower's pipe never filled ({unread(r)} bytes)")
+            return 1
+        time.sleep(0.5)  # more lines queue up behind the half-written one
+
+        producer.kill()
+        producer.wait()
+        took = wait_for(lambda: lock_holder(lock) == follower.pid, 5.0)
+        time.sleep(0.5)  # the new producer has lines of its own by now
+
+        deadline = time.monotonic() + args.seconds
+        while time.monotonic() < deadline:
+            try:
+                data += os.read(r, 65536)
+            except BlockingIOError:
+                time.sleep(0.01)
+        follower.send_signal(signal.SIGTERM)
+        follower.wait(timeout=3)
+        os.set_blocking(r, True)
+        while chunk := os.read(r, 65536):
+            data += chunk
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        for fd in (r, w):
+            if fd is not None:
+                os.close(fd)
+        for p in (player, bus):
+            if p is not None:
+                p.kill()
+                p.wait()
+        shutil.rmtree(runtime, ignore_errors=True)
+
+    lines = bytes(data).split(b"\n")
+    lines.pop()  # after the last newline: empty, or a line the exit cut short
+    lines = [ln for ln in lines if ln]
+    bad = 0
+    for ln in lines:
+        try:
+            json.loads(ln)
+        except ValueError:
+            bad += 1
+            print(f"broken line ({len(ln)} bytes): {ln[:60]!r}…{ln[-60:]!r}")
+    ok = took and lines and not bad
+    print(
+        f"takeover {'ok' if took else 'FAIL'}  {len(lines)} lines"
+        f"  {bad} broken  {'ok' if ok else 'FAIL'}"
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/check_stages.py
+# lib/stats.py stage timers: Histogram quantiles must land within one bucket
+# (~6%) of the exact sample quantiles, and a lap must stay cheap: reports the
+# cost per start()+lap() with profiling on and off. Exits 1 on a bad quantile.
+#
+#   ./check_stages.py [--samples 200000] [--laps 200000]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lib.stats import Histogram, NoStages, Stages  # noqa: E402
+
+TOLERANCE = 1.0 / Histogram.SUB  # half a bucket either side, rounded up
+
+
+def exact(samples, q):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def check_quantiles(n: int) -> bool:
+    rng = random.Random(20)
+    ok = True
+    shapes = {
+        "lognormal 20us": lambda: rng.lognormvariate(-10.8, 0.8),
+        "bimodal 5us/2ms": lambda: rng.choice((5e-6, 2e-3)) * rng.uniform(0.9, 1.1),
+        "uniform 0-50ms": lambda: rng.uniform(0, 0.05),
+    }
+    for name, draw in shapes.items():
+        samples = [draw() for _ in range(n)]
+        h = Histogram()
+        for x in samples:
+            h.add(x)
+        for q in (0.5, 0.9, 0.99):
+            want, got = exact(samples, q), h.quantile(q)
+            err = abs(got - want) / want
+            flag = "" if err <= TOLERANCE else "  <-- off"
+            ok &= err <= TOLERANCE
+            print(
+                f"{name:>16} p{q * 100:<4g} exact {want * 1e6:>9.1f} us"
+                f"  hist {got * 1e6:>9.1f} us  {err * 100:4.1f}%{flag}"
+            )
+    return ok
+
+
+def per_lap_ns(stages, laps: int) -> float:
+    names = ("read", "unpack", "levels", "publish")
+    t0 = time.perf_counter()
+    for _ in range(laps // len(names)):
+        stages.start()
+        for name in names:
+            stages.lap(name)
+    return (time.perf_counter() - t0) / laps * 1e9
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--samples", type=int, default=200000)
+    ap.add_argument("--laps", type=int, default=200000)
+    args = ap.parse_args()
+
+    ok = check_quantiles(args.samples)
+    print(f"profiling off {per_lap_ns(NoStages(), args.laps):>7.0f} ns/lap")
+    print(f"profiling on  {per_lap_ns(Stages(), args.laps):>7.0f} ns/lap")
+    print("ok" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/check_stdout.py
+# stdout's blocking mode after the scripts exit. It lives on the open file
+# description, which a script shares with whoever started it: run from a
+# terminal, a script that leaves O_NONBLOCK set hands the shell EAGAIN. Each
+# script runs as producer, then as follower (next to a producer on its own
+# stdout), with stdout on a pty and on a pipe, for --seconds before SIGTERM.
+# Exits 1 if any of them leaves its stdout non-blocking.
+#
+#   ./check_stdout.py [--scripts cava_waybar.py media_waybar.py] [--seconds 1]
+
+import argparse
+import os
+import pty
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from failover import HERE, SCRIPTS, lock_holder, wait_for
+
+
+def drain(fd: int) -> None:
+    """Keep reading so the script never fills its stdout."""
+
+    def run():
+        try:
+            while os.read(fd, 65536):
+                pass
+        except OSError:
+            pass
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def start(script: str, env: dict, out: int):
+    return subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS, script)],
+        stdout=out,
+        stderr=subprocess.DEVNULL,
+        env=env,
+    )
+
+
+def stop(proc) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=3)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def check(script: str, role: str, kind: str, seconds: float) -> bool:
+    runtime = tempfile.mkdtemp(prefix="check_stdout.")
+    env = dict(
+        os.environ,
+        XDG_RUNTIME_DIR=runtime,
+        PATH=os.path.join(HERE, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        CAVA_STATS="",
+        WAYBAR_CMD_STATS="",
+    )
+    env.pop("DBUS_SESSION_BUS_ADDRESS", None)
+    if kind == "pty":
+        ours, theirs = pty.openpty()  # ours: the terminal side we read
+    else:
+        ours, theirs = os.pipe()
+    drain(ours)
+    producer = None
+    try:
+        if role == "follower":
+            producer = start(script, env, subprocess.DEVNULL)
+            lock = os.path.join(runtime, "cava_waybar.lock")
+            if not wait_for(lambda: lock_holder(lock) == producer.pid, 5.0):
+                print(f"{script:<15} {role:<8} {kind:<4}  producer never started")
+                return False
+        proc = start(script, env, theirs)
+        time.sleep(seconds)
+        stop(proc)
+        # `theirs` is the script's stdout: the same open file description
+        ok = os.get_blocking(theirs)
+        print(
+            f"{script:<15} {role:<8} {kind:<4}  exit {proc.returncode:>3}"
+            f"  stdout {'blocking' if ok else 'NON-BLOCKING'}  {'ok' if ok else 'FAIL'}"
+        )
+        return ok
+    finally:
+        if producer is not None:
+            stop(producer)
+        os.close(theirs)
+        os.close(ours)
+        shutil.rmtree(runtime, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--scripts",
+        nargs="+",
+        choices=["cava_waybar.py", "media_waybar.py"],
+        default=["cava_waybar.py", "media_waybar.py"],
+    )
+    ap.add_argument("--seconds", type=float, default=1.0)
+    args = ap.parse_args()
+
+    ok = all(
+        [
+            check(script, role, kind, args.seconds)
+            for script in args.scripts
+            for role in ("producer", "follower")
+            for kind in ("pty", "pipe")
+        ]
+    )
+    print("ok" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/check_suspend.py
+# Suspended cava (CAVA_SUSPEND): a producer (cava_waybar.py or media_waybar.py)
+# and a cava_waybar.py follower run on the fake cava in tests/bin next to a
+# fake MPRIS player, which pauses (flat bars once cava is suspended), quits
+# (bars blank), comes back paused (flat again) and plays (moving bars, cava
+# resumed). Each step must show up on every cava_waybar.py instance within
+# --within seconds, for every --producers and --modes entry. Exits 1 otherwise.
+# Mode "off" never suspends cava and idles event-only (CAVA_IDLE_FPS=0) on a
+# silent fake cava: the bars stay flat while a player is around, and only the
+# player quitting (blank) or coming back (flat) changes what shows, which must
+# still get past the idle gate.
+#
+#   ./check_suspend.py [--producers cava_waybar.py media_waybar.py]
+#                      [--modes sigstop stop off] [--within 3]
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_idle import moving
+from bench_pipeline import GAP
+from failover import HERE, Instance, lock_holder, start_player, wait_for
+
+SUSPEND_AFTER = 1.0
+
+
+def text(inst) -> str:
+    try:
+        return json.loads(inst.lines[-1])["text"] if inst.lines else None
+    except ValueError:
+        return None
+
+
+def flat(t) -> bool:
+    return bool(t) and not moving(json.dumps({"text": t}).encode())
+
+
+def blank(t) -> bool:
+    return t == ""
+
+
+def moving_text(t) -> bool:
+    return bool(t) and moving(json.dumps({"text": t}).encode())
+
+
+def new_player(env: dict):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fake_mpris.py"), "--name", "again"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        text=True,
+    )
+    proc.stdout.readline()
+    return proc
+
+
+def send(proc, line: str) -> None:
+    proc.stdin.write(line + "\n")
+    proc.stdin.flush()
+
+
+def run(script: str, mode: str, within: float) -> bool:
+    runtime = tempfile.mkdtemp(prefix="check_suspend.")
+    env = dict(
+        os.environ,
+        XDG_RUNTIME_DIR=runtime,
+        PATH=os.path.join(HERE, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        CAVA_SUSPEND=mode,
+        CAVA_SUSPEND_AFTER=str(SUSPEND_AFTER),
+        CAVA_STYLE="blocks",
+        CAVA_GAP=GAP,
+        CAVA_STATS="",
+        WAYBAR_CMD_STATS="",
+    )
+    if mode == "off":
+        env.update(CAVA_IDLE_FPS="0", FAKE_CAVA_PATTERN="silent")
+    live = flat if mode == "off" else moving_text
+    env.pop("DBUS_SESSION_BUS_ADDRESS", None)
+    bus, player = start_player(env)
+    insts = []
+    ok = True
+    try:
+        producer = Instance(script, env)
+        insts.append(producer)
+        lock = os.path.join(runtime, "cava_waybar.lock")
+        if not wait_for(lambda: lock_holder(lock) == producer.pid, 5.0):
+            print(f"{mode}: producer never took the lock")
+            return False
+        insts.append(Instance("cava_waybar.py", env))
+        # a media_waybar.py producer shows the bars inside its media payload
+        bars = insts if script == "cava_waybar.py" else insts[1:]
+
+        def step(what: str, action, want, wait: float) -> None:
+            nonlocal ok
+            action()
+            t0 = time.monotonic()
+            good = wait_for(lambda: all(want(text(i)) for i in bars), wait)
+            took = time.monotonic() - t0
+            ok &= good
+            shown = " | ".join(repr((text(i) or "")[:12]) for i in bars)
+            print(
+                f"{script:<15} {mode:>8} {what:<22} {took:>6.2f} s"
+                f"  {'ok' if good else 'FAIL'}  {shown}"
+            )
+
+        step("playing", lambda: None, live, within)
+        step(
+            "paused → flat", lambda: send(player, "pause"), flat, SUSPEND_AFTER + within
+        )
+        time.sleep(0.5)  # well inside the suspension (or the idle rate)
+        step("player quits → blank", lambda: send(player, "quit"), blank, within)
+        again = new_player(env)
+        try:
+            step("new player paused", lambda: send(again, "pause"), flat, within)
+            step("plays", lambda: send(again, "play"), live, within)
+        finally:
+            again.kill()
+            again.wait()
+    finally:
+        for i in reversed(insts):
+            i.stop()
+        for p in (player, bus):
+            if p is not None:
+                p.kill()
+                p.wait()
+        shutil.rmtree(runtime, ignore_errors=True)
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--producers",
+        nargs="+",
+        choices=["cava_waybar.py", "media_waybar.py"],
+        default=["cava_waybar.py", "media_waybar.py"],
+    )
+    ap.add_argument(
+        "--modes",
+        nargs="+",
+        choices=["sigstop", "stop", "off"],
+        default=["sigstop", "stop", "off"],
+    )
+    ap.add_argument("--within", type=float, default=3.0)
+    args = ap.parse_args()
+
+    if shutil.which("dbus-daemon") is None:
+        print("check_suspend needs dbus-daemon for the fake player")
+        return 1
+    ok = all(
+        [
+            run(script, mode, args.within)
+            for script in args.producers
+            for mode in args.modes
+        ]
+    )
+    print("ok" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/crash_cava.py
+# cava supervision: runs a producer and a follower of cava_waybar.py or
+# media_waybar.py on the fake cava in tests/bin and breaks cava through its
+# control file: a crash, a short read, the sound server going away for a
+# while (every start fails), and a hang. For each scenario it reports how
+# long after cava came back each instance printed again and the producer's
+# crash counters. Exits 1 if an instance died, printed blank bars during an
+# outage, or never recovered.
+#
+#   ./crash_cava.py [--script cava|media] [--outage 2.0] [--stall 1.0]
+#                   [--backoff-max 1.0]
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from failover import HERE, Instance, lock_holder, start_player, wait_for
+
+
+def counters(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f).get("counters", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def set_mode(ctl: str, mode: str) -> None:
+    with open(ctl, "w") as f:
+        f.write(mode)
+
+
+def blank(line: bytes) -> bool:
+    """No bars in the line (cava_waybar: empty text; media: no bars span)."""
+    try:
+        text = json.loads(line).get("text", "")
+    except ValueError:
+        return True
+    return not text or text.endswith("></span>")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--script", choices=["cava", "media"], default="cava")
+    ap.add_argument("--outage", type=float, default=2.0)
+    ap.add_argument("--stall", type=float, default=1.0)
+    ap.add_argument("--backoff-max", type=float, default=1.0)
+    ap.add_argument("--settle", type=float, default=1.0)
+    args = ap.parse_args()
+
+    script = f"{args.script}_waybar.py"
+    runtime = tempfile.mkdtemp(prefix="crash_cava.")
+    ctl = os.path.join(runtime, "fake_cava.ctl")
+    stats = os.path.join(runtime, "stats.json")
+    env = dict(
+        os.environ,
+        XDG_RUNTIME_DIR=runtime,
+        PATH=os.path.join(HERE, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        FAKE_CAVA_CTL=ctl,
+        CAVA_STATS=stats,
+        CAVA_STATS_INTERVAL="0.1",
+        CAVA_STALL_S=str(args.stall),
+        CAVA_RESTART_MAX=str(args.backoff_max),
+        CAVA_IDLE_FPS="0",
+    )
+    env.pop("DBUS_SESSION_BUS_ADDRESS", None)
+    bus, player = start_player(env)
+    if bus is None and args.script == "cava":
+        print("warning: no dbus-daemon; cava_waybar output stays blank")
+
+    scenarios = [
+        ("crash", "exit", 0.2),
+        ("short read", "short", 0.2),
+        ("sound server", "exit", args.outage),
+        ("hang", "hang", args.stall + 0.5),
+    ]
+
+    set_mode(ctl, "run")
+    procs = []
+    failed = False
+    try:
+        producer = Instance(script, env)
+        procs.append(producer)
+        if not wait_for(
+            lambda: lock_holder(os.path.join(runtime, "cava_waybar.lock"))
+            == producer.pid,
+            5.0,
+        ):
+            print("producer never took the lock")
+            return 1
+        follower = Instance(script, env)
+        procs.append(follower)
+        insts = {"producer": producer, "follower": follower}
+
+        print(f"{script}, stall watchdog {args.stall:.1f} s")
+        print(
+            f"{'scenario':>12} {'broken s':>9} {'producer ms':>12}"
+            f" {'follower ms':>12}  counters"
+        )
+        for name, mode, hold in scenarios:
+            time.sleep(args.settle)
+            before = counters(stats)
+            t_break = time.monotonic()
+            set_mode(ctl, mode)
+            time.sleep(hold)
+            set_mode(ctl, "run")
+            t_fixed = time.monotonic()
+            time.sleep(args.settle + hold)  # covers the backoff after long outages
+
+            cells = []
+            for label, inst in insts.items():
+                if inst.proc.poll() is not None:
+                    print(f"{name}: {label} exited ({inst.proc.returncode})")
+                    return 1
+                seen = list(zip(inst.times, inst.lines))
+                during = [ln for t, ln in seen if t_break < t <= t_fixed]
+                after = [t for t, _ln in seen if t > t_fixed]
+                if any(blank(ln) for ln in during):
+                    print(f"{name}: {label} printed blank bars during the outage")
+                    failed = True
+                cells.append((after[0] - t_fixed) * 1e3 if after else float("inf"))
+                failed |= not after
+
+            after = counters(stats)
+            delta = {
+                k: after.get(k, 0) - before.get(k, 0)
+                for k in ("cava_exits", "cava_start_failures", "cava_stalls")
+                if after.get(k, 0) != before.get(k, 0)
+            }
+            print(
+                f"{name:>12} {t_fixed - t_break:>9.2f} {cells[0]:>12.0f}"
+                f" {cells[1]:>12.0f}  {' '.join(f'{k}+{v}' for k, v in delta.items())}"
+            )
+    finally:
+        for p in procs:
+            p.stop()
+        for p in (player, bus):
+            if p is not None:
+                p.terminate()
+                p.wait()
+        shutil.rmtree(runtime, ignore_errors=True)
+
+    print("FAIL" if failed else "ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
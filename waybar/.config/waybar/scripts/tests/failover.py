@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/failover.py
+# Producer failover: runs a leader and N followers of cava_waybar.py or
+# media_waybar.py against the fake cava in tests/bin, kills the leader and
+# measures how long the leader took to exit, how long after that until a
+# follower holds the lock (takeover) and the longest pause in each
+# survivor's output from the kill on (freeze). Each
+# round kills the current leader and starts a fresh follower in its place.
+# Exits 1 if a takeover fails or a freeze exceeds --max-freeze.
+#
+#   ./failover.py [--script cava|media] [--followers 2] [--rounds 3]
+#                 [--signal KILL|TERM] [--fps 12] [--max-freeze 1.0]
+#
+# With dbus-daemon installed a fake MPRIS player is started so cava_waybar
+# has something playing (it blanks its bars otherwise).
+
+import argparse
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.dirname(HERE)
+
+
+class Instance:
+    """
+    One script instance with its stdout lines timestamped on arrival.
+    `launcher` runs the script through a wrapper (its path is the argument).
+    """
+
+    def __init__(self, script: str, env: dict, launcher: str = None):
+        argv = [sys.executable, os.path.join(SCRIPTS, script)]
+        if launcher is not None:
+            argv.insert(1, launcher)
+        self.proc = subprocess.Popen(
+            argv,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+        self.times = []
+        self.lines = []
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.proc.stdout:
+            self.lines.append(line)
+            self.times.append(time.monotonic())
+
+    @property
+    def pid(self) -> int:
+        return self.proc.pid
+
+    def freeze(self, t_kill: float, until: float) -> float:
+        """Longest gap between output lines that spans or follows `t_kill`."""
+        times = [t for t in self.times if t <= until]
+        before = [t for t in times if t <= t_kill]
+        after = [t for t in times if t > t_kill]
+        if not before or not after:
+            return float("inf")
+        stamps = [before[-1]] + after
+        return max(b - a for a, b in zip(stamps, stamps[1:]))
+
+    def base_gap(self, t_kill: float) -> float:
+        before = [t for t in self.times if t <= t_kill]
+        gaps = [b - a for a, b in zip(before, before[1:])]
+        return statistics.median(gaps) if gaps else float("nan")
+
+    def stop(self):
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+def lock_holder(path: str) -> int:
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def wait_for(cond, timeout: float, step: float = 0.002) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(step)
+    return cond()
+
+
+def start_player(env: dict):
+    """Private session bus with a playing fake MPRIS player, or (None, None)."""
+    if shutil.which("dbus-daemon") is None:
+        return None, None
+    bus = subprocess.Popen(
+        ["dbus-daemon", "--session", "--print-address", "--nofork"],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    env["DBUS_SESSION_BUS_ADDRESS"] = bus.stdout.readline().strip()
+    player = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fake_mpris.py"), "--name", "failover"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        text=True,
+    )
+    time.sleep(0.3)
+    player.stdin.write("play\n")
+    player.stdin.flush()
+    return bus, player
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--script", choices=["cava", "media"], default="cava")
+    ap.add_argument("--followers", type=int, default=2)
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--signal", choices=["KILL", "TERM"], default="KILL")
+    ap.add_argument("--fps", type=int, default=12)
+    ap.add_argument("--settle", type=float, default=1.5)
+    ap.add_argument("--max-freeze", type=float, default=1.0)
+    args = ap.parse_args()
+
+    script = f"{args.script}_waybar.py"
+    sig = getattr(signal, f"SIG{args.signal}")
+    runtime = tempfile.mkdtemp(prefix="failover.")
+    lock = os.path.join(runtime, "cava_waybar.lock")
+    env = dict(
+        os.environ,
+        XDG_RUNTIME_DIR=runtime,
+        PATH=os.path.join(HERE, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        CAVA_FPS=str(args.fps),
+        CAVA_STATS="",
+        CAVA_IDLE_FPS="0",
+    )
+    env.pop("DBUS_SESSION_BUS_ADDRESS", None)
+    bus, player = start_player(env)
+    if bus is None and args.script == "cava":
+        print("warning: no dbus-daemon; cava_waybar output stays blank")
+
+    procs = []
+    failed = False
+    try:
+        leader = Instance(script, env)
+        procs.append(leader)
+        if not wait_for(lambda: lock_holder(lock) == leader.pid, 5.0):
+            print("leader never took the lock")
+            return 1
+        followers = [Instance(script, env) for _ in range(args.followers)]
+        procs += followers
+
+        print(f"{script} {args.followers} followers, SIG{args.signal}, {args.fps} fps")
+        print(
+            f"{'round':>5} {'exit ms':>8} {'takeover ms':>12} {'base gap ms':>12}"
+            f"  freeze ms per follower"
+        )
+        for rnd in range(1, args.rounds + 1):
+            time.sleep(args.settle)
+            t_kill = time.monotonic()
+            os.kill(leader.pid, sig)
+            leader.proc.wait()
+            t_exit = time.monotonic()
+            pids = {f.pid: f for f in followers}
+            if not wait_for(lambda: lock_holder(lock) in pids, 5.0):
+                print(f"{rnd:>5} no follower took over")
+                return 1
+            takeover = time.monotonic() - t_exit
+            time.sleep(args.settle)
+            until = time.monotonic()
+
+            freezes = [f.freeze(t_kill, until) for f in followers]
+            base = statistics.median(f.base_gap(t_kill) for f in followers)
+            cells = " ".join(f"{x * 1e3:.0f}" for x in freezes)
+            print(
+                f"{rnd:>5} {(t_exit - t_kill) * 1e3:>8.1f} {takeover * 1e3:>12.1f}"
+                f" {base * 1e3:>12.1f}  {cells}"
+            )
+            failed |= any(x > args.max_freeze for x in freezes)
+
+            # the promoted follower leads now; a fresh follower takes its seat
+            leader = pids[lock_holder(lock)]
+            followers.remove(leader)
+            newcomer = Instance(script, env)
+            followers.append(newcomer)
+            procs.append(newcomer)
+    finally:
+        for p in procs:
+            p.stop()
+        for p in (player, bus):
+            if p is not None:
+                p.terminate()
+                p.wait()
+        shutil.rmtree(runtime, ignore_errors=True)
+
+    print("FAIL" if failed else "ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
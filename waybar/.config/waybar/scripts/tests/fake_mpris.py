@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/fake_mpris.py
+# Fake MPRIS player for exercising lib/mpris.py without a real media app.
+#
+#   dbus-daemon --session --print-address --fork   # → export DBUS_SESSION_BUS_ADDRESS
+#   ./fake_mpris.py --name fake [--stall S]           # then type commands on stdin:
+#     play | pause | stop | seek <seconds> | title <text> | artist <text> | quit
+#     hang <seconds>   stop answering calls for a while (a stuck player)
+#     invalidate       PropertiesChanged that invalidates Metadata
+#     garbage          signals with bodies a client doesn't expect
+# Position advances while playing; every Position read is logged to stderr.
+# --stall S: take the bus name, then leave calls unanswered for S seconds.
+
+import argparse
+import os
+import select
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lib.dbus import METHOD_CALL, Connection  # noqa: E402
+from lib.mpris import (  # noqa: E402
+    MPRIS_PATH,
+    MPRIS_PREFIX,
+    PLAYER_IFACE,
+    PROPS_IFACE,
+    ROOT_IFACE,
+)
+
+
+class FakePlayer:
+    def __init__(self, name: str, identity: str):
+        self.bus_name = MPRIS_PREFIX + name
+        self.identity = identity
+        self.status = "Stopped"
+        self.title = "Fake Title"
+        self.artist = "Fake Artist"
+        self.length_us = 180_000_000
+        self._pos_us = 0
+        self._since = None  # monotonic start of the current Playing stretch
+        self.conn = Connection(handler=self.on_message)
+        self.conn.request_name(self.bus_name)
+
+    @property
+    def position_us(self) -> int:
+        if self._since is None:
+            return self._pos_us
+        return self._pos_us + int((time.monotonic() - self._since) * 1_000_000)
+
+    def player_props(self) -> dict:
+        return {
+            "PlaybackStatus": ("s", self.status),
+            "Metadata": ("a{sv}", self.metadata()),
+            "Position": ("x", self.position_us),
+            "Rate": ("d", 1.0),
+        }
+
+    def root_props(self) -> dict:
+        return {"Identity": ("s", self.identity)}
+
+    def metadata(self) -> dict:
+        return {
+            "mpris:trackid": ("o", "/org/mpris/MediaPlayer2/track/1"),
+            "mpris:length": ("x", self.length_us),
+            "xesam:title": ("s", self.title),
+            "xesam:artist": ("as", [self.artist]),
+            "xesam:album": ("s", "Fake Album"),
+        }
+
+    def on_message(self, msg) -> None:
+        if msg.type != METHOD_CALL or msg.interface != PROPS_IFACE:
+            return
+        props = {PLAYER_IFACE: self.player_props(), ROOT_IFACE: self.root_props()}
+        table = props.get(msg.body[0])
+        if table is None:
+            self.conn.error(msg, "org.freedesktop.DBus.Error.UnknownInterface")
+        elif msg.member == "GetAll":
+            self.conn.reply(msg, "a{sv}", (table,))
+        elif msg.member == "Get" and msg.body[1] in table:
+            if msg.body[1] == "Position":
+                print(f"get Position {self.position_us}", file=sys.stderr, flush=True)
+            self.conn.reply(msg, "v", (table[msg.body[1]],))
+        else:
+            self.conn.error(msg, "org.freedesktop.DBus.Error.UnknownProperty")
+
+    def changed(self, **props) -> None:
+        self.conn.emit(
+            MPRIS_PATH,
+            PROPS_IFACE,
+            "PropertiesChanged",
+            "sa{sv}as",
+            (PLAYER_IFACE, props, []),
+        )
+
+    def command(self, line: str) -> bool:
+        cmd, _, arg = line.strip().partition(" ")
+        if cmd in ("play", "pause", "stop"):
+            self._pos_us = 0 if cmd == "stop" else self.position_us
+            self._since = time.monotonic() if cmd == "play" else None
+            self.status = {"play": "Playing", "pause": "Paused", "stop": "Stopped"}[cmd]
+            self.changed(PlaybackStatus=("s", self.status))
+        elif cmd == "seek":
+            self._pos_us = int(float(arg) * 1_000_000)
+            if self._since is not None:
+                self._since = time.monotonic()
+            self.conn.emit(MPRIS_PATH, PLAYER_IFACE, "Seeked", "x", (self._pos_us,))
+        elif cmd in ("title", "artist"):
+            setattr(self, cmd, arg)
+            self.changed(Metadata=("a{sv}", self.metadata()))
+        elif cmd == "hang":
+            time.sleep(float(arg))
+        elif cmd == "invalidate":
+            self.conn.emit(
+                MPRIS_PATH,
+                PROPS_IFACE,
+                "PropertiesChanged",
+                "sa{sv}as",
+                (PLAYER_IFACE, {}, ["Metadata"]),
+            )
+        elif cmd == "garbage":
+            self.conn.emit(MPRIS_PATH, PROPS_IFACE, "PropertiesChanged", "s", ("x",))
+            self.conn.emit(MPRIS_PATH, PLAYER_IFACE, "Seeked", "s", ("x",))
+            self.changed(Rate=("s", "fast"), Metadata=("s", "not a dict"))
+        elif cmd == "quit":
+            return False
+        return True
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--name", default="fake")
+    ap.add_argument("--identity", default="Fake Player")
+    ap.add_argument("--stall", type=float, default=0.0)
+    args = ap.parse_args()
+
+    player = FakePlayer(args.name, args.identity)
+    print(f"ready {player.bus_name}", flush=True)
+    time.sleep(args.stall)
+    # unbuffered: a buffered readline would swallow the next command unseen
+    # by select()
+    stdin = open(sys.stdin.fileno(), "rb", buffering=0)
+    while True:
+        # calls that arrived alongside a reply we waited for sit in the
+        # buffer, where select() can't see them
+        player.conn.process()
+        r, _, _ = select.select([stdin, player.conn], [], [])
+        if player.conn in r:
+            player.conn.process()
+        if stdin in r:
+            line = stdin.readline().decode()
+            if not line or not player.command(line):
+                break
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/fork_budget.py
+# Fork accounting check: runs a producer and followers of the given scripts
+# on the fakes in tests/bin (cava, and playerctl for the no-D-Bus fallback)
+# for --seconds, then reads the lib/procs totals file and prints, per
+# command name, runs, spawn failures, timeouts, exit codes, wall-time
+# p50/p99 and runs per minute. With --bus a private session bus and a fake
+# MPRIS player are started, so nothing should fork but cava. Exits 1 when a
+# command exceeds its --budget (runs per minute, over all instances).
+#
+#   ./fork_budget.py [--scripts media media cava] [--seconds 20] [--bus]
+#                    [--budget 'playerctl status=120' ...] [--budget-all 600]
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from failover import HERE, Instance, lock_holder, start_player, wait_for
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scripts", nargs="+", default=["media", "media", "cava"])
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--bus", action="store_true", help="fake MPRIS over D-Bus")
+    ap.add_argument("--budget", action="append", default=[], metavar="NAME=PER_MIN")
+    ap.add_argument("--budget-all", type=float, help="runs per minute, all commands")
+    args = ap.parse_args()
+
+    budgets = {}
+    for b in args.budget:
+        name, _, per_min = b.rpartition("=")
+        budgets[name] = float(per_min)
+
+    runtime = tempfile.mkdtemp(prefix="fork_budget.")
+    path = os.path.join(runtime, "commands.json")
+    env = dict(
+        os.environ,
+        XDG_RUNTIME_DIR=runtime,
+        PATH=os.path.join(HERE, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        WAYBAR_CMD_STATS=path,
+        CAVA_STATS="",
+    )
+    env.pop("DBUS_SESSION_BUS_ADDRESS", None)
+    bus = player = None
+    if args.bus:
+        bus, player = start_player(env)
+        if bus is None:
+            print("--bus needs dbus-daemon")
+            return 1
+    else:
+        env["DBUS_SESSION_BUS_ADDRESS"] = "unix:path=/nonexistent"
+
+    insts = []
+    try:
+        for i, name in enumerate(args.scripts):
+            insts.append(Instance(f"{name}_waybar.py", env))
+            if i == 0 and not wait_for(
+                lambda: lock_holder(os.path.join(runtime, "cava_waybar.lock"))
+                == insts[0].pid,
+                5.0,
+            ):
+                print("producer never took the lock")
+                return 1
+        time.sleep(args.seconds)
+    finally:
+        # followers first, or one gets promoted and spawns its own cava;
+        # SIGTERM lets each flush its totals on the way out
+        for inst in reversed(insts):
+            inst.stop()
+        for p in (player, bus):
+            if p is not None:
+                p.terminate()
+                p.wait()
+        try:
+            with open(path) as f:
+                doc = json.load(f)
+        except (OSError, ValueError):
+            doc = {"commands": {}}
+        shutil.rmtree(runtime, ignore_errors=True)
+
+    minutes = args.seconds / 60.0
+    print(
+        f"{' '.join(args.scripts)}, {'D-Bus' if args.bus else 'playerctl fallback'},"
+        f" {args.seconds:g} s"
+    )
+    print(
+        f"{'command':>20} {'runs':>6} {'errors':>6} {'timeouts':>8} {'p50 ms':>8}"
+        f" {'p99 ms':>8} {'/min':>7}  exit codes"
+    )
+    failed = False
+    total = 0
+    for name, e in sorted(doc["commands"].items()):
+        per_min = (e["runs"] + e["errors"]) / minutes
+        total += per_min
+        over = name in budgets and per_min > budgets[name]
+        failed |= over
+        codes = " ".join(f"{k}:{v}" for k, v in e["exit_codes"].items())
+        print(
+            f"{name:>20} {e['runs']:>6} {e['errors']:>6} {e['timeouts']:>8}"
+            f" {e.get('p50_ms', 0):>8.1f} {e.get('p99_ms', 0):>8.1f}"
+            f" {per_min:>7.1f}  {codes}{'  <-- over budget' if over else ''}"
+        )
+    print(f"{'all':>20} {'':>6} {'':>6} {'':>8} {'':>8} {'':>8} {total:>7.1f}")
+    if args.budget_all is not None and total > args.budget_all:
+        print(f"over the overall budget of {args.budget_all:g}/min")
+        failed = True
+    print("FAIL" if failed else "ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/soak.py
+# Long-run soak: a producer and followers (media_waybar.py / cava_waybar.py,
+# each under tests/soak_launch.py for tracemalloc) run on the fake cava in
+# tests/bin while fake MPRIS players go through a day of changes at
+# --hour-s real seconds per simulated hour. Per simulated hour:
+#   20 tracks (titles of every width class: ASCII, CJK, emoji, combining)
+#    6 pause/resume   3 second player appearing and vanishing
+#    1 player restart  1 cava crash (respawned by the producer)
+# Frames run at --fps meanwhile. Every --sample seconds it records each
+# instance's RSS, tracemalloc traced bytes, open fds, threads, children and
+# zombies. After --warmup, a series fails when its median over the last
+# quarter exceeds the second quarter's by more than its slack and is still
+# rising (third quarter → fourth); plateaus pass. Prints the verdicts and
+# the allocation sites that grew most, optionally as JSON. Exits 1 on growth.
+#
+#   ./soak.py [--hours 24] [--hour-s 10] [--scripts media media cava]
+#             [--fps 60] [--sample 2] [--warmup 20] [--json out.json]
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from failover import HERE, Instance, lock_holder, wait_for
+
+LAUNCHER = os.path.join(HERE, "soak_launch.py")
+SLACK = {  # growth allowed between the second and last quarter
+    "rss_kb": 2048,
+    "traced_kb": 256,
+    "fds": 2,
+    "threads": 2,
+    "children": 1,
+    "zombies": 0,
+}
+PER_HOUR = {"title": 20, "pause": 6, "second": 3, "restart": 1, "cava": 1}
+WORDS = [
+    "Midnight",
+    "Drive",
+    "Echoes",
+    "東京",
+    "夜景",
+    "🎧",
+    "🇯🇵",
+    "👩‍🎤",
+    "Café",
+    "Señorita",
+    "Ро́к",
+    "a" * 40,
+    "&",
+    "<live>",
+]
+
+
+def proc_sample(pid: int) -> dict:
+    out = {"rss_kb": 0, "fds": 0, "threads": 0, "children": 0, "zombies": 0}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    out["rss_kb"] = int(line.split()[1])
+                elif line.startswith("Threads:"):
+                    out["threads"] = int(line.split()[1])
+        out["fds"] = len(os.listdir(f"/proc/{pid}/fd"))
+    except (OSError, ValueError):
+        return out
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:  # ppid
+            out["children"] += 1
+            out["zombies"] += fields[0] == "Z"
+    return out
+
+
+def mem_sample(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class Player:
+    """One fake MPRIS player process, driven through its stdin."""
+
+    def __init__(self, name: str, env: dict):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "fake_mpris.py"), "--name", name],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            text=True,
+        )
+
+    def send(self, *lines) -> None:
+        try:
+            for line in lines:
+                self.proc.stdin.write(line + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            pass
+
+    def close(self) -> None:
+        self.send("quit")
+        try:
+            self.proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+def schedule(hours: float, hour_s: float, rng: random.Random) -> list:
+    """(real offset s, event) for the whole run, jittered, in order."""
+    events = []
+    for kind, n in PER_HOUR.items():
+        total = int(hours * n)
+        gap = hours * hour_s / max(total, 1)
+        for i in range(total):
+            events.append(((i + rng.uniform(0.1, 0.9)) * gap, kind))
+    return sorted(events)
+
+
+def title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+
+
+def growth(values: list, slack: float) -> dict:
+    n = len(values)
+    q = max(1, n // 4)
+    q2 = statistics.median(values[q : 2 * q] or values)
+    q3 = statistics.median(values[2 * q : 3 * q] or values)
+    q4 = statistics.median(values[3 * q :] or values)
+    grew = q4 - q2
+    return {
+        "first": values[0],
+        "q2": q2,
+        "q4": q4,
+        "max": max(values),
+        "growth": grew,
+        "bounded": not (grew > slack and q4 > q3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--hours", type=float, default=24.0)
+    ap.add_argument("--hour-s", type=float, default=10.0)
+    ap.add_argument("--scripts", nargs="+", default=["media", "media", "cava"])
+    ap.add_argument("--fps", type=int, default=60)
+    ap.add_argument("--sample", type=float, default=2.0)
+    ap.add_argument("--warmup", type=float, default=20.0)
+    ap.add_argument("--seed", type=int, default=22)
+    ap.add_argument("--json", help="write the series and verdicts here")
+    args = ap.parse_args()
+
+    if shutil.which("dbus-daemon") is None:
+        print("soak needs dbus-daemon for the fake players")
+        return 1
+    rng = random.Random(args.seed)
+    runtime = tempfile.mkdtemp(prefix="soak.")
+    ctl = os.path.join(runtime, "fake_cava.ctl")
+    env = dict(
+        os.environ,
+        XDG_RUNTIME_DIR=runtime,
+        PATH=os.path.join(HERE, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        FAKE_CAVA_CTL=ctl,
+        CAVA_FPS=str(args.fps),
+        CAVA_IDLE_FPS="0",
+        CAVA_STATS=os.path.join(runtime, "stats.json"),
+        CAVA_RESTART_MAX="1",
+        MEDIA_META_INTERVAL="0.05",
+        MARQUEE_SPEED="20",
+        SOAK_MEM_INTERVAL=str(args.sample),
+        SOAK_MEM_WARMUP=str(args.warmup),
+    )
+    with open(ctl, "w") as f:
+        f.write("run")
+    bus = subprocess.Popen(
+        ["dbus-daemon", "--session", "--print-address", "--nofork"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    env["DBUS_SESSION_BUS_ADDRESS"] = bus.stdout.readline().strip()
+
+    main_player = Player("soak", env)
+    second = None
+    insts = []
+    series = []  # one list of per-instance samples per tick
+    try:
+        time.sleep(0.3)
+        main_player.send(f"title {title(rng)}", "play")
+        for i, name in enumerate(args.scripts):
+            inst_env = dict(env, SOAK_MEM=os.path.join(runtime, f"mem.{i}.json"))
+            insts.append(Instance(f"{name}_waybar.py", inst_env, LAUNCHER))
+            if i == 0 and not wait_for(
+                lambda: lock_holder(os.path.join(runtime, "cava_waybar.lock"))
+                == insts[0].pid,
+                5.0,
+            ):
+                print("producer never took the lock")
+                return 1
+
+        events = schedule(args.hours, args.hour_s, rng)
+        t0 = time.monotonic()
+        t_end = t0 + args.hours * args.hour_s
+        next_sample = t0
+        print(
+            f"{' '.join(args.scripts)}: {args.hours:g} h at {args.hour_s:g} s/h,"
+            f" {len(events)} player/cava events, {args.fps} fps"
+        )
+        while time.monotonic() < t_end:
+            now = time.monotonic()
+            while events and t0 + events[0][0] <= now:
+                _, kind = events.pop(0)
+                if kind == "title":
+                    main_player.send(f"title {title(rng)}", f"artist {title(rng)}")
+                elif kind == "pause":
+                    main_player.send("pause")
+                    time.sleep(0.05)
+                    main_player.send("play")
+                elif kind == "second":
+                    if second is None:
+                        second = Player("soak2", env)
+                        time.sleep(0.1)
+                        second.send(f"title {title(rng)}", "play")
+                    else:
+                        second.close()
+                        second = None
+                elif kind == "restart":
+                    main_player.close()
+                    main_player = Player("soak", env)
+                    time.sleep(0.1)
+                    main_player.send(f"title {title(rng)}", "play")
+                elif kind == "cava":
+                    with open(ctl, "w") as f:
+                        f.write("exit")
+                    time.sleep(0.2)
+                    with open(ctl, "w") as f:
+                        f.write("run")
+            if now >= next_sample:
+                next_sample += args.sample
+                tick = []
+                for i, inst in enumerate(insts):
+                    if inst.proc.poll() is not None:
+                        print(f"instance {i} exited ({inst.proc.returncode})")
+                        return 1
+                    s = proc_sample(inst.pid)
+                    mem = mem_sample(os.path.join(runtime, f"mem.{i}.json"))
+                    s["traced_kb"] = mem.get("traced", 0) // 1024
+                    s["t"] = now - t0
+                    tick.append(s)
+                series.append(tick)
+            time.sleep(0.02)
+        mems = [
+            mem_sample(os.path.join(runtime, f"mem.{i}.json"))
+            for i in range(len(insts))
+        ]
+        lines = [len(inst.lines) for inst in insts]
+    finally:
+        for inst in insts:
+            inst.stop()
+        for p in (main_player, second):
+            if p is not None:
+                p.close()
+        bus.terminate()
+        bus.wait()
+        shutil.rmtree(runtime, ignore_errors=True)
+
+    elapsed = args.hours * args.hour_s
+    kept = [tick for tick in series if tick[0]["t"] >= args.warmup]
+    if len(kept) < 8:
+        print("too few samples after warmup; raise --hours or lower --sample")
+        return 1
+    failed = False
+    report = []
+    for i, name in enumerate(args.scripts):
+        role = "producer" if i == 0 else "follower"
+        print(
+            f"\n[{i}] {name}_waybar.py {role}: {lines[i]} lines"
+            f" ({lines[i] / elapsed:.0f}/s)"
+        )
+        print(
+            f"{'series':>10} {'first':>9} {'q2':>9} {'q4':>9} {'max':>9}"
+            f" {'growth':>9}  verdict"
+        )
+        verdicts = {}
+        for key, slack in SLACK.items():
+            g = growth([tick[i][key] for tick in kept], slack)
+            verdicts[key] = g
+            failed |= not g["bounded"]
+            print(
+                f"{key:>10} {g['first']:>9} {g['q2']:>9g} {g['q4']:>9g} {g['max']:>9}"
+                f" {g['growth']:>+9g}  {'ok' if g['bounded'] else 'GROWING'}"
+            )
+        grew = mems[i].get("growth", [])
+        if grew:
+            print("  most grown since the warmup baseline:")
+            for s in grew[:5]:
+                where = os.path.relpath(
+                    s["site"].rsplit(":", 1)[0], os.path.dirname(HERE)
+                )
+                line = s["site"].rsplit(":", 1)[1]
+                print(
+                    f"  {s['size_diff'] / 1024:>+9.1f} kB {s['count_diff']:>+6}"
+                    f"  {where}:{line}"
+                )
+        report.append(
+            {
+                "script": name,
+                "role": role,
+                "lines": lines[i],
+                "verdicts": verdicts,
+                "top": mems[i].get("top", []),
+                "growth": grew,
+                "samples": [tick[i] for tick in series],
+            }
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {"hours": args.hours, "hour_s": args.hour_s, "instances": report},
+                f,
+                indent=1,
+            )
+            f.write("\n")
+    print("\nFAIL" if failed else "\nok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
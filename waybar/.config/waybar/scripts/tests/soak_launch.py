@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# waybar/.config/waybar/scripts/tests/soak_launch.py
+# Runs one Waybar script under tracemalloc for tests/soak.py:
+#
+#   soak_launch.py ../media_waybar.py
+#
+# A daemon thread writes SOAK_MEM (JSON) every SOAK_MEM_INTERVAL seconds:
+# traced/peak bytes, the SOAK_MEM_TOP largest allocation sites, and once the
+# first snapshot after SOAK_MEM_WARMUP seconds is taken as the baseline, the
+# sites that grew the most since. The script itself runs as __main__,
+# unchanged; allocations of this wrapper and of tracemalloc are filtered out.
+
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+
+OUT = os.environ.get("SOAK_MEM", "")
+INTERVAL = float(os.environ.get("SOAK_MEM_INTERVAL", "2"))
+WARMUP = float(os.environ.get("SOAK_MEM_WARMUP", "10"))
+TOP = int(os.environ.get("SOAK_MEM_TOP", "10"))
+FRAMES = int(os.environ.get("SOAK_MEM_FRAMES", "1"))
+
+IGNORE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def site(stat) -> str:
+    frame = stat.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def sample(baseline):
+    snap = tracemalloc.take_snapshot().filter_traces(IGNORE)
+    traced, peak = tracemalloc.get_traced_memory()
+    doc = {
+        "t": time.monotonic(),
+        "traced": traced,
+        "peak": peak,
+        "top": [
+            {"site": site(s), "size": s.size, "count": s.count}
+            for s in snap.statistics("lineno")[:TOP]
+        ],
+    }
+    if baseline is not None:
+        doc["growth"] = [
+            {"site": site(s), "size_diff": s.size_diff, "count_diff": s.count_diff}
+            for s in snap.compare_to(baseline, "lineno")[:TOP]
+            if s.size_diff > 0
+        ]
+    return snap, doc
+
+
+def watch():
+    t_base = time.monotonic() + WARMUP
+    baseline = None
+    while True:
+        time.sleep(INTERVAL)
+        snap, doc = sample(baseline)
+        if baseline is None and time.monotonic() >= t_base:
+            baseline = snap
+            doc["baseline"] = True
+        tmp = f"{OUT}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(doc, f)
+        os.replace(tmp, OUT)
+
+
+def main():
+    script = os.path.abspath(sys.argv[1])
+    sys.argv = sys.argv[1:]
+    sys.path.insert(0, os.path.dirname(script))
+    tracemalloc.start(FRAMES)
+    if OUT:
+        threading.Thread(target=watch, daemon=True).start()
+    runpy.run_path(script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()